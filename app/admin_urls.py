@@ -0,0 +1,19 @@
+"""
+The admin's routes, and its pages of request profiles (see app.profiling).
+
+With `LAZY_LOADING`, app.urls imports this module on the first request for
+the admin, which is when the installed apps' admin modules are discovered.
+"""
+
+from django.contrib import admin
+
+from .views import profile_file, profiles
+
+# Registers the models of the installed apps; already done on startup without `LAZY_LOADING`.
+admin.autodiscover()
+
+profiles_view = admin.site.admin_view(profiles)
+profile_file_view = admin.site.admin_view(profile_file)
+
+app_name = "admin"
+urlpatterns = admin.site.get_urls()
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+# Serve the API from the async views, unless DJANGO_ASYNC_VIEWS=false is set in the environment.
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "true")
 
 application = get_asgi_application()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import gzip
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content codings in order of preference; `br` needs the brotli package.
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """The content codings an `Accept-Encoding` header accepts, leaving out those with `q=0`."""
+    encodings = set()
+    for item in header.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        quality = next((param[2:] for param in params if param.lower().startswith("q=")), "1")
+        try:
+            accepted = float(quality) > 0
+        except ValueError:
+            accepted = False
+        if name and accepted:
+            encodings.add(name.lower())
+    return encodings
+
+
+def negotiate_encoding(header: str) -> str | None:
+    """The preferred coding among `ENCODINGS` accepted by an `Accept-Encoding` header, if any."""
+    accepted = accepted_encodings(header)
+    return next((encoding for encoding in ENCODINGS if encoding in accepted or "*" in accepted), None)
+
+
+def compress(content: bytes, encoding: str, *, best: bool = False) -> bytes:
+    """`content` in `encoding`; `best` trades speed for size, for content compressed once and served many times."""
+    if encoding == "br":
+        return brotli.compress(content, quality=11 if best else settings.COMPRESSION_BROTLI_QUALITY)
+    # Without a timestamp, the same content always compresses to the same bytes.
+    return gzip.compress(content, compresslevel=9 if best else settings.COMPRESSION_GZIP_LEVEL, mtime=0)
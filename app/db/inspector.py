@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import logging
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .instrumentation import execute_wrappers
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from django.db.backends.base.base import BaseDatabaseWrapper
+    from django.http import HttpRequest
+
+logger = logging.getLogger(__name__)
+
+# Literals and placeholders, replaced with `?` in query shapes.
+LITERALS = re.compile(r"'(?:[^']|'')*'|%s|\b\d+(?:\.\d+)?\b")
+# `IN (?, ?, ...)` of any length.
+IN_LISTS = re.compile(r"\bIN \(\?(?:, ?\?)*\)", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(Exception):
+    """A request repeated a query shape more than `QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD` times."""
+
+
+def query_shape(sql: str) -> str:
+    """`sql` without its literals, so that queries differing only in their parameters share a shape."""
+    shape = LITERALS.sub("?", WHITESPACE.sub(" ", sql).strip())
+    return IN_LISTS.sub("IN (...)", shape)
+
+
+def is_select(sql: str) -> bool:
+    return sql.lstrip().upper().startswith(("SELECT", "WITH"))
+
+
+def call_site() -> str | None:
+    """The innermost frame of the project's own code running the current query, as `path:line in function`."""
+    base_dir = str(settings.BASE_DIR) + "/"
+    # The execute wrappers themselves, which run inside the query.
+    wrapper_files = {sys.modules[wrapper.__module__].__file__ for wrapper in execute_wrappers}
+    frame = sys._getframe(1)  # noqa: SLF001
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base_dir) and filename not in wrapper_files and "site-packages" not in filename:
+            return f"{Path(filename).relative_to(base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+@dataclass
+class SlowQuery:
+    sql: str
+    alias: str
+    duration_ms: float
+    explain: list[str] | None = None
+
+
+@dataclass
+class QueryInspection:
+    """The queries of one request, grouped by `query_shape`, filled in by `inspect_query`."""
+
+    start: float
+    queries: int = 0
+    shapes: dict[str, int] = field(default_factory=dict)
+    # Shape -> where it was run when it crossed the threshold.
+    call_sites: dict[str, str | None] = field(default_factory=dict)
+    slow_queries: list[SlowQuery] = field(default_factory=list)
+    explaining: bool = False
+    # Depth of `expected_repeats()` blocks.
+    expecting: int = 0
+
+    def n_plus_one(self) -> list[dict[str, Any]]:
+        """The repeated shapes not matching a `QUERY_INSPECTOR_IGNORE` pattern."""
+        return [
+            {"shape": shape, "count": self.shapes[shape], "call_site": site}
+            for shape, site in self.call_sites.items()
+            if not any(fnmatch.fnmatch(site or shape, pattern) for pattern in settings.QUERY_INSPECTOR_IGNORE)
+        ]
+
+    def report(self, request: HttpRequest) -> dict[str, Any]:
+        return {
+            "event": "query_inspection",
+            "method": request.method,
+            "path": request.path,
+            "view": request.resolver_match.view_name if request.resolver_match else None,
+            "queries": self.queries,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "n_plus_one": self.n_plus_one(),
+            "slow_queries": [vars(query) for query in self.slow_queries],
+        }
+
+
+# The inspection of the request being handled; `sync_to_async` threads share the same object.
+current_inspection: ContextVar[QueryInspection | None] = ContextVar("current_inspection", default=None)
+
+
+@contextmanager
+def expected_repeats() -> Iterator[None]:
+    """Leave the queries run inside the block out of N+1 detection, for loops bounded by design."""
+    inspection = current_inspection.get()
+    if inspection is None:
+        yield
+        return
+    inspection.expecting += 1
+    try:
+        yield
+    finally:
+        inspection.expecting -= 1
+
+
+def explain(connection: BaseDatabaseWrapper, sql: str, params: Any) -> list[str]:  # noqa: ANN401
+    """The plan of `sql`, with `EXPLAIN ANALYZE` on PostgreSQL, one line per row."""
+    options = {"analyze": True} if connection.vendor == "postgresql" else {}
+    try:
+        # In a savepoint, so that a failing EXPLAIN does not break the request's transaction.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix(**options)} {sql}", params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError as error:
+        return [f"EXPLAIN failed: {error}"]
+
+
+def inspect_query(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:  # noqa: ANN401, FBT001
+    """Execute wrapper grouping the queries of the current request by shape (see `add_execute_wrapper`)."""
+    inspection = current_inspection.get()
+    if inspection is None or inspection.explaining or many:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        inspection.queries += 1
+        if is_select(sql) and not inspection.expecting:
+            shape = query_shape(sql)
+            count = inspection.shapes[shape] = inspection.shapes.get(shape, 0) + 1
+            if count == settings.QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD + 1:
+                inspection.call_sites[shape] = call_site()
+        if duration_ms >= settings.QUERY_INSPECTOR_SLOW_QUERY_MS:
+            connection = context["connection"]
+            slow_query = SlowQuery(sql=sql, alias=connection.alias, duration_ms=round(duration_ms, 3))
+            if is_select(sql):
+                # EXPLAIN ANALYZE runs the query again; other statements are not explained.
+                inspection.explaining = True
+                try:
+                    slow_query.explain = explain(connection, sql, params)
+                finally:
+                    inspection.explaining = False
+            inspection.slow_queries.append(slow_query)
+
+
+def log_inspection(request: HttpRequest, inspection: QueryInspection) -> dict[str, Any] | None:
+    """Log the report of `inspection` as JSON if it found N+1 or slow queries, and return it."""
+    report = inspection.report(request)
+    if not report["n_plus_one"] and not report["slow_queries"]:
+        return None
+    # Parameters are left out of the log, as they may hold personal data.
+    logger.warning(json.dumps(report), extra={"query_inspection": report})
+    return report
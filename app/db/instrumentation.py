@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from django.db.backends.base.base import BaseDatabaseWrapper
+
+# `connection.execute_wrapper` functions installed on every database connection, outermost first.
+execute_wrappers: list[Callable] = []
+
+
+def install_execute_wrappers(connection: BaseDatabaseWrapper) -> None:
+    for wrapper in execute_wrappers:
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender: type, connection: BaseDatabaseWrapper, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    install_execute_wrappers(connection)
+
+
+def add_execute_wrapper(wrapper: Callable) -> None:
+    """
+    Wrap the queries of every connection, in any thread, with `wrapper`.
+
+    Unlike `connection.execute_wrapper()`, which wraps one thread's
+    connection for the duration of a block, the wrapper stays installed: under
+    ASGI the queries of a request run in other threads than its middleware.
+    Wrappers find the request they belong to through a context variable.
+    """
+    if wrapper not in execute_wrappers:
+        execute_wrappers.append(wrapper)
+    # Connections opened before the wrapper was added, e.g. by tests.
+    for connection in connections.all(initialized_only=True):
+        install_execute_wrappers(connection)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import math
+import time
+from typing import TYPE_CHECKING
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import PIN_COOKIE, PIN_HEADER, current_request
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from django.http import HttpRequest, HttpResponseBase
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Make the request visible to `ReplicaRouter`, and pin a client's reads to the primary after it writes.
+
+    A successful unsafe request gets a `PIN_COOKIE` cookie and a `PIN_HEADER`
+    header holding the end of the `DATABASE_REPLICA_PIN_SECONDS` window. Until
+    then, requests sending either are read from the primary, so the client
+    sees its own writes however far the replicas lag behind.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase | Awaitable[HttpResponseBase]]) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        token = current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.pin(request, response)
+
+    def pin(self, request: HttpRequest, response: HttpResponseBase) -> HttpResponseBase:
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:  # noqa: PLR2004
+            window = settings.DATABASE_REPLICA_PIN_SECONDS
+            until = str(math.ceil(time.time() + window))
+            response[PIN_HEADER] = until
+            response.set_cookie(PIN_COOKIE, until, max_age=window, httponly=True, samesite="Lax")
+        return response
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import suppress
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from django.db.utils import OperationalError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DEFAULT_POOL = {"MAX_SIZE": 10, "TIMEOUT": 5.0, "MAX_LIFETIME": 1800.0}
+
+
+class PoolTimeoutError(OperationalError):
+    """No connection was released within the pool's `timeout`."""
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of at most `max_size` DB-API connections opened by `connect`.
+
+    Idle connections are handed out most recently released first, so that
+    surplus ones age out. Connections older than `max_lifetime` seconds are
+    closed on release instead of being kept. When every connection is in use,
+    `acquire` waits up to `timeout` seconds and raises `PoolTimeoutError`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any] | None = None,
+        *,
+        max_size: int = DEFAULT_POOL["MAX_SIZE"],
+        timeout: float = DEFAULT_POOL["TIMEOUT"],
+        max_lifetime: float = DEFAULT_POOL["MAX_LIFETIME"],
+    ) -> None:
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.lock = threading.Condition()
+        self.idle: deque[tuple[Any, float]] = deque()
+        # Connection id -> opening time, for the connections handed out.
+        self.in_use: dict[int, float] = {}
+        self.opening = 0
+        self.waiting = 0
+        self.opened = 0
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.acquire_seconds = 0.0
+        self.acquire_seconds_max = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def acquire(self, connect: Callable[[], Any] | None = None, check: Callable[[Any], bool] | None = None) -> Any:  # noqa: ANN401
+        """
+        An idle connection, or a new one from `connect` (the pool's own by default) while below `max_size`.
+
+        Idle connections for which `check` returns false are closed and skipped.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self.lock:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        msg = f"No database connection was released within {self.timeout:g}s."
+                        raise PoolTimeoutError(msg)
+                    self.waiting += 1
+                    try:
+                        self.lock.wait(remaining)
+                    finally:
+                        self.waiting -= 1
+                if self.idle:
+                    connection, created = self.idle.pop()
+                    self.in_use[id(connection)] = created
+                else:
+                    connection = None
+                    self.opening += 1
+            if connection is None:
+                # Opened outside the lock: connecting can take a network round trip or more.
+                try:
+                    connection = (connect or self.connect)()
+                    created = time.monotonic()
+                finally:
+                    with self.lock:
+                        self.opening -= 1
+                        if connection is None:
+                            self.lock.notify()
+                        else:
+                            self.opened += 1
+                            self.in_use[id(connection)] = created
+            elif check is not None and not check(connection):
+                self.release(connection, discard=True)
+                continue
+            with self.lock:
+                elapsed = time.monotonic() - start
+                self.acquisitions += 1
+                self.acquire_seconds += elapsed
+                self.acquire_seconds_max = max(self.acquire_seconds_max, elapsed)
+            return connection
+
+    def release(self, connection: Any, *, discard: bool = False) -> None:  # noqa: ANN401
+        """Return `connection` to the pool, or close it when `discard` is set or it outlived `max_lifetime`."""
+        with self.lock:
+            created = self.in_use.pop(id(connection))
+            discard = discard or time.monotonic() - created >= self.max_lifetime
+            if not discard:
+                self.idle.append((connection, created))
+            self.lock.notify()
+        if discard:
+            with suppress(Exception):
+                connection.close()
+
+    def clear(self) -> None:
+        """Close the idle connections; those in use are closed when released past `max_lifetime`."""
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection, _ in idle:
+            with suppress(Exception):
+                connection.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            acquisitions = self.acquisitions or 1
+            return {
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": len(self.in_use),
+                "waiting": self.waiting,
+                "opened": self.opened,
+                "acquisitions": self.acquisitions,
+                "timeouts": self.timeouts,
+                "acquire_ms_avg": round(self.acquire_seconds / acquisitions * 1000, 3),
+                "acquire_ms_max": round(self.acquire_seconds_max * 1000, 3),
+            }
+
+
+_pools: dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, settings_dict: dict[str, Any]) -> ConnectionPool:
+    """
+    The process-wide pool of the database `alias`, configured from its `POOL` setting.
+
+    Pools are keyed by the connection settings too, so that the test database
+    (a different `NAME` under the same alias) gets its own pool.
+    """
+    key = (alias, *(settings_dict.get(name) for name in ("NAME", "HOST", "PORT", "USER")))
+    with _pools_lock:
+        if key not in _pools:
+            config = {**DEFAULT_POOL, **settings_dict.get("POOL", {})}
+            _pools[key] = ConnectionPool(
+                max_size=int(config["MAX_SIZE"]),
+                timeout=float(config["TIMEOUT"]),
+                max_lifetime=float(config["MAX_LIFETIME"]),
+            )
+        return _pools[key]
+
+
+def reset_pools() -> None:
+    """Close the idle connections of every pool and forget the pools, e.g. in a forked worker."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.clear()
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    """`ConnectionPool.stats()` of every pool of this process by database alias; empty without pooled backends."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {key[0]: pool.stats() for key, pool in pools}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Borrow the DB-API connection of a Django database wrapper from `get_pool` instead of opening one.
+
+    `close()` (at the end of a request, or once `CONN_MAX_AGE` has passed)
+    rolls back and returns the connection to the pool. With
+    `CONN_HEALTH_CHECKS`, idle connections are checked with `SELECT 1` before
+    being handed out.
+    """
+
+    pool: ConnectionPool | None = None
+
+    def get_new_connection(self, conn_params: dict[str, Any]) -> Any:  # noqa: ANN401
+        self.pool = get_pool(self.alias, self.settings_dict)
+        check = self.check_pooled_connection if self.settings_dict["CONN_HEALTH_CHECKS"] else None
+        return self.pool.acquire(partial(super().get_new_connection, conn_params), check=check)
+
+    @staticmethod
+    def check_pooled_connection(connection: Any) -> bool:  # noqa: ANN401
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:  # noqa: BLE001
+            return False
+        return True
+
+    def _close(self) -> None:
+        if self.connection is None:
+            return
+        discard = False
+        try:
+            # Nothing uncommitted may leak to the next borrower.
+            self.connection.rollback()
+        except Exception:  # noqa: BLE001
+            discard = True
+        self.pool.release(self.connection, discard=discard)
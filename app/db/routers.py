@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from django.db.models import Model
+    from django.http import HttpRequest
+
+# Cookie and header carrying the time (in seconds since the epoch) until which a client reads from the primary.
+PIN_COOKIE = "primary_pinned_until"
+PIN_HEADER = "X-Primary-Pinned-Until"
+
+# The request being handled, set by `ReplicaRoutingMiddleware`.
+current_request: ContextVar[HttpRequest | None] = ContextVar("current_request", default=None)
+
+
+def check_database(alias: str) -> bool:
+    """Whether `SELECT 1` succeeds on the database `alias`."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError:
+        connection.close()
+        return False
+    return True
+
+
+class ReplicaSet:
+    """
+    Replicas chosen by smooth weighted round-robin, skipping those failing their health check.
+
+    Each replica is checked with `check` when it is first chosen, and again
+    once `check_interval` seconds have passed since its last check. A replica
+    failing the check is ejected until it passes one.
+    """
+
+    def __init__(
+        self,
+        weights: dict[str, int],
+        check: Callable[[str], bool] = check_database,
+        check_interval: float = 5.0,
+    ) -> None:
+        self.weights = dict(weights)
+        self.check = check
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.current = dict.fromkeys(weights, 0)
+        self.healthy = dict.fromkeys(weights, True)
+        self.checked_at = dict.fromkeys(weights, float("-inf"))
+
+    def refresh(self, *, force: bool = False) -> None:
+        """Check the replicas whose last check is older than `check_interval`, or all of them with `force`."""
+        now = time.monotonic()
+        with self.lock:
+            due = [
+                alias
+                for alias, checked_at in self.checked_at.items()
+                if force or now - checked_at >= self.check_interval
+            ]
+            # Claimed before checking, so that concurrent callers do not check the same replica.
+            for alias in due:
+                self.checked_at[alias] = now
+        for alias in due:
+            self.healthy[alias] = self.check(alias)
+
+    def choose(self) -> str | None:
+        """The next healthy replica, or `None` when all of them are ejected."""
+        self.refresh()
+        with self.lock:
+            healthy = [alias for alias in self.weights if self.healthy[alias]]
+            if not healthy:
+                return None
+            for alias in healthy:
+                self.current[alias] += self.weights[alias]
+            chosen = max(healthy, key=self.current.__getitem__)
+            self.current[chosen] -= sum(self.weights[alias] for alias in healthy)
+            return chosen
+
+    def status(self) -> dict[str, bool]:
+        with self.lock:
+            return dict(self.healthy)
+
+
+_replicas: ReplicaSet | None = None
+_replicas_lock = threading.Lock()
+
+
+def get_replicas() -> ReplicaSet:
+    """The `ReplicaSet` of `settings.DATABASE_REPLICAS`, rebuilt when the setting changes."""
+    global _replicas  # noqa: PLW0603
+    with _replicas_lock:
+        if _replicas is None or _replicas.weights != settings.DATABASE_REPLICAS:
+            _replicas = ReplicaSet(settings.DATABASE_REPLICAS, check_interval=settings.DATABASE_REPLICA_CHECK_INTERVAL)
+        return _replicas
+
+
+def pinned_until(request: HttpRequest) -> float | None:
+    """The pin time sent by the client in `PIN_HEADER` or `PIN_COOKIE`, ignoring values outside the pin window."""
+    value = request.headers.get(PIN_HEADER) or request.COOKIES.get(PIN_COOKIE)
+    try:
+        until = float(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time()
+    # The pin is rounded up to a whole second.
+    return until if now < until <= now + settings.DATABASE_REPLICA_PIN_SECONDS + 1 else None
+
+
+def is_pinned(request: HttpRequest) -> bool:
+    """Whether the client of `request` wrote recently, so that its reads must see the primary."""
+    return bool(settings.DATABASE_REPLICAS) and pinned_until(request) is not None
+
+
+def uses_replicas(request: HttpRequest) -> bool:
+    """Whether the reads of `request` may go to a replica: a safe request to a view opting in, not pinned."""
+    view_class = getattr(request.resolver_match, "func", None) and getattr(request.resolver_match.func, "cls", None)
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and request.method in SAFE_METHODS
+        and getattr(view_class, "read_from_replicas", False)
+        and not is_pinned(request)
+    )
+
+
+def read_database() -> str | None:
+    """
+    The replica the reads of the current request go to, or `None` for the primary.
+
+    Chosen on the first read of the request, so that all its queries see the
+    same replica.
+    """
+    request = current_request.get()
+    if request is None or request.resolver_match is None:
+        return None
+    if not hasattr(request, "_read_database"):
+        request._read_database = get_replicas().choose() if uses_replicas(request) else None  # noqa: SLF001
+    return request._read_database  # noqa: SLF001
+
+
+class ReplicaRouter:
+    """
+    Send the reads of safe requests to views with `read_from_replicas` to `settings.DATABASE_REPLICAS`.
+
+    Everything else, including every write, goes to the primary (`default`).
+    Replicas are never migrated: they replicate the primary's schema.
+    """
+
+    def db_for_read(self, model: type[Model], **hints: Any) -> str | None:  # noqa: ANN401, ARG002
+        return read_database()
+
+    def db_for_write(self, model: type[Model], **hints: Any) -> str:  # noqa: ANN401, ARG002
+        # Also for instances read from a replica, which Django would otherwise save back to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints: Any) -> bool | None:  # noqa: ANN401, ARG002
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:  # noqa: SLF001
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, **hints: Any) -> bool | None:  # noqa: ANN401, ARG002
+        return False if db in settings.DATABASE_REPLICAS else None
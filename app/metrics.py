@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import atexit
+import bisect
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+
+from app.db.pool import pool_stats
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+Labels = tuple[tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Name -> (type, help, histogram buckets) of every metric `registry` records or `pool_gauges` reports.
+METRICS: dict[str, tuple[str, str, tuple[float, ...]]] = {
+    "http_requests_total": ("counter", "Requests handled.", ()),
+    "http_request_duration_seconds": ("histogram", "Time from the first middleware to the response.", LATENCY_BUCKETS),
+    "http_response_render_seconds": ("histogram", "Time spent serializing the response body.", LATENCY_BUCKETS),
+    "http_response_size_bytes": ("histogram", "Size of non-streaming response bodies.", SIZE_BUCKETS),
+    "db_queries_total": ("counter", "SQL queries executed while handling requests.", ()),
+    "db_query_duration_seconds_total": ("counter", "Time spent in SQL queries while handling requests.", ()),
+    "db_pool_connections": ("gauge", "Connections of a pooled database backend, by state.", ()),
+    "db_pool_waiting": ("gauge", "Threads waiting for a pooled connection.", ()),
+    "db_pool_acquisitions_total": ("counter", "Connections handed out by the pool.", ()),
+    "db_pool_timeouts_total": ("counter", "Acquisitions that timed out.", ()),
+    "db_pool_acquire_seconds_max": ("gauge", "Longest wait for a pooled connection.", ()),
+}
+
+
+@dataclass
+class RequestMetrics:
+    """What one request spent, filled in by `record_query` and `MetricsMiddleware`."""
+
+    start: float
+    queries: int = 0
+    db_seconds: float = 0.0
+    render_start: float | None = None
+    render_seconds: float = 0.0
+
+
+# The metrics of the request being handled; `sync_to_async` threads share the same object.
+current_metrics: ContextVar[RequestMetrics | None] = ContextVar("current_metrics", default=None)
+
+
+def record_query(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:  # noqa: ANN401, FBT001
+    """Execute wrapper counting and timing the queries of the current request (see `add_execute_wrapper`)."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_seconds += time.perf_counter() - start
+        metrics.queries += 1
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of this process, shared with the other workers through `METRICS_DIR`.
+
+    Each process writes its snapshot to `<METRICS_DIR>/<pid>.json` at most
+    every `METRICS_FLUSH_INTERVAL` seconds and when it exits. `collect()`
+    adds up the snapshots of every process, so any worker can serve
+    `/metrics/`. Snapshots of exited workers are kept, like their counters
+    would be in a single process; clear the directory when deploying.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        # (name, labels) -> [count per bucket..., count above the last bucket, sum]
+        self.histograms: dict[tuple[str, Labels], list[float]] = {}
+        self.flushed_at = 0.0
+
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self) -> dict[str, list]:
+        with self.lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, labels, list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    @staticmethod
+    def directory() -> Path | None:
+        return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+    def flush(self, *, force: bool = False) -> None:
+        """Write this process's snapshot to `METRICS_DIR` if `METRICS_FLUSH_INTERVAL` has passed since the last."""
+        directory = self.directory()
+        now = time.monotonic()
+        if directory is None or (not force and now - self.flushed_at < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self.flushed_at = now
+        directory.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so that readers never see a partial snapshot.
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as file:
+            json.dump(self.snapshot(), file)
+        Path(file.name).replace(directory / f"{os.getpid()}.json")
+
+    def collect(self) -> dict[str, dict[tuple[str, Labels], Any]]:
+        """Counters and histograms summed over this process and the snapshots of the others."""
+        snapshots = [self.snapshot()]
+        directory = self.directory()
+        if directory is not None and directory.is_dir():
+            for path in directory.glob("*.json"):
+                if path.stem != str(os.getpid()):
+                    with contextlib.suppress(OSError, ValueError):
+                        snapshots.append(json.loads(path.read_text()))
+
+        counters: dict[tuple[str, Labels], float] = {}
+        histograms: dict[tuple[str, Labels], list[float]] = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                total = histograms.setdefault(key, [0] * len(values))
+                histograms[key] = [a + b for a, b in zip(total, values)]
+        return {"counters": counters, "histograms": histograms}
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush, force=True)
+
+
+def pool_gauges() -> Iterable[tuple[str, Labels, float]]:
+    """The `pool_stats()` of this process as metric samples, labelled with the process id."""
+    pid = str(os.getpid())
+    for alias, stats in pool_stats().items():
+        labels = (("alias", alias), ("pid", pid))
+        yield "db_pool_connections", (*labels, ("state", "in_use")), stats["in_use"]
+        yield "db_pool_connections", (*labels, ("state", "idle")), stats["idle"]
+        yield "db_pool_waiting", labels, stats["waiting"]
+        yield "db_pool_acquisitions_total", labels, stats["acquisitions"]
+        yield "db_pool_timeouts_total", labels, stats["timeouts"]
+        yield "db_pool_acquire_seconds_max", labels, stats["acquire_ms_max"] / 1000
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = ((name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics() -> str:
+    """Every metric of every worker in the Prometheus text exposition format (version 0.0.4)."""
+    collected = registry.collect()
+    samples: dict[str, list[str]] = {name: [] for name in METRICS}
+    for (name, labels), value in sorted(collected["counters"].items()):
+        samples[name].append(f"{name}{format_labels(labels)} {format_value(value)}")
+    for (name, labels), values in sorted(collected["histograms"].items()):
+        cumulative = 0
+        for bound, count in zip((*METRICS[name][2], float("inf")), values[:-1]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else format_value(bound)
+            samples[name].append(f"{name}_bucket{format_labels((*labels, ('le', le)))} {format_value(cumulative)}")
+        samples[name].append(f"{name}_sum{format_labels(labels)} {format_value(values[-1])}")
+        samples[name].append(f"{name}_count{format_labels(labels)} {format_value(cumulative)}")
+    for name, labels, value in pool_gauges():
+        samples[name].append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        if samples[name]:
+            lines.extend((f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *samples[name]))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import cProfile
+import time
+from typing import TYPE_CHECKING
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from .compression import compress, negotiate_encoding
+from .db.inspector import NPlusOneError, QueryInspection, current_inspection, inspect_query, log_inspection
+from .db.instrumentation import add_execute_wrapper
+from .metrics import RequestMetrics, current_metrics, record_query, registry
+from .profiling import PROFILE_ID_HEADER, profile_trigger, profiling_lock, save_profile
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from django.http import HttpRequest, HttpResponseBase
+    from django.template.response import SimpleTemplateResponse
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, SQL queries, serialization time and response size of every request.
+
+    Metrics are labelled with the view name and the method, and exported by
+    `/metrics/` (see app.metrics). Each response also gets a `Server-Timing`
+    header with its total, SQL and serialization time. It goes first in
+    `MIDDLEWARE`, so that the latency covers the other middleware too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase | Awaitable[HttpResponseBase]]) -> None:
+        self.get_response = get_response
+        add_execute_wrapper(record_query)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django runs a synchronous hook of an async middleware in a thread.
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics(start=time.perf_counter())
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.record(request, response, metrics)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        metrics = RequestMetrics(start=time.perf_counter())
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.record(request, response, metrics)
+
+    def process_template_response(
+        self,
+        request: HttpRequest,  # noqa: ARG002
+        response: SimpleTemplateResponse,
+    ) -> SimpleTemplateResponse:
+        return self.time_render(response)
+
+    async def aprocess_template_response(
+        self,
+        request: HttpRequest,  # noqa: ARG002
+        response: SimpleTemplateResponse,
+    ) -> SimpleTemplateResponse:
+        return self.time_render(response)
+
+    def time_render(self, response: SimpleTemplateResponse) -> SimpleTemplateResponse:
+        # Called last among the template response hooks, right before the response is rendered.
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.render_start = time.perf_counter()
+            response.add_post_render_callback(lambda _: self.rendered(metrics))
+        return response
+
+    @staticmethod
+    def rendered(metrics: RequestMetrics) -> None:
+        metrics.render_seconds = time.perf_counter() - metrics.render_start
+
+    def record(self, request: HttpRequest, response: HttpResponseBase, metrics: RequestMetrics) -> HttpResponseBase:
+        elapsed = time.perf_counter() - metrics.start
+        view = request.resolver_match.view_name if request.resolver_match else "<unresolved>"
+        labels = (("view", view), ("method", request.method))
+
+        registry.inc("http_requests_total", (*labels, ("status", str(response.status_code))))
+        registry.observe("http_request_duration_seconds", labels, elapsed)
+        if metrics.queries:
+            registry.inc("db_queries_total", labels, metrics.queries)
+            registry.inc("db_query_duration_seconds_total", labels, metrics.db_seconds)
+        if metrics.render_start is not None:
+            registry.observe("http_response_render_seconds", labels, metrics.render_seconds)
+        if not response.streaming:
+            registry.observe("http_response_size_bytes", labels, len(response.content))
+        registry.flush()
+
+        response["Server-Timing"] = ", ".join(
+            (
+                f"total;dur={elapsed * 1000:.3f}",
+                f'db;dur={metrics.db_seconds * 1000:.3f};desc="{metrics.queries} queries"',
+                f"render;dur={metrics.render_seconds * 1000:.3f}",
+            ),
+        )
+        return response
+
+
+class QueryInspectorMiddleware:
+    """
+    Report the N+1 and slow queries of each request, when `QUERY_INSPECTOR` is not `off`.
+
+    Queries are grouped by shape (see app.db.inspector). A shape run more than
+    `QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD` times is reported as N+1 with the
+    code that ran it, and queries slower than `QUERY_INSPECTOR_SLOW_QUERY_MS`
+    with their `EXPLAIN` plan, as JSON on the `app.db.inspector` logger. With
+    `raise`, used by the test runner, an N+1 also raises `NPlusOneError`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase | Awaitable[HttpResponseBase]]) -> None:
+        self.get_response = get_response
+        add_execute_wrapper(inspect_query)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if settings.QUERY_INSPECTOR == "off":
+            return self.get_response(request)
+        inspection = QueryInspection(start=time.perf_counter())
+        token = current_inspection.set(inspection)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_inspection.reset(token)
+        return self.report(request, response, inspection)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        if settings.QUERY_INSPECTOR == "off":
+            return await self.get_response(request)
+        inspection = QueryInspection(start=time.perf_counter())
+        token = current_inspection.set(inspection)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_inspection.reset(token)
+        return self.report(request, response, inspection)
+
+    def report(self, request: HttpRequest, response: HttpResponseBase, inspection: QueryInspection) -> HttpResponseBase:
+        report = log_inspection(request, inspection)
+        if report and report["n_plus_one"] and settings.QUERY_INSPECTOR == "raise":
+            sites = "; ".join(
+                f"{item['count']}x {item['shape']} at {item['call_site']}" for item in report["n_plus_one"]
+            )
+            msg = f"N+1 queries in {request.method} {request.path}: {sites}"
+            raise NPlusOneError(msg)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, per the request's `Accept-Encoding`.
+
+    Only non-streaming responses of at least `COMPRESSION_MIN_SIZE` bytes with
+    a content type listed in `COMPRESSION_CONTENT_TYPES` are compressed. The
+    list leaves HTML out, so that pages holding a CSRF token are not exposed
+    to BREACH. Brotli is preferred when the brotli package is installed.
+    Without `COMPRESSION_ENABLED`, Django leaves it out of the middleware chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase | Awaitable[HttpResponseBase]]) -> None:
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request: HttpRequest, response: HttpResponseBase) -> HttpResponseBase:
+        content_type = response.get("Content-Type", "").partition(";")[0].strip().lower()
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or content_type not in settings.COMPRESSION_CONTENT_TYPES
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # A strong ETag names the uncompressed bytes.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request with cProfile when asked to, and save it to `PROFILING_DIR` (see app.profiling).
+
+    A request is profiled when it sends a `manage.py profile_token` token in
+    the `X-Profile` header, when a staff user adds `?profile` to it, or when
+    it is drawn at `PROFILING_SAMPLE_RATE`. The response then names the
+    profile in `X-Profile-Id`. It goes last in `MIDDLEWARE`, so that the
+    profile covers the view and the rendering of its response. Without
+    `PROFILING_ENABLED`, Django leaves it out of the middleware chain.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase | Awaitable[HttpResponseBase]]) -> None:
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase | Awaitable[HttpResponseBase]:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = profile_trigger(request)
+        if trigger is None or not profiling_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            response[PROFILE_ID_HEADER] = save_profile(profiler, request, time.perf_counter() - start, trigger)
+        finally:
+            profiling_lock.release()
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        trigger = profile_trigger(request)
+        if trigger is None or not profiling_lock.acquire(blocking=False):
+            return await self.get_response(request)
+        # The profile covers the event loop thread, where other requests may run meanwhile, but not the threads
+        # running the synchronous parts of the request.
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.disable()
+            response[PROFILE_ID_HEADER] = save_profile(profiler, request, time.perf_counter() - start, trigger)
+        finally:
+            profiling_lock.release()
+        return response
@@ -0,0 +1,43 @@
+"""
+Schema annotations of the views, declared as plain data.
+
+`schema_overrides` stands in for drf-yasg's `swagger_auto_schema`, so that
+importing the views, on every worker's startup, does not import drf-yasg;
+app.schema turns the `QueryParameter`s into drf-yasg parameters when it
+generates the schema.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, NamedTuple, TypeVar
+
+ViewMethod = TypeVar("ViewMethod", bound=Callable)
+
+TYPE_STRING = "string"
+FORMAT_DATETIME = "date-time"
+
+
+class QueryParameter(NamedTuple):
+    """A query string parameter of an operation."""
+
+    name: str
+    description: str
+    type: str = TYPE_STRING
+    format: str | None = None
+    enum: list[str] | None = None
+    required: bool = False
+
+
+def schema_overrides(method: str | None = None, **overrides: Any) -> Callable[[ViewMethod], ViewMethod]:  # noqa: ANN401
+    """
+    `swagger_auto_schema` without drf-yasg: sets the overrides of the operation where drf-yasg looks for them.
+
+    As with `swagger_auto_schema`, `method` is required on an `@api_view` and
+    the decorator goes above `@action`. `manual_parameters` are `QueryParameter`s.
+    """
+
+    def decorator(view_method: ViewMethod) -> ViewMethod:
+        view_method._swagger_auto_schema = {method.lower(): overrides} if method else overrides  # noqa: SLF001
+        return view_method
+
+    return decorator
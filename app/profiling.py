@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import pstats
+import random
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.core import signing
+
+if TYPE_CHECKING:
+    import cProfile
+
+    from django.http import HttpRequest
+
+# Header carrying a token from `manage.py profile_token`, which profiles the request.
+PROFILE_HEADER = "X-Profile"
+# Query parameter profiling the request of a staff user.
+PROFILE_PARAMETER = "profile"
+# Response header naming the saved profile.
+PROFILE_ID_HEADER = "X-Profile-Id"
+SIGNING_SALT = "app.profiling"
+PROFILE_SUFFIXES = (".json", ".prof", ".collapsed")
+
+# Held while a request is profiled: a thread, or the event loop, profiles one request at a time.
+profiling_lock = threading.Lock()
+ring_lock = threading.Lock()
+
+
+def make_token() -> str:
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign("profile")
+
+
+def profile_trigger(request: HttpRequest) -> str | None:
+    """Why `request` should be profiled: `header`, `parameter` or `sample`; `None` for most requests."""
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        with contextlib.suppress(signing.BadSignature):
+            signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+            return "header"
+    # `request.user` loads the session, so it is only looked at when asked for.
+    if PROFILE_PARAMETER in request.GET and getattr(request, "user", None) and request.user.is_staff:
+        return "parameter"
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:  # noqa: S311
+        return "sample"
+    return None
+
+
+def profile_directory() -> Path:
+    return Path(settings.PROFILING_DIR)
+
+
+def frame_label(function: tuple[str, int, str]) -> str:
+    filename, line, name = function
+    label = name if filename == "~" else f"{name} ({Path(filename).name}:{line})"
+    return label.replace(";", ":")
+
+
+def collapsed_stacks(stats: pstats.Stats, min_microseconds: float = 1.0) -> list[str]:
+    """
+    The profile as `frame;frame;... microseconds` lines, the input of flamegraph.pl and speedscope.
+
+    cProfile records how long each function ran under each of its callers,
+    not whole stacks. A function's time under a stack is estimated by
+    splitting it between its callers in proportion to the time spent under
+    each; branches shorter than `min_microseconds` are left out.
+    """
+    entries = stats.stats
+    callees: dict[tuple, dict[tuple, float]] = defaultdict(dict)
+    for function, (*_, callers) in entries.items():
+        for caller, timings in callers.items():
+            callees[caller][function] = timings[3]
+    totals: dict[tuple[str, ...], float] = defaultdict(float)
+
+    def walk(function: tuple, stack: tuple[str, ...], seen: frozenset, share: float) -> None:
+        _, _, own, cumulative, _ = entries[function]
+        if share * cumulative * 1e6 < min_microseconds:
+            return
+        stack = (*stack, frame_label(function))
+        totals[stack] += own * share
+        for callee, under_caller in callees[function].items():
+            # Recursive calls are already counted in the cumulative time of the outer call.
+            if callee not in seen and entries[callee][3]:
+                walk(callee, stack, seen | {callee}, share * under_caller / entries[callee][3])
+
+    for function, (*_, callers) in entries.items():
+        if not callers:
+            walk(function, (), frozenset({function}), 1.0)
+    return [f"{';'.join(stack)} {round(seconds * 1e6)}" for stack, seconds in totals.items() if seconds * 1e6 >= 1]
+
+
+def save_profile(profiler: cProfile.Profile, request: HttpRequest, duration: float, trigger: str) -> str:
+    """Write the pstats, collapsed stacks and metadata of a profiled request; returns the profile's id."""
+    directory = profile_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    created = datetime.now(timezone.utc)
+    # Sortable by time, unique across the worker processes sharing the directory.
+    profile_id = f"{created:%Y%m%dT%H%M%S%f}-{os.getpid()}-{threading.get_ident()}"
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(directory / f"{profile_id}.prof")
+    (directory / f"{profile_id}.collapsed").write_text("\n".join(collapsed_stacks(stats)) + "\n")
+    metadata = {
+        "id": profile_id,
+        "created": created.isoformat(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "view": request.resolver_match.view_name if request.resolver_match else None,
+        "duration_ms": round(duration * 1000, 3),
+        "trigger": trigger,
+    }
+    # Written last: a profile is listed once its metadata exists.
+    (directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+    prune_profiles()
+    return profile_id
+
+
+def prune_profiles() -> None:
+    """Delete the oldest profiles beyond `PROFILING_MAX_PROFILES`."""
+    directory = profile_directory()
+    with ring_lock:
+        profiles = sorted(path.stem for path in directory.glob("*.json"))
+        for profile_id in profiles[: max(0, len(profiles) - settings.PROFILING_MAX_PROFILES)]:
+            for suffix in PROFILE_SUFFIXES:
+                (directory / f"{profile_id}{suffix}").unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict[str, Any]]:
+    """The metadata of the saved profiles, newest first."""
+    directory = profile_directory()
+    profiles = []
+    for path in sorted(directory.glob("*.json"), reverse=True) if directory.is_dir() else []:
+        # Skips profiles pruned by another process meanwhile.
+        with contextlib.suppress(OSError, ValueError):
+            profiles.append(json.loads(path.read_text()))
+    return profiles
@@ -0,0 +1,162 @@
+"""
+The OpenAPI schema of the API, generated by drf-yasg once rather than on every request.
+
+`manage.py generate_schema` writes it to `OPENAPI_SCHEMA_DIR` at build time;
+`schema()` serves those files, or without them and under `DEBUG`, generates
+the schema on its first request and keeps it in memory. It compresses the
+schema once per content coding, and sends each coding with its own strong
+ETag, so `CompressionMiddleware` leaves the response alone.
+
+With `LAZY_LOADING`, app.urls imports this module, and so drf-yasg, on the
+first request for the schema or its UIs rather than on startup.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse
+from django.test import RequestFactory
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from .compression import compress, negotiate_encoding
+from .openapi import QueryParameter
+
+API_INFO = openapi.Info(
+    title="Django Rest API",
+    default_version="v1",
+    description="API documentation for the Django Rest API project",
+    terms_of_service="https://github.com/PawelWywiol/poc-django-rest-api",
+    contact=openapi.Contact(email="poc-django-rest-api@webdev.style"),
+    license=openapi.License(name="MIT License"),
+)
+
+
+def to_parameter(parameter: QueryParameter | openapi.Parameter) -> openapi.Parameter:
+    if not isinstance(parameter, QueryParameter):
+        return parameter
+    return openapi.Parameter(
+        parameter.name,
+        openapi.IN_QUERY,
+        description=parameter.description,
+        required=parameter.required or None,
+        type=parameter.type,
+        format=parameter.format,
+        enum=parameter.enum,
+    )
+
+
+class SchemaGenerator(OpenAPISchemaGenerator):
+    """Builds the drf-yasg parameters of the overrides declared with `app.openapi.schema_overrides`."""
+
+    def get_overrides(self, view: APIView, method: str) -> dict:
+        overrides = super().get_overrides(view, method)
+        if overrides.get("manual_parameters"):
+            overrides["manual_parameters"] = [to_parameter(parameter) for parameter in overrides["manual_parameters"]]
+        return overrides
+
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    generator_class=SchemaGenerator,
+    permission_classes=(permissions.AllowAny,),
+)
+swagger_ui = schema_view.with_ui("swagger", cache_timeout=0)
+redoc_ui = schema_view.with_ui("redoc", cache_timeout=0)
+
+# Format -> (codec, content type); the formats of `api.json/` and `api.yaml/`.
+SCHEMA_FORMATS = {
+    "json": (OpenAPICodecJson, "application/json"),
+    "yaml": (OpenAPICodecYaml, "application/yaml; charset=utf-8"),
+}
+
+# Pre-generated file path, or format generated by this process -> schema.
+loaded: dict[str, bytes] = {}
+loaded_lock = threading.Lock()
+# (key of `loaded`, content coding) -> schema in that coding and its strong ETag.
+encoded: dict[tuple[str, str], tuple[bytes, str]] = {}
+
+
+def generate_schema(schema_format: str) -> bytes:
+    """
+    The schema of every endpoint, in `schema_format`.
+
+    It is generated for a mock request: views read the request while being
+    introspected. Unlike drf-yasg's own view, it has no host unless
+    `SWAGGER_SETTINGS["DEFAULT_API_URL"]` sets one, so that clients use the
+    host serving it.
+    """
+    generator = schema_view.generator_class(API_INFO, url=swagger_settings.DEFAULT_API_URL or "")
+    request = APIView().initialize_request(RequestFactory().get(f"/api.{schema_format}/"))
+    codec_class, _ = SCHEMA_FORMATS[schema_format]
+    return codec_class(validators=[]).encode(generator.get_schema(request=request, public=True))
+
+
+def schema_path(schema_format: str) -> Path:
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f"openapi.{schema_format}"
+
+
+def schema_key(schema_format: str) -> str:
+    """The key of the schema in `loaded`: the pre-generated file outside `DEBUG`, otherwise the format."""
+    path = schema_path(schema_format)
+    return str(path) if not settings.DEBUG and path.is_file() else schema_format
+
+
+def load_schema(schema_format: str) -> bytes:
+    """The pre-generated schema outside `DEBUG`, otherwise the one generated by this process, generating it once."""
+    key = schema_key(schema_format)
+    if key not in loaded:
+        with loaded_lock:
+            if key not in loaded:
+                loaded[key] = (
+                    generate_schema(schema_format) if key == schema_format else schema_path(schema_format).read_bytes()
+                )
+    return loaded[key]
+
+
+def encode_schema(schema_format: str, encoding: str | None) -> tuple[bytes, str]:
+    """The schema compressed with `encoding`, or not without one, and its strong ETag; each is computed once."""
+    key = (schema_key(schema_format), encoding or "identity")
+    if key not in encoded:
+        content = load_schema(schema_format)
+        if encoding is not None:
+            content = compress(content, encoding, best=True)
+        encoded.setdefault(key, (content, f'"{hashlib.sha256(content).hexdigest()}"'))
+    return encoded[key]
+
+
+def schema(request: HttpRequest, schema_format: str) -> HttpResponse:
+    """
+    The OpenAPI schema as JSON or YAML; cached for `OPENAPI_SCHEMA_MAX_AGE` outside `DEBUG`.
+
+    With `COMPRESSION_ENABLED`, it is sent in the preferred content coding of
+    the request, with the strong ETag of those bytes.
+    """
+    if schema_format not in SCHEMA_FORMATS:
+        raise Http404
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", "")) if settings.COMPRESSION_ENABLED else None
+    content, etag = encode_schema(schema_format, encoding)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=SCHEMA_FORMATS[schema_format][1])
+        if encoding is not None:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    if settings.COMPRESSION_ENABLED:
+        patch_vary_headers(response, ("Accept-Encoding",))
+    if settings.DEBUG:
+        patch_cache_control(response, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
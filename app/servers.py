@@ -0,0 +1,170 @@
+"""
+Minimal servers for `app.wsgi` and `app.asgi`, used by `manage.py loadtest_servers`.
+
+Each worker process serves the listening socket inherited from its parent as
+file descriptor `--fd`, so several workers share one port like gunicorn's or
+uvicorn's. Run as `python -m app.servers {wsgi,asgi} --fd N`; it prints
+`ready` once it accepts connections.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import sys
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+if TYPE_CHECKING:
+    from django.core.handlers.asgi import ASGIHandler
+
+
+def serve_wsgi(sock: socket.socket) -> None:
+    """Serve `app.wsgi` with Django's threaded HTTP/1.1 server, a thread per connection."""
+    from app.wsgi import application  # noqa: PLC0415
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+            pass
+
+    class Server(ThreadedWSGIServer):
+        def get_request(self) -> tuple[socket.socket, tuple]:
+            connection, address = super().get_request()
+            # The headers and body are written separately: without this, Nagle's algorithm holds the body back
+            # until the client's delayed ACK, some 40 ms later.
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return connection, address
+
+    server = Server(sock.getsockname(), QuietHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    # Done by `server_bind()` otherwise.
+    server.server_name, server.server_port = sock.getsockname()[:2]
+    server.setup_environ()
+    server.set_app(application)
+    print("ready", flush=True)  # noqa: T201
+    server.serve_forever()
+
+
+async def handle_asgi(application: ASGIHandler, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve the HTTP/1.1 requests of one keep-alive connection with `application`."""
+    server = writer.get_extra_info("sockname")
+    client = writer.get_extra_info("peername")
+    try:
+        while request_line := await reader.readline():
+            method, target, version = request_line.decode("latin-1").split()
+            headers = []
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.partition(b":")
+                headers.append((name.strip().lower(), value.strip()))
+            header_values = dict(headers)
+            length = int(header_values.get(b"content-length", 0))
+            body = await reader.readexactly(length) if length else b""
+            keep_alive = version == "HTTP/1.1" and header_values.get(b"connection", b"").lower() != b"close"
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": version.removeprefix("HTTP/"),
+                "method": method,
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query.encode(),
+                "root_path": "",
+                "headers": headers,
+                "client": client[:2],
+                "server": server[:2],
+            }
+            await respond(application, scope, body, writer, keep_alive=keep_alive)
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+def response_head(start: dict, length: int | None, *, keep_alive: bool) -> bytes:
+    """The status line and headers of an `http.response.start` message, adding how the body is delimited."""
+    headers = list(start.get("headers", []))
+    if not any(name.lower() == b"content-length" for name, _ in headers):
+        headers.append((b"transfer-encoding", b"chunked") if length is None else (b"content-length", b"%d" % length))
+    headers.append((b"connection", b"keep-alive" if keep_alive else b"close"))
+    lines = [f"HTTP/1.1 {start['status']} {HTTPStatus(start['status']).phrase}".encode()]
+    lines += [name + b": " + value for name, value in headers]
+    return b"\r\n".join(lines) + b"\r\n\r\n"
+
+
+async def respond(
+    application: ASGIHandler,
+    scope: dict,
+    body: bytes,
+    writer: asyncio.StreamWriter,
+    *,
+    keep_alive: bool,
+) -> None:
+    """Run `application` for one request and write its response, chunked when its length is not known upfront."""
+    received = False
+    start: dict = {}
+    chunked = False
+
+    async def receive() -> dict:
+        nonlocal received
+        if received:
+            # The client never disconnects mid-request here.
+            await asyncio.Future()
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal chunked
+        if message["type"] == "http.response.start":
+            start.update(message)
+            return
+        content = message.get("body", b"")
+        more = message.get("more_body", False)
+        if start:
+            # The first body message: its length is known if it is the only one.
+            chunked = more and not any(name.lower() == b"content-length" for name, _ in start.get("headers", []))
+            writer.write(response_head(start, None if more else len(content), keep_alive=keep_alive))
+            start.clear()
+        if chunked:
+            if content:
+                writer.write(b"%x\r\n%s\r\n" % (len(content), content))
+            if not more:
+                writer.write(b"0\r\n\r\n")
+        else:
+            writer.write(content)
+        await writer.drain()
+
+    await application(scope, receive, send)
+
+
+def serve_asgi(sock: socket.socket) -> None:
+    """Serve `app.asgi` from an asyncio event loop."""
+    from app.asgi import application  # noqa: PLC0415
+
+    async def main() -> None:
+        server = await asyncio.start_server(lambda r, w: handle_asgi(application, r, w), sock=sock)
+        print("ready", flush=True)  # noqa: T201
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("interface", choices=("wsgi", "asgi"))
+    parser.add_argument("--fd", type=int, required=True, help="Listening socket inherited from the parent.")
+    args = parser.parse_args(argv)
+    sock = socket.socket(fileno=args.fd)
+    # The applications are imported by the serve functions, so that app.asgi sets its environment first.
+    (serve_wsgi if args.interface == "wsgi" else serve_asgi)(sock)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import ipaddress
 import os
 from pathlib import Path
 
@@ -31,13 +32,21 @@ SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DJANGO_DEBUG", "false").lower() == "true"
 
+# Serve the API from the async views (see users.mixins.AsyncViewMixin); app/asgi.py turns this on by default.
+ASYNC_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "false").lower() == "true"
+
+# Import drf-yasg and discover the admin's modules on the first request for the docs or the admin,
+# rather than on the startup of every worker (see app.urls).
+LAZY_LOADING = os.getenv("DJANGO_LAZY_LOADING", "false").lower() == "true"
+
 ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 
 
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # SimpleAdminConfig leaves discovering the admin modules to app.admin_urls.
+    "django.contrib.admin.apps.SimpleAdminConfig" if LAZY_LOADING else "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -49,6 +58,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.middleware.MetricsMiddleware",
+    "app.middleware.QueryInspectorMiddleware",
+    "app.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -56,6 +68,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "app.db.middleware.ReplicaRoutingMiddleware",
+    "app.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -63,7 +77,7 @@ ROOT_URLCONF = "app.urls"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
+        "DIRS": [BASE_DIR / "app" / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -90,6 +104,49 @@ DATABASES = {
         "PASSWORD": os.getenv("DATABASE_PASSWORD"),
         "HOST": os.getenv("DATABASE_HOST"),
         "PORT": os.getenv("DATABASE_PORT"),
+        # Persistent connections, reused by the requests of a thread for up to CONN_MAX_AGE seconds.
+        "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.getenv("DATABASE_CONN_HEALTH_CHECKS", "true").lower() == "true",
+        # Used by the pooled backends (DATABASE_ENGINE=app.db.backends.postgresql), see app.db.pool.
+        "POOL": {
+            "MAX_SIZE": int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+            "TIMEOUT": float(os.getenv("DATABASE_POOL_TIMEOUT", "5")),
+            "MAX_LIFETIME": float(os.getenv("DATABASE_POOL_MAX_LIFETIME", "1800")),
+        },
+    },
+}
+
+# Read replicas of `default` as "alias:weight,..." (weight 1 when omitted). Each one is configured like
+# `default`, with DATABASE_<ALIAS>_NAME, _USER, _PASSWORD, _HOST and _PORT overriding its values.
+DATABASE_REPLICAS = {}
+for replica in filter(None, os.getenv("DATABASE_REPLICAS", "").replace(" ", "").split(",")):
+    alias, _, weight = replica.partition(":")
+    DATABASE_REPLICAS[alias] = int(weight or "1")
+    prefix = f"DATABASE_{alias.upper()}_"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        **{
+            field: os.environ[prefix + field]
+            for field in ("NAME", "USER", "PASSWORD", "HOST", "PORT")
+            if prefix + field in os.environ
+        },
+        # Tests read replicas through the test database of `default`.
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["app.db.routers.ReplicaRouter"]
+# Seconds a client's reads stay on the primary after it writes.
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "10"))
+# Seconds between health checks of a replica; failing replicas get no reads until they pass one.
+DATABASE_REPLICA_CHECK_INTERVAL = float(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "5"))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     },
 }
 
@@ -135,16 +192,98 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# API renderers: "production" renders JSON only, "development" adds DRF's browsable API.
+API_RENDERER_PROFILE = os.getenv("API_RENDERER_PROFILE") or ("development" if DEBUG else "production")
+API_RENDERER_PROFILES = {
+    "production": ["users.renderers.FastJSONRenderer"],
+    "development": ["users.renderers.FastJSONRenderer", "rest_framework.renderers.BrowsableAPIRenderer"],
+}
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    "DEFAULT_RENDERER_CLASSES": API_RENDERER_PROFILES[API_RENDERER_PROFILE],
+    "DEFAULT_PARSER_CLASSES": [
+        "users.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
 }
 
+# Users API settings
+USERS_BULK_MAX_ITEMS = int(os.getenv("USERS_BULK_MAX_ITEMS", "10000"))
+USERS_BULK_BATCH_SIZE = int(os.getenv("USERS_BULK_BATCH_SIZE", "1000"))
+USERS_EXPORT_CHUNK_SIZE = int(os.getenv("USERS_EXPORT_CHUNK_SIZE", "2000"))
+USERS_IMPORT_CHUNK_SIZE = int(os.getenv("USERS_IMPORT_CHUNK_SIZE", "10000"))
+# Cache alias and timeout (seconds) of cached user/address reads; a timeout of 0 disables the cache.
+USERS_RESPONSE_CACHE_ALIAS = os.getenv("USERS_RESPONSE_CACHE_ALIAS", "default")
+USERS_RESPONSE_CACHE_TIMEOUT = int(os.getenv("USERS_RESPONSE_CACHE_TIMEOUT", "300"))
+# Admin changelists estimated to hold at least this many rows show the planner's estimate instead of a COUNT(*).
+USERS_ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("USERS_ADMIN_EXACT_COUNT_LIMIT", "10000"))
+
+# Directory shared by the worker processes for /metrics/; empty to report this process only.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+# Seconds between writes of a worker's metrics to METRICS_DIR.
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+# Comma-separated addresses or CIDR networks allowed to read /metrics/ without a token.
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network, strict=False)
+    for network in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1,::1").replace(" ", "").split(",")
+    if network
+]
+# Bearer token letting other clients read /metrics/; empty to only allow METRICS_ALLOWED_NETWORKS.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Query inspector: "off", "log" N+1 and slow queries, or also "raise" on N+1 (the test runner's default).
+QUERY_INSPECTOR = os.getenv("QUERY_INSPECTOR", "off")
+# Times a query shape may run in one request before it is reported as N+1.
+QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD", "5"))
+# Queries taking at least this many milliseconds are reported with their EXPLAIN plan.
+QUERY_INSPECTOR_SLOW_QUERY_MS = float(os.getenv("QUERY_INSPECTOR_SLOW_QUERY_MS", "100"))
+# Comma-separated fnmatch patterns of known N+1 call sites ("path:line in function") not to report.
+QUERY_INSPECTOR_IGNORE = [pattern for pattern in os.getenv("QUERY_INSPECTOR_IGNORE", "").split(",") if pattern]
+
+TEST_RUNNER = "app.testing.TestRunner"
+
+# Request profiling; when disabled, ProfilingMiddleware is left out of the middleware chain.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Share of requests profiled without being asked to, e.g. 0.001.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+# Directory of the saved profiles, of which the newest PROFILING_MAX_PROFILES are kept.
+PROFILING_DIR = os.getenv("PROFILING_DIR") or str(BASE_DIR / "profiles")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+# Seconds an X-Profile token from `manage.py profile_token` stays valid.
+PROFILING_TOKEN_MAX_AGE = int(os.getenv("PROFILING_TOKEN_MAX_AGE", "3600"))
+
+# Response compression (brotli when installed, else gzip) of API responses of at least COMPRESSION_MIN_SIZE bytes.
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Brotli's default of 11 is too slow for responses built per request.
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_CONTENT_TYPES = [
+    "application/json",
+    "application/vnd.columnar+json",
+    "application/msgpack",
+    "application/x-ndjson",
+    "text/csv",
+    "application/yaml",
+]
+
 # Swagger/drf-yasg settings
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {"basic": {"type": "basic"}},
+    # The UIs load the schema from app.schema rather than generating it on each visit.
+    "SPEC_URL": ("schema-json", {"schema_format": "json"}),
+}
+REDOC_SETTINGS = {
+    "SPEC_URL": ("schema-json", {"schema_format": "json"}),
 }
+# Directory of the schema files written by `manage.py generate_schema`, served outside DEBUG.
+OPENAPI_SCHEMA_DIR = os.getenv("OPENAPI_SCHEMA_DIR") or str(BASE_DIR / "schema")
+# Seconds clients and proxies may cache the schema for, outside DEBUG.
+OPENAPI_SCHEMA_MAX_AGE = int(os.getenv("OPENAPI_SCHEMA_MAX_AGE", "86400"))
@@ -0,0 +1,100 @@
+"""
+The cold start of a worker process: how long it takes, what it imports and the memory it holds.
+
+Each worker is a fresh interpreter run with `-X importtime`, which imports
+the WSGI or ASGI entry point and loads the URLconf, as Django does on a
+worker's first request (see `manage.py startup_profile`).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+WORKER_SCRIPT = """
+import json, resource, sys
+import {entry_point}
+from django.urls import get_resolver
+get_resolver().resolve({path!r})
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "max_rss_kib": max_rss // 1024 if sys.platform == "darwin" else max_rss,
+    "modules": sorted(sys.modules),
+}}))
+"""
+
+
+def parse_importtime(output: str) -> dict[str, int]:
+    """
+    Module -> microseconds spent importing it, leaving out its imports, from the `-X importtime` output.
+
+    Modules imported with `importlib.import_module`, such as the URLconf,
+    are missing from it; the modules they import are not.
+    """
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, module = line.removeprefix("import time:").split("|")
+        if own.strip().isdigit():
+            timings[module.strip()] = int(own)
+    return timings
+
+
+def package_name(module: str) -> str:
+    """The distribution-level package of `module`, telling Django's contrib apps apart."""
+    parts = module.split(".")
+    return ".".join(parts[: 3 if parts[:2] == ["django", "contrib"] else 1])
+
+
+def start_worker(entry_point: str, path: str, environment: dict[str, str]) -> dict:
+    """Start a worker importing `entry_point` and resolving `path`, in a fresh interpreter; returns what it cost."""
+    script = WORKER_SCRIPT.format(entry_point=entry_point, path=path)
+    started = time.perf_counter()
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "app.settings", **environment},
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    seconds = time.perf_counter() - started
+    if process.returncode:
+        msg = f"{entry_point} worker exited with {process.returncode}: {process.stderr.splitlines()[-1:]}"
+        raise RuntimeError(msg)
+    return {"seconds": seconds, "imports": parse_importtime(process.stderr), **json.loads(process.stdout)}
+
+
+def profile_startup(entry_point: str, path: str, *, lazy_loading: bool, repeat: int) -> tuple[dict, dict[str, int]]:
+    """
+    The median cold start of `repeat` workers with or without `LAZY_LOADING`, and the import times of the last one.
+
+    A first worker, not measured, warms the bytecode and file system caches.
+    """
+    environment = {"DJANGO_LAZY_LOADING": str(lazy_loading).lower()}
+    workers = [start_worker(entry_point, path, environment) for _ in range(repeat + 1)][1:]
+    row = {
+        "mode": "lazy loading" if lazy_loading else "eager",
+        "startup_ms": round(statistics.median(worker["seconds"] for worker in workers) * 1000, 1),
+        "imports_ms": round(statistics.median(sum(worker["imports"].values()) for worker in workers) / 1000, 1),
+        "max_rss_mib": round(statistics.median(worker["max_rss_kib"] for worker in workers) / 1024, 1),
+        "modules": len(workers[-1]["modules"]),
+    }
+    return row, workers[-1]["imports"]
+
+
+def imported_only_by(imports: dict[str, int], others: dict[str, int]) -> dict[str, int]:
+    """Package -> microseconds spent importing its modules in `imports` but not in `others`, slowest first."""
+    packages = defaultdict(int)
+    for module, microseconds in imports.items():
+        if module not in others:
+            packages[package_name(module)] += microseconds
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
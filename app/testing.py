@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+from django.test.runner import DiscoverRunner
+
+# Stand-ins for replicas of `default`, for tests of app.db.routers. Unlike replicas configured through
+# DATABASE_REPLICAS they do not mirror `default`: each gets a separate test database, so that tests can
+# tell which database answered.
+TEST_REPLICAS = ("replica1", "replica2")
+
+
+def replica_test_settings(default: dict, alias: str, vendor: str) -> dict:
+    """
+    The settings of the `alias` stand-in replica of the `default` database settings.
+
+    Its test database is named after `alias`, so that its test_db_signature() differs from that of
+    `default`; otherwise Django would treat it as the same database and never create it. SQLite's
+    in-memory test databases already differ per alias, so they stay in memory.
+    """
+    name = default["TEST"].get("NAME")
+    if name is None and vendor != "sqlite":
+        name = TEST_DATABASE_PREFIX + default["NAME"]
+    return {**default, "TEST": {**default["TEST"], "NAME": name and f"{name}_{alias}", "MIRROR": None}}
+
+
+class TestRunner(DiscoverRunner):
+    """
+    The default test runner, failing requests that run N+1 queries (see `QueryInspectorMiddleware`).
+
+    It also configures the `TEST_REPLICAS` databases; they are only created for test cases listing them in
+    `databases`.
+    """
+
+    def setup_test_environment(self, **kwargs: Any) -> None:  # noqa: ANN401
+        super().setup_test_environment(**kwargs)
+        self.query_inspector = settings.QUERY_INSPECTOR
+        settings.QUERY_INSPECTOR = "raise"
+
+    def teardown_test_environment(self, **kwargs: Any) -> None:  # noqa: ANN401
+        settings.QUERY_INSPECTOR = self.query_inspector
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs: Any) -> list:  # noqa: ANN401
+        default = connections.settings[DEFAULT_DB_ALIAS]
+        vendor = connections[DEFAULT_DB_ALIAS].vendor
+        for alias in TEST_REPLICAS:
+            connections.settings.setdefault(alias, replica_test_settings(default, alias, vendor))
+        return super().setup_databases(**kwargs)
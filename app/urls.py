@@ -15,32 +15,85 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
-from django.urls import include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
-
-from .views import health_check
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Django Rest API",
-        default_version="v1",
-        description="API documentation for the Django Rest API project",
-        terms_of_service="https://github.com/PawelWywiol/poc-django-rest-api",
-        contact=openapi.Contact(email="poc-django-rest-api@webdev.style"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
-urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"),
-    path("api/", schema_view.with_ui("swagger", cache_timeout=0), name="schema-swagger-ui"),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
-    path("health/", health_check, name="health-check"),
-    path("", include("users.urls")),
-]
+from typing import Callable
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.urls import URLResolver, include, path
+from django.urls.resolvers import RoutePattern
+from django.utils.module_loading import import_string
+
+from users.urls import get_urlpatterns as get_users_urlpatterns
+
+from .views import async_health_check, health_check, metrics
+
+
+def lazy_view(dotted_path: str) -> Callable[..., HttpResponse]:
+    """The view at `dotted_path`, imported on its first request rather than with the URLconf."""
+
+    def view(request: HttpRequest, *args: object, **kwargs: object) -> HttpResponse:
+        return import_string(dotted_path)(request, *args, **kwargs)
+
+    return view
+
+
+class LazyURLResolver(URLResolver):
+    """
+    A resolver of a namespaced URLconf module, imported on the first request under its route or reverse into it.
+
+    Django populates every resolver on the first reverse of any URL; this one
+    is left out until its module is imported, which its namespace does not need.
+    Reversing into the namespace reads `url_patterns`, which imports it. This
+    overrides the private `URLResolver._populate()`, which LazyLoadingTest pins.
+    """
+
+    def _populate(self) -> None:
+        if "urlconf_module" in self.__dict__:
+            super()._populate()
+
+
+def lazy_include(route: str, urlconf_module: str, namespace: str) -> URLResolver:
+    """`path(route, include(urlconf_module))` for a namespaced module, imported on first use rather than right away."""
+    return LazyURLResolver(
+        RoutePattern(route, is_endpoint=False),
+        urlconf_module,
+        app_name=namespace,
+        namespace=namespace,
+    )
+
+
+def get_urlpatterns(*, async_views: bool = False, lazy_loading: bool = False) -> list:
+    """
+    The project routes, with the async health check and users API when `async_views` is set.
+
+    With `lazy_loading`, the docs and the admin, and the modules they import,
+    are loaded on their first request.
+    """
+    view = lazy_view if lazy_loading else import_string
+    return [
+        path("admin/profiles/", view("app.admin_urls.profiles_view"), name="admin-profiles"),
+        path(
+            "admin/profiles/<slug:profile_id>.<slug:kind>",
+            view("app.admin_urls.profile_file_view"),
+            name="admin-profile-file",
+        ),
+        lazy_include("admin/", "app.admin_urls", "admin")
+        if lazy_loading
+        else path("admin/", include("app.admin_urls")),
+        path("api.<str:schema_format>/", view("app.schema.schema"), name="schema-json"),
+        path("api/", view("app.schema.swagger_ui"), name="schema-swagger-ui"),
+        path("redoc/", view("app.schema.redoc_ui"), name="schema-redoc"),
+        path("health/", async_health_check if async_views else health_check, name="health-check"),
+        path("metrics/", metrics, name="metrics"),
+        path("", include(get_users_urlpatterns(async_views=async_views))),
+    ]
+
+
+urlpatterns = get_urlpatterns(async_views=settings.ASYNC_VIEWS, lazy_loading=settings.LAZY_LOADING)
+
+
+class URLConf:
+    """A `ROOT_URLCONF` serving the sync or the async views whatever `ASYNC_VIEWS` says, e.g. in tests."""
+
+    def __init__(self, *, async_views: bool, lazy_loading: bool = False) -> None:
+        self.urlpatterns = get_urlpatterns(async_views=async_views, lazy_loading=lazy_loading)
@@ -1,25 +1,45 @@
+import ipaddress
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
 from django.db import connection
 from django.db.utils import DatabaseError
-from drf_yasg.utils import swagger_auto_schema
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse
+from django.template.response import TemplateResponse
+from django.utils.crypto import constant_time_compare
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from app.db.pool import pool_stats
+from app.db.routers import get_replicas
+from app.metrics import render_metrics
+from app.openapi import schema_overrides
+from app.profiling import list_profiles, profile_directory
+from users.mixins import AsyncViewMixin
 
-@swagger_auto_schema(
-    method="get",
-    operation_summary="Health check",
-    operation_description="Check the health status of the application and database connectivity",
-    responses={
+health_check_schema = {
+    "operation_summary": "Health check",
+    "operation_description": "Check the health status of the application and database connectivity",
+    "responses": {
         200: "Application is healthy",
         503: "Application is unhealthy",
     },
-)
-@api_view(["GET"])
-def health_check(request: Request) -> Response:  # noqa: ARG001
+}
+
+
+def check_health() -> Response:
     """
-    Health check endpoint that verifies database connectivity.
+    Verify database connectivity.
+
+    With a pooled database backend (see app.db.pool), the database check
+    also reports the pool's statistics. Read replicas are checked too, and
+    ejected from reads while down (see app.db.routers); reads fall back to
+    the primary, so a replica being down does not make the application DOWN.
 
     Returns:
         Response with status "UP" or "DOWN" and detailed checks
@@ -38,12 +58,26 @@ def health_check(request: Request) -> Response:  # noqa: ARG001
         overall_status = "DOWN"
         response_status = status.HTTP_503_SERVICE_UNAVAILABLE
 
-    checks.append(
-        {
-            "name": "databaseReady",
-            "status": db_status,
-        },
-    )
+    db_check = {
+        "name": "databaseReady",
+        "status": db_status,
+    }
+    pool = pool_stats().get(connection.alias)
+    if pool is not None:
+        db_check["pool"] = pool
+    checks.append(db_check)
+
+    if settings.DATABASE_REPLICAS:
+        replicas = get_replicas()
+        replicas.refresh(force=True)
+        replica_status = {alias: "UP" if healthy else "DOWN" for alias, healthy in replicas.status().items()}
+        checks.append(
+            {
+                "name": "databaseReplicas",
+                "status": "UP" if set(replica_status.values()) == {"UP"} else "DOWN",
+                "replicas": replica_status,
+            },
+        )
 
     return Response(
         {
@@ -52,3 +86,62 @@ def health_check(request: Request) -> Response:  # noqa: ARG001
         },
         status=response_status,
     )
+
+
+@schema_overrides(method="get", **health_check_schema)
+@api_view(["GET"])
+def health_check(request: Request) -> Response:  # noqa: ARG001
+    """Health check endpoint that verifies database connectivity."""
+    return check_health()
+
+
+class AsyncHealthCheckView(AsyncViewMixin, APIView):
+    """`health_check` for the ASGI entry point; Django has no async database cursor, so the check runs in a thread."""
+
+    @schema_overrides(**health_check_schema)
+    def get(self, request: Request) -> Response:  # noqa: ARG002
+        return check_health()
+
+    async def aget(self, request: Request) -> Response:  # noqa: ARG002
+        return await sync_to_async(check_health)()
+
+
+async_health_check = AsyncHealthCheckView.as_view()
+
+
+def can_read_metrics(request: HttpRequest) -> bool:
+    """Whether `request` comes from `METRICS_ALLOWED_NETWORKS` or sends `Authorization: Bearer <METRICS_TOKEN>`."""
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in network for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Request, SQL and connection pool metrics of every worker in the Prometheus text format (see app.metrics)."""
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def profiles(request: HttpRequest) -> TemplateResponse:
+    """Admin page listing the saved request profiles (see app.profiling)."""
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "profiles": list_profiles(),
+        "max_profiles": settings.PROFILING_MAX_PROFILES,
+    }
+    return TemplateResponse(request, "admin/profiles.html", context)
+
+
+def profile_file(request: HttpRequest, profile_id: str, kind: str) -> FileResponse:  # noqa: ARG001
+    """Download the pstats (`prof`) or collapsed stacks (`collapsed`) of a saved profile."""
+    path = profile_directory() / f"{profile_id}.{kind}"
+    if kind not in {"prof", "collapsed"} or not path.is_file():
+        raise Http404
+    return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
@@ -1,28 +1,138 @@
-from typing import ClassVar
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable, ClassVar
 
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Max, Min, QuerySet
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from app.db.inspector import expected_repeats
 
 from .models import User, UserAddress
+from .pagination import EstimatedCountPaginator
+from .search import search_addresses, search_users
+
+if TYPE_CHECKING:
+    from django.http import HttpRequest
+
+
+def period_bounds(first: datetime, last: datetime, kind: str) -> list[datetime]:
+    """Starts of the years, months or days (`kind`) from the one holding `first` to the one after `last`."""
+    if kind == "day":
+        days = (last.date() - first.date()).days
+        return [datetime.combine(first.date() + timedelta(days=offset), time()) for offset in range(days + 2)]
+    if kind == "month":
+        months = range(first.year * 12 + first.month - 1, last.year * 12 + last.month + 1)
+        return [datetime(month // 12, month % 12 + 1, 1) for month in months]  # noqa: DTZ001
+    return [datetime(year, 1, 1) for year in range(first.year, last.year + 2)]  # noqa: DTZ001
+
+
+class ProbedDatesQuerySet(QuerySet):
+    """
+    `datetimes()` answered by index probes instead of a `DISTINCT` over every row.
+
+    The admin date hierarchy lists the years, months or days holding rows. The
+    range comes from `MIN()`/`MAX()`, each read from one end of an index on the
+    field, and every period in it is checked with an `EXISTS` range probe: at
+    most 31 per drill-down level, however many rows there are.
+    """
+
+    def datetimes(self, field_name: str, kind: str, order: str = "ASC", **kwargs: Any) -> list[datetime]:  # noqa: ANN401, ARG002
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds["first"] is None:
+            return []
+        first, last = (timezone.localtime(bounds[name]).replace(tzinfo=None) for name in ("first", "last"))
+        starts = [timezone.make_aware(start) for start in period_bounds(first, last, kind)]
+        with expected_repeats():
+            found = [
+                start
+                for start, end in zip(starts, starts[1:])
+                if self.filter(**{f"{field_name}__gte": start, f"{field_name}__lt": end}).exists()
+            ]
+        return found if order == "ASC" else found[::-1]
+
+
+@cache
+def probed_dates_class(queryset_class: type[QuerySet]) -> type[QuerySet]:
+    return type(f"ProbedDates{queryset_class.__name__}", (ProbedDatesQuerySet, queryset_class), {})
+
+
+class HighVolumeChangeList(ChangeList):
+    """Changelist whose queryset answers the date hierarchy through `ProbedDatesQuerySet`."""
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        queryset = super().get_queryset(request)
+        queryset.__class__ = probed_dates_class(type(queryset))
+        return queryset
+
+
+class HighVolumeAdminMixin:
+    """
+    Changelist settings for tables too large to count or scan on every page view.
+
+    The paginator shows the planner's row estimate for large results (see
+    `EstimatedCountPaginator`), the unfiltered total is not counted, and the
+    date hierarchy probes its field's index (see `ProbedDatesQuerySet`).
+    `list_select_related`, `date_hierarchy` and the relation widgets are set
+    per admin.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request: HttpRequest, **kwargs: Any) -> type[ChangeList]:  # noqa: ANN401, ARG002
+        return HighVolumeChangeList
+
+
+class IndexedSearchMixin:
+    """
+    Search the changelist with `search_function` (see users.search) instead of `icontains` over `search_fields`.
+
+    `search_fields` still has to be set for the search box to be shown.
+    """
+
+    search_function: Callable[[QuerySet, str], QuerySet]
+
+    def get_search_results(self, request: HttpRequest, queryset: QuerySet, search_term: str) -> tuple[QuerySet, bool]:  # noqa: ARG002
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return self.search_function(queryset, search_term), False
 
 
 class UserAddressInline(admin.TabularInline):
+    """The user's `max_addresses` latest addresses; the full history is linked from the user form."""
+
     model = UserAddress
     extra = 0
+    max_addresses = 20
     fields = ("address_type", "valid_from", "street", "building_number", "post_code", "city", "country_code")
     readonly_fields = ("created_at", "updated_at")
 
+    def get_queryset(self, request: HttpRequest) -> QuerySet[UserAddress]:
+        queryset = super().get_queryset(request).most_recent(self.max_addresses).order_by("-valid_from", "-id")
+        # Each row's `__str__` reads its user.
+        return queryset.select_related("user")
+
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(HighVolumeAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("id", "first_name", "last_name", "email", "status", "created_at")
     list_filter = ("status", "created_at", "updated_at")
+    date_hierarchy = "created_at"
     search_fields = ("first_name", "last_name", "email", "initials")
-    readonly_fields = ("created_at", "updated_at")
+    search_function = staticmethod(search_users)
+    readonly_fields = ("all_addresses", "created_at", "updated_at")
     fieldsets = (
         (
             None,
             {
-                "fields": ("first_name", "last_name", "initials", "email", "status"),
+                "fields": ("first_name", "last_name", "initials", "email", "status", "all_addresses"),
             },
         ),
         (
@@ -36,12 +146,23 @@ class UserAdmin(admin.ModelAdmin):
     inlines: ClassVar[list[UserAddressInline]] = [UserAddressInline]
     ordering = ("-created_at",)
 
+    @admin.display(description="Address history")
+    def all_addresses(self, obj: User) -> str:
+        if obj.pk is None:
+            return "-"
+        url = reverse("admin:users_useraddress_changelist")
+        return format_html('<a href="{}?user__id__exact={}">All addresses</a>', url, obj.pk)
+
 
 @admin.register(UserAddress)
-class UserAddressAdmin(admin.ModelAdmin):
+class UserAddressAdmin(HighVolumeAdminMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ("id", "user", "address_type", "street", "building_number", "city", "country_code", "valid_from")
+    list_select_related = ("user",)
     list_filter = ("address_type", "country_code", "valid_from", "created_at")
+    date_hierarchy = "created_at"
+    autocomplete_fields = ("user",)
     search_fields = ("user__first_name", "user__last_name", "user__email", "street", "city")
+    search_function = staticmethod(search_addresses)
     readonly_fields = ("created_at", "updated_at")
     fieldsets = (
         (
@@ -5,3 +5,7 @@ class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
     verbose_name = "Users Management"
+
+    def ready(self) -> None:
+        # Connects the response cache invalidation and search index receivers.
+        from . import cache, search  # noqa: F401, PLC0415
@@ -0,0 +1,621 @@
+from __future__ import annotations
+
+import gzip
+import itertools
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import Client
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from app.compression import brotli
+
+from .export import EXPORT_FORMATS, export_users
+from .models import User, UserAddress
+from .pagination import KeysetPagination, UserKeysetPagination, UserPagination
+from .parsers import FastJSONParser
+from .renderers import (
+    ColumnarJSONRenderer,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    from_columns,
+    msgpack,
+    orjson,
+)
+from .search import USER_SEARCH_FIELDS, contains_all, search_users
+from .serializers import UserSerializer, UserValuesSerializer
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from django.db.models import QuerySet
+
+
+@dataclass
+class BenchmarkOptions:
+    users: int = 25_000
+    addresses: int = 1
+    repeat: int = 20
+    # Zipf exponent of the addresses per user; 0 gives every user `addresses` addresses.
+    skew: float = 0.0
+
+
+@contextmanager
+def benchmark_database() -> Iterator[None]:
+    """Run the block against a throwaway test database, never the configured one."""
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+    try:
+        # Scenarios measure the uncached read path unless they enable the response cache themselves.
+        with override_settings(USERS_RESPONSE_CACHE_TIMEOUT=0):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def address_counts(users: int, addresses: int, skew: float = 0.0) -> list[int]:
+    """
+    Addresses of each of `users` users, `addresses` on average, following a Zipf law of exponent `skew`.
+
+    The counts add up to `users * addresses` and are shuffled with a fixed
+    seed, so that heavy users are spread over the table the same way each run.
+    """
+    if not skew:
+        return [addresses] * users
+    weights = [(rank + 1) ** -skew for rank in range(users)]
+    scale = users * addresses / sum(weights)
+    bounds = [round(total * scale) for total in itertools.accumulate(weights, initial=0)]
+    counts = [end - start for start, end in zip(bounds, bounds[1:])]
+    random.Random(0).shuffle(counts)  # noqa: S311
+    return counts
+
+
+def seed_users(users: int, addresses: int = 0, batch_size: int = 2_000, skew: float = 0.0) -> None:
+    address_types = [code for code, _ in UserAddress.ADDRESS_TYPE_CHOICES]
+    counts = address_counts(users, addresses, skew)
+    now = timezone.now()
+    for start in range(0, users, batch_size):
+        created = User.objects.bulk_create(
+            User(first_name="Bench", last_name=f"User{i}", email=f"user{i}@bench.example.com")
+            for i in range(start, min(start + batch_size, users))
+        )
+        UserAddress.objects.bulk_create(
+            (
+                UserAddress(
+                    user=user,
+                    address_type=address_types[i % len(address_types)],
+                    valid_from=now - timedelta(days=i),
+                    post_code="12345",
+                    city="Bench City",
+                    country_code="USA",
+                    street="Bench Street",
+                    building_number=str(i),
+                )
+                for user, count in zip(created, counts[start:])
+                for i in range(count)
+            ),
+            batch_size=batch_size,
+        )
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """Call `func` `repeat` times; returns latency and database statistics in milliseconds."""
+    timings = []
+    db_timings = []
+    queries = 0
+
+    def timed_execute(execute: Callable, sql: str, params: object, many: bool, context: dict) -> object:  # noqa: FBT001
+        nonlocal queries
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            db_timings[-1] += time.perf_counter() - start
+            queries += 1
+
+    func()  # Warm up caches and lazily compiled code paths.
+    with connection.execute_wrapper(timed_execute):
+        for _ in range(repeat):
+            db_timings.append(0.0)
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "ops_s": round(repeat / sum(timings) * 1000, 1),
+        "median_ms": round(statistics.median(timings), 3),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        "db_median_ms": round(statistics.median(db_timings) * 1000, 3),
+        "queries": queries // repeat,
+    }
+
+
+def format_table(rows: list[dict]) -> list[str]:
+    """Lines of `rows` as a table with a header, columns padded to their widest value."""
+    columns = list(rows[0])
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    return [
+        "  ".join(column.ljust(widths[column]) for column in columns),
+        *("  ".join(str(row[column]).ljust(widths[column]) for column in columns) for row in rows),
+    ]
+
+
+def measure_get(client: Client, url: str, repeat: int) -> dict:
+    def get() -> None:
+        response = client.get(url)
+        if response.status_code != 200:  # noqa: PLR2004
+            msg = f"GET {url} returned {response.status_code}"
+            raise RuntimeError(msg)
+
+    return measure(get, repeat)
+
+
+def checked_request(
+    client: Client,
+    method: str,
+    url: str,
+    data: Callable[[], dict] | None,
+    expected_status: int,
+) -> Callable[[], None]:
+    """A function sending the request, with a JSON body built by `data` for each call, and checking its status."""
+
+    def send() -> None:
+        body = {"data": data(), "content_type": "application/json"} if data else {}
+        response = getattr(client, method)(url, **body)
+        if response.status_code != expected_status:
+            msg = f"{method.upper()} {url} returned {response.status_code}"
+            raise RuntimeError(msg)
+
+    return send
+
+
+def measure_with_memory(func: Callable[[], object], repeat: int) -> dict:
+    """`measure` of `func`, and the peak memory it allocates in one call."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**measure(func, repeat), "peak_kib": peak // 1024}
+
+
+def keyset_cursor_at(pagination: type[KeysetPagination], offset: int, url: str) -> str:
+    """Build the cursor a client would hold after reading `offset` rows in keyset order."""
+    paginator = pagination()
+    paginator.base_url = url
+    if offset == 0:
+        return f"{url}?pagination=cursor"
+    instance = User.objects.order_by(*paginator.ordering)[offset - 1]
+    return paginator.encode_cursor(paginator.get_position(instance), reverse=False)
+
+
+def pagination_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Compare the latency of a deep page in page-number and keyset mode."""
+    seed_users(options.users, options.addresses)
+    page_size = UserKeysetPagination.page_size
+    page = max(1, min(1_000, options.users // page_size))
+    url = reverse("user-list")
+    client = Client()
+
+    cursor_url = keyset_cursor_at(UserKeysetPagination, (page - 1) * page_size, f"http://testserver{url}")
+    return [
+        {"scenario": f"page-number page={page}", **measure_get(client, f"{url}?page={page}", options.repeat)},
+        {"scenario": f"cursor page={page}", **measure_get(client, cursor_url, options.repeat)},
+    ]
+
+
+def serialization_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Compare `UserSerializer` with the `.values()` read path on one large page of users."""
+    seed_users(options.users, options.addresses)
+    queryset = User.objects.order_by("id")[: min(options.users, 1_000)]
+    values_serializer = UserValuesSerializer()
+    prefetch = Prefetch("addresses", queryset=UserAddress.objects.order_by("id"))
+    size = len(queryset)
+
+    return [
+        {
+            "scenario": f"UserSerializer users={size}",
+            **measure(lambda: UserSerializer(queryset.prefetch_related(prefetch), many=True).data, options.repeat),
+        },
+        {
+            "scenario": f"UserValuesSerializer users={size}",
+            **measure(lambda: values_serializer.serialize(values_serializer.get_queryset(queryset)), options.repeat),
+        },
+    ]
+
+
+def json_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Compare DRF's JSON renderer and parser with the fast ones on a page of 1,000 users with their addresses."""
+    seed_users(options.users, options.addresses)
+    prefetch = Prefetch("addresses", queryset=UserAddress.objects.order_by("id"))
+    data = UserSerializer(User.objects.order_by("id")[:1_000].prefetch_related(prefetch), many=True).data
+    body = JSONRenderer().render(data)
+    size = len(data)
+    rows = []
+    fast = "orjson" if orjson else "stdlib fallback"
+    for label, renderer, parser in (
+        ("DRF", JSONRenderer(), JSONParser()),
+        (fast, FastJSONRenderer(), FastJSONParser()),
+    ):
+        render_stats = measure(lambda renderer=renderer: renderer.render(data), options.repeat)
+        parse_stats = measure(lambda parser=parser: parser.parse(BytesIO(body)), options.repeat)
+        rows.append({"scenario": f"render {label} users={size}", **render_stats})
+        rows.append({"scenario": f"parse {label} users={size}", **parse_stats})
+    return rows
+
+
+def decode_formats() -> dict[str, tuple[str, Callable[[bytes], object]]]:
+    """Format -> (media type, function decoding a page of users as a consumer would)."""
+    formats = {
+        "json": ("application/json", json.loads),
+        "columnar": (ColumnarJSONRenderer.media_type, lambda body: from_columns(json.loads(body)["results"])),
+    }
+    if msgpack:
+        formats["msgpack"] = (MessagePackRenderer.media_type, msgpack.unpackb)
+    return formats
+
+
+def fetch_and_decode(
+    client: Client,
+    url: str,
+    headers: dict,
+    decode: Callable[[bytes], object],
+) -> Callable[[], object]:
+    return lambda: decode(client.get(url, **headers).content)
+
+
+def formats_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """
+    Compare the size and the latency of a 1,000-user page in each list format and content coding.
+
+    Latency is end to end: the request through every middleware, then
+    decompressing and decoding the body on the client side.
+    """
+    seed_users(options.users, options.addresses)
+    url = reverse("user-list")
+    client = Client()
+    decompress = {"identity": lambda body: body, "gzip": gzip.decompress}
+    if brotli:
+        decompress["br"] = brotli.decompress
+    rows = []
+    # The page size is not a query parameter; batch consumers are assumed to read large pages.
+    page_size = UserPagination.page_size
+    UserPagination.page_size = 1_000
+    try:
+        for name, (media_type, decode) in decode_formats().items():
+            for encoding, decompress_body in decompress.items():
+                headers = {"HTTP_ACCEPT": media_type, "HTTP_ACCEPT_ENCODING": encoding}
+                kib = round(len(client.get(url, **headers).content) / 1024, 1)
+                fetch = fetch_and_decode(client, url, headers, lambda body, d=decode, z=decompress_body: d(z(body)))
+                rows.append({"scenario": f"{name} {encoding}", "kib": kib, **measure(fetch, options.repeat)})
+    finally:
+        UserPagination.page_size = page_size
+    return rows
+
+
+def cache_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Compare uncached and cached reads of a user list page and a user detail."""
+    seed_users(options.users, options.addresses)
+    client = Client()
+    urls = {"list": reverse("user-list"), "retrieve": reverse("user-detail", args=[User.objects.latest("id").pk])}
+    rows = []
+    for timeout in (0, 300):
+        with override_settings(USERS_RESPONSE_CACHE_TIMEOUT=timeout):
+            for action, url in urls.items():
+                label = "cached" if timeout else "uncached"
+                rows.append({"scenario": f"{label} {action}", **measure_get(client, url, options.repeat)})
+    return rows
+
+
+def resolve_current_in_python(user_ids: list[int], at: datetime) -> list[UserAddress]:
+    """What clients do without the `current` endpoint: load the whole history and pick per type."""
+    latest = {}
+    for address in UserAddress.objects.filter(user_id__in=user_ids, valid_from__lte=at):
+        key = (address.user_id, address.address_type)
+        if key not in latest or address.valid_from > latest[key].valid_from:
+            latest[key] = address
+    return [latest[key] for key in sorted(latest)]
+
+
+def current_address_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Resolve the current address per type from the full history in Python and with `current()`."""
+    seed_users(options.users, options.addresses)
+    at = timezone.now() - timedelta(days=options.addresses // 2)
+    user_ids = list(User.objects.order_by("id").values_list("id", flat=True)[:100])
+    rows = []
+    for label, ids in (("1 user", user_ids[:1]), (f"{len(user_ids)} users", user_ids)):
+        queryset = UserAddress.objects.filter(user_id__in=ids).current(at)
+        rows += [
+            {
+                "scenario": f"history in Python {label}",
+                **measure(lambda ids=ids: resolve_current_in_python(ids, at), options.repeat),
+            },
+            {"scenario": f"current() {label}", **measure(lambda qs=queryset: list(qs.all()), options.repeat)},
+        ]
+    return rows
+
+
+def bulk_items(start: int, count: int) -> list[dict]:
+    return [
+        {
+            "last_name": f"User{i}",
+            "email": f"user{i}@bulk.example.com",
+            "addresses": [
+                {
+                    "address_type": "HOME",
+                    "valid_from": "2025-01-01T00:00:00Z",
+                    "post_code": "12345",
+                    "city": "Bench City",
+                    "country_code": "USA",
+                    "street": "Bench Street",
+                    "building_number": str(i),
+                },
+            ],
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def bulk_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Compare importing `users` users with one address each through the per-item API and the bulk endpoint."""
+    client = Client()
+    batches = iter(range(0, 10**9, options.users))
+    repeat = min(options.repeat, 3)
+
+    def per_item() -> None:
+        for item in bulk_items(next(batches), options.users):
+            addresses = item.pop("addresses")
+            response = client.post(reverse("user-list"), item, content_type="application/json")
+            for address in addresses:
+                client.post(
+                    reverse("user-address-list", args=[response.json()["id"]]),
+                    address,
+                    content_type="application/json",
+                )
+
+    def bulk() -> None:
+        response = client.post(
+            reverse("user-bulk"),
+            {"users": bulk_items(next(batches), options.users)},
+            content_type="application/json",
+        )
+        if response.json()["failed"]:
+            msg = "Bulk import reported failed items"
+            raise RuntimeError(msg)
+
+    return [
+        {"scenario": f"per-item API users={options.users}", **measure(per_item, repeat)},
+        {"scenario": f"bulk endpoint users={options.users}", **measure(bulk, repeat)},
+    ]
+
+
+def export_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Stream a full export in each format; peak memory should not grow with `users`."""
+    seed_users(options.users, options.addresses)
+    rows = []
+    for export_format in EXPORT_FORMATS:
+
+        def consume(export_format: str = export_format) -> None:
+            for _ in export_users(User.objects.all(), export_format):
+                pass
+
+        tracemalloc.start()
+        consume()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = measure(consume, min(options.repeat, 3))
+        rows.append({"scenario": f"export {export_format} users={options.users}", **stats, "peak_kib": peak // 1024})
+    return rows
+
+
+def seed_skewed_addresses(addresses: int, every: int = 10) -> None:
+    """Give every `every`-th user of the first list page `addresses` addresses: a few heavy users among light ones."""
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    address_types = [code for code, _ in UserAddress.ADDRESS_TYPE_CHOICES]
+    now = timezone.now()
+    for user_id in User.objects.order_by("id").values_list("id", flat=True)[:page_size:every]:
+        UserAddress.objects.bulk_create(
+            (
+                UserAddress(
+                    user_id=user_id,
+                    address_type=address_types[i % len(address_types)],
+                    valid_from=now - timedelta(hours=i),
+                    post_code="12345",
+                    city="Bench City",
+                    country_code="USA",
+                    street="Bench Street",
+                    building_number=str(i),
+                )
+                for i in range(addresses)
+            ),
+            batch_size=2_000,
+        )
+
+
+def nested_addresses_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Read a user list page in each `?addresses=` mode when a few users have `addresses` addresses each."""
+    seed_users(options.users, 1)
+    seed_skewed_addresses(options.addresses)
+    client = Client()
+    rows = []
+    for mode in ("all", "current", "latest:5", "none"):
+        url = f"{reverse('user-list')}?addresses={mode}"
+        tracemalloc.start()
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows.append(
+            {"scenario": f"addresses={mode}", **measure_get(client, url, options.repeat), "peak_kib": peak // 1024},
+        )
+    return rows
+
+
+def search_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Compare the admin's `icontains` search with `search_users` for a selective and a broad query."""
+    seed_users(options.users, options.addresses)
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    rows = []
+    for label, query in (("selective", f"User{options.users // 3}"), ("broad", "bench")):
+        scan = User.objects.filter(contains_all(USER_SEARCH_FIELDS, query.split()))
+        indexed = search_users(User.objects.all(), query)
+
+        def icontains(queryset: QuerySet = scan) -> None:
+            queryset.count()
+            list(queryset.order_by("id")[:page_size])
+
+        def ranked(queryset: QuerySet = indexed) -> None:
+            queryset.count()
+            list(queryset.order_by("-search_rank", "pk")[:page_size])
+
+        rows += [
+            {"scenario": f"icontains {label}", **measure(icontains, options.repeat), "matches": scan.count()},
+            {"scenario": f"search_users {label}", **measure(ranked, options.repeat), "matches": indexed.count()},
+        ]
+    return rows
+
+
+def metrics_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """
+    Read the user list with and without `MetricsMiddleware`; the difference is its overhead.
+
+    Requests alternate between the two clients, each going first every other
+    time, so that drift of the machine and cache effects affect both alike.
+    """
+    seed_users(options.users, options.addresses)
+    url = reverse("user-list")
+    without = [name for name in settings.MIDDLEWARE if name != "app.middleware.MetricsMiddleware"]
+    clients = {}
+    for label, middleware in (("without metrics", without), ("with metrics", settings.MIDDLEWARE)):
+        with override_settings(MIDDLEWARE=middleware):
+            clients[label] = Client()
+            clients[label].get(url)  # The handler loads the middleware on its first request.
+
+    timings = {label: [] for label in clients}
+    for i in range(options.repeat):
+        for label in sorted(clients, reverse=i % 2 == 1):
+            start = time.perf_counter()
+            clients[label].get(url)
+            timings[label].append((time.perf_counter() - start) * 1000)
+    baseline = statistics.median(timings["without metrics"])
+    return [
+        {
+            "scenario": f"{label} list",
+            "median_ms": round(statistics.median(values), 3),
+            "overhead": f"{(statistics.median(values) / baseline - 1) * 100:+.2f}%",
+        }
+        for label, values in timings.items()
+    ]
+
+
+def hot_paths_benchmark(options: BenchmarkOptions) -> list[dict]:
+    """Time the everyday user and address requests through the test client, on a dataset skewed by `skew`."""
+    seed_users(options.users, options.addresses, skew=options.skew)
+    client = Client()
+    user = User.objects.order_by("id")[options.users // 2]
+    sequence = itertools.count()
+
+    def new_user() -> dict:
+        return {"last_name": "Suite", "email": f"user{next(sequence)}@suite.example.com"}
+
+    def updated_user() -> dict:
+        return {"first_name": f"Bench{next(sequence)}", "last_name": user.last_name, "email": user.email}
+
+    def new_address() -> dict:
+        valid_from = timezone.now() + timedelta(seconds=next(sequence))
+        return {
+            "address_type": "HOME",
+            "valid_from": valid_from.isoformat(),
+            "post_code": "12345",
+            "city": "Bench City",
+            "country_code": "USA",
+            "street": "Bench Street",
+            "building_number": "1",
+        }
+
+    user_url = reverse("user-detail", args=[user.pk])
+    address_url = reverse("user-address-list", args=[user.pk])
+    requests = (
+        ("list", "get", reverse("user-list"), None, 200),
+        ("retrieve", "get", user_url, None, 200),
+        ("create", "post", reverse("user-list"), new_user, 201),
+        ("update", "put", user_url, updated_user, 200),
+        ("address list", "get", address_url, None, 200),
+        ("address create", "post", address_url, new_address, 201),
+    )
+    return [
+        {"scenario": scenario, **measure_with_memory(checked_request(client, *request), options.repeat)}
+        for scenario, *request in requests
+    ]
+
+
+# Metric -> whether higher is better, for `compare_results`. p99 of a few dozen requests is too noisy to compare.
+COMPARED_METRICS = {"ops_s": True, "median_ms": False, "queries": False, "peak_kib": False}
+
+
+def compare_results(baseline: list[dict], results: list[dict], threshold: float) -> list[dict]:
+    """
+    Rows comparing each metric of `results` with the `baseline` row of the same scenario.
+
+    A metric regressed when it got worse by more than `threshold` (0.1 is 10%),
+    or for `queries`, which do not vary between runs, by any amount.
+    """
+    baseline_rows = {row["scenario"]: row for row in baseline}
+    rows = []
+    for result in results:
+        before = baseline_rows.get(result["scenario"])
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in result or metric not in before:
+                continue
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            worse = -change if higher_is_better else change
+            regressed = result[metric] > before[metric] if metric == "queries" else worse > threshold
+            rows.append(
+                {
+                    "scenario": result["scenario"],
+                    "metric": metric,
+                    "baseline": before[metric],
+                    "current": result[metric],
+                    "change": f"{change * 100:+.1f}%",
+                    "regressed": regressed,
+                },
+            )
+    return rows
+
+
+SCENARIOS: dict[str, Callable[[BenchmarkOptions], list[dict]]] = {
+    "bulk": bulk_benchmark,
+    "cache": cache_benchmark,
+    "current_address": current_address_benchmark,
+    "export": export_benchmark,
+    "formats": formats_benchmark,
+    "hot_paths": hot_paths_benchmark,
+    "json": json_benchmark,
+    "metrics": metrics_benchmark,
+    "nested_addresses": nested_addresses_benchmark,
+    "pagination": pagination_benchmark,
+    "search": search_benchmark,
+    "serialization": serialization_benchmark,
+}
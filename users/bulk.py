@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import User, UserAddress
+from .serializers import BulkUserAddressSerializer, BulkUserSerializer
+
+USER_EXISTS_MESSAGE = "A user with this email already exists."
+DUPLICATE_EMAIL_MESSAGE = "This email is used by another item of the request."
+CONFLICT_MESSAGE = "Another request wrote the same user or address meanwhile; retry this item."
+# Writes rolled back by a concurrent insert of the same user or address, looked up again, at most.
+WRITE_ATTEMPTS = 3
+
+
+def _error(index: int, detail: Any) -> dict:  # noqa: ANN401
+    return {"index": index, "status": "error", "errors": detail}
+
+
+def validate_items(items: list[dict]) -> tuple[dict[str, tuple[int, dict]], dict[int, dict]]:
+    """
+    Validate every item with one reusable `BulkUserSerializer`.
+
+    Returns valid items keyed by email (first occurrence wins) and error
+    results keyed by item index.
+    """
+    serializer = BulkUserSerializer()
+    valid: dict[str, tuple[int, dict]] = {}
+    errors: dict[int, dict] = {}
+    for index, item in enumerate(items):
+        try:
+            data = serializer.run_validation(item)
+        except ValidationError as exc:
+            errors[index] = _error(index, exc.detail)
+            continue
+        if data["email"] in valid:
+            errors[index] = _error(index, {"email": [DUPLICATE_EMAIL_MESSAGE]})
+            continue
+        valid[data["email"]] = (index, data)
+    return valid, errors
+
+
+def _stage_users(valid: dict[str, tuple[int, dict]], existing: dict[str, User]) -> tuple[dict[str, User], set[str]]:
+    """Build unsaved users for new emails and apply item fields to existing ones; returns changed field names."""
+    users: dict[str, User] = {}
+    changed_fields: set[str] = set()
+    for email, (_, data) in valid.items():
+        fields = {name: value for name, value in data.items() if name != "addresses"}
+        user = existing.get(email)
+        if user is None:
+            user = User(**fields)
+        else:
+            for name, value in fields.items():
+                setattr(user, name, value)
+            changed_fields.update(fields)
+        users[email] = user
+    return users, changed_fields
+
+
+def _stage_addresses(
+    valid: dict[str, tuple[int, dict]],
+    users: dict[str, User],
+    existing: dict[tuple, UserAddress],
+) -> tuple[list[UserAddress], list[UserAddress]]:
+    new_addresses: list[UserAddress] = []
+    changed_addresses: list[UserAddress] = []
+    for email, (_, data) in valid.items():
+        user = users[email]
+        for address_data in data.get("addresses", []):
+            address = existing.get((user.pk, address_data["address_type"], address_data["valid_from"]))
+            if address is None:
+                new_addresses.append(UserAddress(user=user, **address_data))
+                continue
+            for name, value in address_data.items():
+                setattr(address, name, value)
+            changed_addresses.append(address)
+    return new_addresses, changed_addresses
+
+
+def _insert_users(users: list[User], batch_size: int) -> None:
+    User.objects.bulk_create(users, batch_size=batch_size)
+    if any(user.pk is None for user in users):
+        # Backends that cannot return ids from bulk inserts.
+        ids = dict(User.objects.filter(email__in=[user.email for user in users]).values_list("email", "pk"))
+        for user in users:
+            user.pk = ids[user.email]
+
+
+def bulk_upsert_users(items: list[dict], *, upsert: bool = False, batch_size: int | None = None) -> list[dict]:
+    """
+    Create users with nested addresses in batches; with `upsert`, update them instead when they exist.
+
+    Users are matched on `email` and addresses on `(user, address_type,
+    valid_from)`. Validation runs once over all items, existing users are
+    found with a single `IN` query, and writes use batched `bulk_create` /
+    `bulk_update` in one transaction. A user or address inserted by another
+    request between the lookup and the writes makes the transaction roll
+    back; it is then retried from the lookup, and after `WRITE_ATTEMPTS` the
+    items are reported as conflicts. Returns one result per item, in order.
+    """
+    batch_size = batch_size or settings.USERS_BULK_BATCH_SIZE
+    valid, results = validate_items(items)
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            results.update(write_items(valid, upsert=upsert, batch_size=batch_size))
+            break
+        except IntegrityError:
+            if attempt == WRITE_ATTEMPTS:
+                for index, _ in valid.values():
+                    results[index] = _error(index, {"non_field_errors": [CONFLICT_MESSAGE]})
+    return [results[index] for index in range(len(items))]
+
+
+def write_items(valid: dict[str, tuple[int, dict]], *, upsert: bool, batch_size: int) -> dict[int, dict]:
+    """Write the validated items in one transaction; returns their results keyed by item index."""
+    results: dict[int, dict] = {}
+    existing = {user.email: user for user in User.objects.filter(email__in=list(valid))}
+    if not upsert:
+        for email in existing:
+            index, _ = valid[email]
+            results[index] = _error(index, {"email": [USER_EXISTS_MESSAGE]})
+        valid = {email: item for email, item in valid.items() if email not in existing}
+        existing = {}
+
+    existing_addresses = {}
+    if existing:
+        for address in UserAddress.objects.filter(user_id__in=[user.pk for user in existing.values()]):
+            existing_addresses[(address.user_id, address.address_type, address.valid_from)] = address
+
+    # bulk_update() bypasses auto_now, so the timestamp is set explicitly.
+    now = timezone.now()
+    users, changed_user_fields = _stage_users(valid, existing)
+    with transaction.atomic():
+        _insert_users([user for email, user in users.items() if email not in existing], batch_size)
+        changed_users = [users[email] for email in existing]
+        for user in changed_users:
+            user.updated_at = now
+        if changed_users:
+            User.objects.bulk_update(changed_users, [*sorted(changed_user_fields), "updated_at"], batch_size=batch_size)
+
+        new_addresses, changed_addresses = _stage_addresses(valid, users, existing_addresses)
+        UserAddress.objects.bulk_create(new_addresses, batch_size=batch_size)
+        for address in changed_addresses:
+            address.updated_at = now
+        if changed_addresses:
+            fields = [*BulkUserAddressSerializer.Meta.fields, "updated_at"]
+            UserAddress.objects.bulk_update(changed_addresses, fields, batch_size=batch_size)
+
+    for email, (index, _) in valid.items():
+        status = "updated" if email in existing else "created"
+        results[index] = {"index": index, "status": status, "id": users[email].pk}
+    return results
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import time
+from typing import TYPE_CHECKING, Any
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import urlencode
+
+from .models import User, UserAddress
+from .signals import users_changed
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from django.core.cache.backends.base import BaseCache
+    from django.http import HttpResponse
+    from rest_framework.request import Request
+
+
+class ResponseCache:
+    """
+    Cache of rendered responses invalidated through version counters.
+
+    Responses scoped to one user (a user's detail, their addresses) are keyed
+    on the `epoch` and that user's counter; responses spanning all users (the
+    user list) on the `global` counter. A write bumps the counter of each
+    affected user and `global`; a write whose users are unknown bumps `epoch`
+    and `global`. Stale entries are never deleted, they just stop being
+    addressed and expire.
+
+    Counters start from the current time in nanoseconds, so a counter evicted
+    from the cache never comes back with a value an old entry was stored under.
+    """
+
+    def __init__(self, alias: str | None = None, timeout: int | None = None, prefix: str = "users") -> None:
+        self.alias = alias
+        self._timeout = timeout
+        self.prefix = prefix
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.alias or settings.USERS_RESPONSE_CACHE_ALIAS]
+
+    @property
+    def timeout(self) -> int:
+        return settings.USERS_RESPONSE_CACHE_TIMEOUT if self._timeout is None else self._timeout
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0
+
+    def _key(self, *parts: object) -> str:
+        return ":".join([self.prefix, *map(str, parts)])
+
+    def version_keys(self, user_id: Any = None) -> list[str]:  # noqa: ANN401
+        if user_id is None:
+            return [self._key("version", "global")]
+        return [self._key("version", "epoch"), self._key("version", "user", user_id)]
+
+    def get_versions(self, user_id: Any = None) -> list[int]:  # noqa: ANN401
+        keys = self.version_keys(user_id)
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                self.cache.add(key, time.time_ns(), timeout=None)
+                versions[key] = self.cache.get(key)
+        return [versions[key] for key in keys]
+
+    def make_key(self, request: Request, user_id: Any = None) -> str:  # noqa: ANN401
+        """Key of the response to `request`: its path, sorted query string and media type, under current versions."""
+        query = urlencode(sorted((name, sorted(values)) for name, values in request.query_params.lists()), doseq=True)
+        fingerprint = f"{request.path}?{query}|{getattr(request, 'accepted_media_type', '')}"
+        digest = hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest()
+        return self._key("response", *self.get_versions(user_id), digest)
+
+    def _count(self, name: str) -> None:
+        key = self._key("stats", name)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout=None):
+                self.cache.incr(key)
+
+    def get(self, key: str) -> HttpResponse | None:
+        response = self.cache.get(key)
+        self._count("misses" if response is None else "hits")
+        return response
+
+    def set(self, key: str, response: HttpResponse, timeout: int | None = None) -> None:
+        self.cache.set(key, response, self.timeout if timeout is None else min(timeout, self.timeout))
+
+    def invalidate(self, user_ids: Iterable[Any] | None = None) -> None:
+        """Bump the counters of `user_ids`, or of every user when `None`."""
+        keys = [self._key("version", "global")]
+        if user_ids is None:
+            keys.append(self._key("version", "epoch"))
+        else:
+            keys.extend(self._key("version", "user", user_id) for user_id in user_ids)
+        for key in keys:
+            # Missing counters are recreated with a fresh value on the next read.
+            with contextlib.suppress(ValueError):
+                self.cache.incr(key)
+
+    def stats(self) -> dict[str, int]:
+        names = ("hits", "misses")
+        values = self.cache.get_many([self._key("stats", name) for name in names])
+        return {name: values.get(self._key("stats", name), 0) for name in names}
+
+    def reset_stats(self) -> None:
+        self.cache.delete_many([self._key("stats", name) for name in ("hits", "misses")])
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_users(user_ids: Iterable[Any] | None = None) -> None:
+    """
+    Invalidate cached responses of `user_ids` now and again once the transaction commits.
+
+    The second bump drops responses cached from a read that ran between the
+    write and the commit and therefore still saw the old rows.
+    """
+    user_ids = None if user_ids is None else list(user_ids)
+    response_cache.invalidate(user_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: response_cache.invalidate(user_ids))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender: type[User], instance: User, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    invalidate_users([instance.pk])
+
+
+@receiver(post_save, sender=UserAddress)
+@receiver(post_delete, sender=UserAddress)
+def invalidate_user_address(sender: type[UserAddress], instance: UserAddress, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    invalidate_users([instance.user_id])
+
+
+@receiver(users_changed)
+def invalidate_changed_users(sender: type, user_ids: Iterable[Any] | None, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    invalidate_users(user_ids)
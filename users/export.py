@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+
+from .models import User, UserAddress
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import UserAddressValuesSerializer, UserValuesSerializer
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable, Iterator
+
+    from django.db.models import QuerySet
+
+EXPORT_FORMATS = ("ndjson", "csv")
+ADDRESS_PREFIX = "address_"
+
+
+def iter_users(queryset: QuerySet[User], chunk_size: int | None = None) -> Iterator[dict]:
+    """
+    Yield every user of `queryset` serialized like `UserSerializer`, with nested addresses.
+
+    Users and their addresses are read by two server-side cursors, both
+    ordered by user id, and merged as they stream, so memory use does not
+    depend on the number of rows and no per-user query is issued.
+    """
+    chunk_size = chunk_size or settings.USERS_EXPORT_CHUNK_SIZE
+    user_serializer, address_serializer, users, addresses = export_querysets(queryset)
+    # Bound eagerly: a streaming response is consumed after the view has returned.
+    user_plan = user_serializer.bind()
+    address_plan = address_serializer.bind()
+
+    addresses = iter(addresses.iterator(chunk_size=chunk_size))
+    address = next(addresses, None)
+    for user in users.iterator(chunk_size=chunk_size):
+        items = []
+        # Addresses of users created between the two queries have no matching user row and are skipped.
+        while address is not None and address["user"] <= user["id"]:
+            if address["user"] == user["id"]:
+                items.append(address_serializer.to_representation(address, None, address_plan))
+            address = next(addresses, None)
+        yield user_serializer.to_representation(user, {"addresses": {user["id"]: items}}, user_plan)
+
+
+async def aiter_users(queryset: QuerySet[User], chunk_size: int | None = None) -> AsyncIterator[dict]:
+    """`iter_users()` on the async ORM: both cursors are read a chunk at a time with `aiterator()`."""
+    chunk_size = chunk_size or settings.USERS_EXPORT_CHUNK_SIZE
+    user_serializer, address_serializer, users, addresses = export_querysets(queryset)
+    user_plan = user_serializer.bind()
+    address_plan = address_serializer.bind()
+
+    addresses = addresses.aiterator(chunk_size=chunk_size)
+    address = await _anext(addresses)
+    async for user in users.aiterator(chunk_size=chunk_size):
+        items = []
+        while address is not None and address["user"] <= user["id"]:
+            if address["user"] == user["id"]:
+                items.append(address_serializer.to_representation(address, None, address_plan))
+            address = await _anext(addresses)
+        yield user_serializer.to_representation(user, {"addresses": {user["id"]: items}}, user_plan)
+
+
+def export_querysets(
+    queryset: QuerySet[User],
+) -> tuple[UserValuesSerializer, UserAddressValuesSerializer, QuerySet, QuerySet]:
+    """The serializers of an export, and the `.values()` querysets of its users and of their addresses by user id."""
+    user_serializer = UserValuesSerializer()
+    address_serializer = UserAddressValuesSerializer()
+    users = user_serializer.get_queryset(queryset.order_by("id"))
+    addresses = address_serializer.get_queryset(
+        UserAddress.objects.filter(user__in=queryset.values("pk")).order_by("user_id", "id"),
+    )
+    return user_serializer, address_serializer, users, addresses
+
+
+async def _anext(iterator: AsyncIterator[dict]) -> dict | None:
+    # `anext()` with a default, which Python 3.9 lacks.
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def csv_header() -> list[str]:
+    user_fields = [name for name, _, converter in UserValuesSerializer().plan if converter is not None]
+    address_fields = [name for name, _, _ in UserAddressValuesSerializer().plan if name != "user"]
+    return [*user_fields, *(f"{ADDRESS_PREFIX}{name}" for name in address_fields)]
+
+
+def flatten_users(users: Iterable[dict]) -> Iterator[dict]:
+    """One CSV row per address, repeating the user columns; users without addresses get a single row."""
+    for user in users:
+        addresses = user.pop("addresses")
+        if not addresses:
+            yield user
+        for address in addresses:
+            yield {**user, **{f"{ADDRESS_PREFIX}{name}": value for name, value in address.items()}}
+
+
+def encode_users(users: Iterable[dict], export_format: str, *, header: bool = True) -> Iterator[bytes]:
+    """Encode serialized `users` as NDJSON or CSV, one chunk per line; `header` is the CSV header row."""
+    if export_format == CSVRenderer.format:
+        return CSVRenderer().render_stream(flatten_users(users), csv_header(), header=header)
+    return NDJSONRenderer().render_stream(users)
+
+
+def export_users(queryset: QuerySet[User], export_format: str, chunk_size: int | None = None) -> Iterator[bytes]:
+    """Encode `iter_users(queryset)` as NDJSON or CSV, one chunk per line."""
+    return encode_users(iter_users(queryset, chunk_size), export_format)
+
+
+async def aexport_users(
+    queryset: QuerySet[User],
+    export_format: str,
+    chunk_size: int | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    `export_users()` on the async ORM, for streaming responses under ASGI.
+
+    A synchronous iterator would be read to the end by `StreamingHttpResponse`
+    before the first byte is sent. This one yields a chunk per `chunk_size` users.
+    """
+    chunk_size = chunk_size or settings.USERS_EXPORT_CHUNK_SIZE
+    users: list[dict] = []
+    header = True
+    async for user in aiter_users(queryset, chunk_size):
+        users.append(user)
+        if len(users) == chunk_size:
+            yield b"".join(encode_users(users, export_format, header=header))
+            users, header = [], False
+    if users or header:
+        yield b"".join(encode_users(users, export_format, header=header))
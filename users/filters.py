@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Collate, Upper
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.settings import api_settings
+
+from .models import User, UserAddress
+from .serializers import UserFilterSerializer
+
+if TYPE_CHECKING:
+    from django.db.models import QuerySet
+    from rest_framework.request import Request
+    from rest_framework.views import APIView
+
+
+# Vendor -> collation ordering strings by code point; SQLite's default (BINARY) already does.
+CODE_POINT_COLLATIONS = {"postgresql": "C"}
+
+
+def prefix_range(prefix: str) -> tuple[str, str]:
+    """
+    Bounds `[lower, upper)` of the strings starting with `prefix`, when compared by code point.
+
+    A range is answered from a B-tree index on every backend, unlike
+    `LIKE 'prefix%'`, which needs a pattern operator class on PostgreSQL and is
+    not index-assisted with `ESCAPE` on SQLite. Under a linguistic collation
+    (en_US.UTF-8 and the like) the range is wrong both ways, so compare
+    `code_point_order()` of the column.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def code_point_order(field: str, vendor: str) -> F | Collate:
+    """`field` under its vendor's `CODE_POINT_COLLATIONS`, the expression of the indexes range filters read."""
+    collation = CODE_POINT_COLLATIONS.get(vendor)
+    return Collate(F(field), collation) if collation else F(field)
+
+
+# Filter name -> lookup, for the filters that compare a single column.
+USER_FILTER_LOOKUPS = {
+    "status": "status",
+    "updated_after": "updated_at__gte",
+    "updated_before": "updated_at__lt",
+    "created_after": "created_at__gte",
+    "created_before": "created_at__lt",
+}
+
+# Fields `?ordering=` accepts on the user list; each leads an index.
+USER_ORDERING_FIELDS = ("id", "created_at", "updated_at", "last_name", "email", "status")
+
+
+def filter_users(queryset: QuerySet[User], **filters: Any) -> QuerySet[User]:  # noqa: ANN401
+    """
+    Apply the user filters of `UserFilterSerializer`; each one is backed by an index.
+
+    `last_name_prefix` is a code point range on `last_name` (see `prefix_range`). `email`
+    matches case-insensitively through `UPPER(email)`, the same expression as
+    `users_email_upper_idx`. `address_country` / `address_city` keep users
+    with at least one address, past or current, matching both.
+    """
+    queryset = queryset.filter(
+        **{lookup: filters[name] for name, lookup in USER_FILTER_LOOKUPS.items() if filters.get(name)},
+    )
+    if filters.get("last_name_prefix"):
+        lower, upper = prefix_range(filters["last_name_prefix"])
+        queryset = queryset.alias(last_name_key=code_point_order("last_name", connections[queryset.db].vendor))
+        queryset = queryset.filter(last_name_key__gte=lower, last_name_key__lt=upper)
+    if filters.get("email"):
+        queryset = queryset.alias(email_upper=Upper("email")).filter(email_upper=filters["email"].upper())
+    address_lookups = {
+        lookup: filters[name]
+        for name, lookup in (("address_country", "country_code"), ("address_city", "city"))
+        if filters.get(name)
+    }
+    if address_lookups:
+        # `IN (subquery)` rather than a correlated `EXISTS`, so the address index drives the lookup.
+        queryset = queryset.filter(pk__in=UserAddress.objects.filter(**address_lookups).values("user_id"))
+    return queryset
+
+
+class UserFilterBackend(BaseFilterBackend):
+    """Validate the `UserFilterSerializer` query parameters of a list request and apply them with `filter_users`."""
+
+    def filter_queryset(self, request: Request, queryset: QuerySet[User], view: APIView) -> QuerySet[User]:
+        if getattr(view, "action", None) != "list":
+            return queryset
+        filters = UserFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filter_users(queryset, **filters.validated_data)
+
+    def get_schema_fields(self, view: APIView) -> list:  # noqa: ARG002
+        # Documented through `manual_parameters`; the coreapi schema is not used.
+        return []
+
+
+class AllowListOrderingFilter(OrderingFilter):
+    """
+    `?ordering=` restricted to the view's `ordering_fields`, with a unique tiebreaker.
+
+    Unknown fields are rejected with a 400 instead of being dropped. `id`
+    (in the direction of the last field) is appended so that page boundaries
+    are stable, and so that `-created_at` walks `(status, created_at, id)`
+    backwards. Keyset pagination has its own fixed order, so the two cannot
+    be combined.
+    """
+
+    tiebreaker = "id"
+
+    def get_ordering(self, request: Request, queryset: QuerySet, view: APIView) -> list[str] | None:
+        param = request.query_params.get(self.ordering_param)
+        if not param:
+            return self.get_default_ordering(view)
+
+        fields = [field.strip() for field in param.split(",") if field.strip()]
+        allowed = [name for name, _ in self.get_valid_fields(queryset, view, {"request": request})]
+        unknown = [field for field in fields if field.lstrip("-") not in allowed]
+        if unknown:
+            message = f"Unknown field(s): {', '.join(unknown)}. Available fields: {', '.join(allowed)}."
+            raise ValidationError({self.ordering_param: [message]})
+        paginator = getattr(view, "paginator", None)
+        if paginator is not None and getattr(paginator, "uses_keyset", lambda _: False)(request):
+            raise ValidationError({self.ordering_param: ["Ordering cannot be combined with cursor pagination."]})
+        if fields and all(field.lstrip("-") != self.tiebreaker for field in fields):
+            fields.append(f"-{self.tiebreaker}" if fields[-1].startswith("-") else self.tiebreaker)
+        return fields or self.get_default_ordering(view)
+
+    def get_schema_fields(self, view: APIView) -> list:  # noqa: ARG002
+        return []
+
+
+class IndexedSearchFilter(BaseFilterBackend):
+    """
+    `?q=` search of a list through the view's `search_function` (see users.search).
+
+    Results are ranked best first unless `?ordering=` is given; keyset
+    pagination keeps its own order.
+    """
+
+    search_param = "q"
+
+    def filter_queryset(self, request: Request, queryset: QuerySet, view: APIView) -> QuerySet:
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query or getattr(view, "action", None) != "list":
+            return queryset
+        queryset = view.search_function(queryset, query)
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+        return queryset.order_by("-search_rank", "pk")
+
+    def get_schema_fields(self, view: APIView) -> list:  # noqa: ARG002
+        return []
@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import groupby
+from typing import IO, TYPE_CHECKING, Callable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .bulk import USER_EXISTS_MESSAGE, bulk_upsert_users, validate_items
+from .export import ADDRESS_PREFIX
+from .models import ImportCheckpoint, User, UserAddress
+from .serializers import BulkUserAddressSerializer
+from .signals import users_changed
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+IMPORT_FORMATS = ("ndjson", "csv")
+USER_COLUMNS = ("first_name", "last_name", "initials", "email", "status")
+ADDRESS_COLUMNS = tuple(BulkUserAddressSerializer.Meta.fields)
+
+Loader = Callable[..., list[dict]]
+
+
+@dataclass
+class Record:
+    """One item read from the input: a user with nested addresses, or the reason it could not be parsed."""
+
+    line: int
+    rows: int
+    end_offset: int
+    item: dict | None = None
+    error: dict | None = None
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    rejected: int = 0
+
+    def add(self, records: list[Record], results: list[dict]) -> None:
+        self.rows += sum(record.rows for record in records)
+        for result in results:
+            status = result["status"]
+            if status == "error":
+                self.rejected += 1
+            else:
+                setattr(self, status, getattr(self, status) + 1)
+
+
+class _Lines:
+    """Decoded lines of a binary file, remembering the byte offset after the last line handed out."""
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+        self.offset = file.tell()
+
+    def __iter__(self) -> _Lines:
+        return self
+
+    def __next__(self) -> str:
+        line = self.file.readline()
+        if not line:
+            raise StopIteration
+        self.offset = self.file.tell()
+        return line.decode("utf-8")
+
+
+def read_ndjson(file: IO[bytes], offset: int = 0, line: int = 0) -> Iterator[Record]:
+    file.seek(offset)
+    lines = _Lines(file)
+    for text in lines:
+        line += 1
+        if not text.strip():
+            continue
+        try:
+            item = json.loads(text)
+        except ValueError as exc:
+            yield Record(line, 1, lines.offset, error={"non_field_errors": [f"Invalid JSON: {exc}"]})
+            continue
+        if not isinstance(item, dict):
+            yield Record(line, 1, lines.offset, error={"non_field_errors": ["Expected a JSON object."]})
+            continue
+        yield Record(line, 1, lines.offset, item=item)
+
+
+def _csv_item(row: dict) -> dict:
+    item = {name: value for name, value in row.items() if not name.startswith(ADDRESS_PREFIX)}
+    address = {name[len(ADDRESS_PREFIX) :]: value for name, value in row.items() if name.startswith(ADDRESS_PREFIX)}
+    item["addresses"] = [address] if any(address.values()) else []
+    return item
+
+
+def read_csv(file: IO[bytes], offset: int = 0, line: int = 0) -> Iterator[Record]:
+    """
+    Read the layout written by `users.export`: one row per address, user columns repeated.
+
+    Consecutive rows sharing an email form one item, so the offset of an item
+    is only known once the first row of the next one has been read.
+    """
+    lines = _Lines(file)
+    header = next(csv.reader(lines), None)
+    if header is None:
+        return
+    line = max(line, 1)
+    if offset > lines.offset:
+        file.seek(offset)
+        lines.offset = offset
+    reader = csv.reader(lines)
+
+    def rows() -> Iterator[tuple[int, int, dict]]:
+        nonlocal line
+        start = lines.offset
+        for values in reader:
+            line += 1
+            yield line, start, dict(zip(header, values))
+            start = lines.offset
+
+    grouped = groupby(rows(), key=lambda row: row[2].get("email"))
+    pending: tuple[int, list[dict]] | None = None
+    for _, group in grouped:
+        group_rows = list(group)
+        if pending is not None:
+            # This group's first row starts where the pending item ends.
+            yield _csv_record(*pending, end_offset=group_rows[0][1])
+        pending = (group_rows[0][0], [row for _, _, row in group_rows])
+    if pending is not None:
+        yield _csv_record(*pending, end_offset=lines.offset)
+
+
+def _csv_record(line: int, rows: list[dict], end_offset: int) -> Record:
+    item = _csv_item(rows[0])
+    for row in rows[1:]:
+        item["addresses"].extend(_csv_item(row)["addresses"])
+    return Record(line, len(rows), end_offset, item=item)
+
+
+READERS: dict[str, Callable[..., Iterator[Record]]] = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+def _copy_value(value: object) -> str:
+    if value is None:
+        return "\\N"
+    text = value.isoformat() if hasattr(value, "isoformat") else str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy(cursor: object, table: str, columns: Iterable[str], rows: Iterable[Iterable[object]]) -> None:
+    """`COPY ... FROM STDIN` through psycopg 3 or psycopg2."""
+    data = "".join("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):
+        raw.copy_expert(sql, io.StringIO(data))
+    else:
+        with raw.copy(sql) as copy:
+            copy.write(data)
+
+
+def copy_upsert_users(items: list[dict], *, upsert: bool = False) -> list[dict]:
+    """
+    PostgreSQL counterpart of `bulk_upsert_users`: `COPY` into temporary staging tables, then merge.
+
+    Items are validated with the same serializers; the merge is an `UPDATE ...
+    FROM` for existing users (with `upsert`) and an `INSERT ... SELECT` for new
+    ones, with addresses merged on their unique key with `ON CONFLICT`.
+    """
+    valid, results = validate_items(items)
+    users_table = User._meta.db_table  # noqa: SLF001
+    addresses_table = UserAddress._meta.db_table  # noqa: SLF001
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE import_users (idx integer NOT NULL, "
+            f"{', '.join(f'{column} text' for column in USER_COLUMNS)})",
+        )
+        cursor.execute(
+            "CREATE TEMPORARY TABLE import_addresses (email text NOT NULL, valid_from timestamptz NOT NULL, "
+            f"{', '.join(f'{column} text' for column in ADDRESS_COLUMNS if column != 'valid_from')})",
+        )
+        _copy(
+            cursor,
+            "import_users",
+            ("idx", *USER_COLUMNS),
+            ((index, *(data.get(column) for column in USER_COLUMNS)) for index, data in valid.values()),
+        )
+        _copy(
+            cursor,
+            "import_addresses",
+            ("email", *ADDRESS_COLUMNS),
+            (
+                (email, *(address[column] for column in ADDRESS_COLUMNS))
+                for email, (_, data) in valid.items()
+                for address in data.get("addresses", [])
+            ),
+        )
+
+        if upsert:
+            assignments = ", ".join(f"{column} = COALESCE(s.{column}, u.{column})" for column in USER_COLUMNS)
+            cursor.execute(
+                f"UPDATE {users_table} u SET {assignments}, updated_at = %s "  # noqa: S608
+                "FROM import_users s WHERE u.email = s.email RETURNING s.idx, u.id",
+                [now],
+            )
+            for index, pk in cursor.fetchall():
+                results[index] = {"index": index, "status": "updated", "id": pk}
+        else:
+            cursor.execute(
+                f"DELETE FROM import_users s USING {users_table} u WHERE u.email = s.email RETURNING s.idx",  # noqa: S608
+            )
+            for (index,) in cursor.fetchall():
+                results[index] = {"index": index, "status": "error", "errors": {"email": [USER_EXISTS_MESSAGE]}}
+
+        defaults = {column: User._meta.get_field(column).get_default() for column in USER_COLUMNS}  # noqa: SLF001
+        cursor.execute(
+            f"INSERT INTO {users_table} ({', '.join(USER_COLUMNS)}, created_at, updated_at) "  # noqa: S608
+            f"SELECT {', '.join(f'COALESCE(s.{column}, %s)' for column in USER_COLUMNS)}, %s, %s "
+            f"FROM import_users s WHERE NOT EXISTS (SELECT 1 FROM {users_table} u WHERE u.email = s.email) "
+            "RETURNING email, id",
+            [*defaults.values(), now, now],
+        )
+        for email, pk in cursor.fetchall():
+            index = valid[email][0]
+            results[index] = {"index": index, "status": "created", "id": pk}
+
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in ADDRESS_COLUMNS)
+        conflict = f"DO UPDATE SET {assignments}, updated_at = EXCLUDED.updated_at" if upsert else "DO NOTHING"
+        cursor.execute(
+            f"INSERT INTO {addresses_table} (user_id, {', '.join(ADDRESS_COLUMNS)}, created_at, updated_at) "  # noqa: S608
+            f"SELECT u.id, {', '.join(f'a.{column}' for column in ADDRESS_COLUMNS)}, %s, %s "
+            "FROM import_addresses a JOIN import_users s ON s.email = a.email "
+            f"JOIN {users_table} u ON u.email = a.email "
+            f"ON CONFLICT (user_id, address_type, valid_from) {conflict}",
+            [now, now],
+        )
+        # Not ON COMMIT DROP: the chunk may run inside an outer transaction.
+        cursor.execute("DROP TABLE import_users, import_addresses")
+
+    # Rows inserted concurrently by someone else between the UPDATE/DELETE and the INSERT.
+    for index in range(len(items)):
+        if index not in results:
+            results[index] = {"index": index, "status": "error", "errors": {"email": [USER_EXISTS_MESSAGE]}}
+    users_changed.send(sender=User, user_ids=[result["id"] for result in results.values() if "id" in result])
+    return [results[index] for index in range(len(items))]
+
+
+LOADERS: dict[str, Loader] = {"copy": copy_upsert_users, "bulk": bulk_upsert_users}
+
+
+def default_method() -> str:
+    return "copy" if connection.vendor == "postgresql" else "bulk"
+
+
+@dataclass
+class Checkpoint:
+    """Progress of an import, saved in the transaction of every chunk so an interrupted import can resume."""
+
+    input: str
+    offset: int = 0
+    line: int = 0
+    # Size of the rejects file once the rejects of the recorded chunks were written.
+    rejects_offset: int = 0
+    stats: ImportStats = field(default_factory=ImportStats)
+
+    @classmethod
+    def load(cls, path: str) -> Checkpoint:
+        """The checkpoint of the import of `path`; a new one if it has none."""
+        saved = ImportCheckpoint.objects.filter(path=path).first()
+        if saved is None:
+            return cls(path)
+        return cls(path, saved.offset, saved.line, saved.rejects_offset, ImportStats(**saved.stats))
+
+    def save(self) -> None:
+        ImportCheckpoint.objects.update_or_create(
+            path=self.input,
+            defaults={
+                "offset": self.offset,
+                "line": self.line,
+                "rejects_offset": self.rejects_offset,
+                "stats": asdict(self.stats),
+            },
+        )
+
+    def delete(self) -> None:
+        ImportCheckpoint.objects.filter(path=self.input).delete()
+
+
+class UserImporter:
+    """
+    Stream users with nested addresses from an NDJSON or CSV file into the database.
+
+    Items are loaded `chunk_size` at a time, each chunk in its own transaction,
+    by `method` ("copy" on PostgreSQL, "bulk" elsewhere). Items the serializers
+    reject are appended to `rejects` as NDJSON. The checkpoint is saved in the
+    transaction of every chunk, and removed once the whole file has been
+    imported; a resumed import first cuts the rejects file back to the
+    checkpoint, dropping the rejects of a chunk that was not committed.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: str,
+        input_format: str,
+        *,
+        upsert: bool = False,
+        chunk_size: int | None = None,
+        method: str | None = None,
+        rejects_path: str | None = None,
+        progress: Callable[[Checkpoint, float], None] | None = None,
+    ) -> None:
+        self.path = path
+        self.reader = READERS[input_format]
+        self.upsert = upsert
+        self.chunk_size = chunk_size or settings.USERS_IMPORT_CHUNK_SIZE
+        self.loader = LOADERS[method or default_method()]
+        self.rejects_path = rejects_path or f"{path}.rejected.ndjson"
+        self.progress = progress
+
+    def run(self, *, resume: bool = False) -> tuple[ImportStats, float]:
+        """Import the file; returns the statistics and the elapsed time of this run in seconds."""
+        checkpoint = Checkpoint(os.path.abspath(self.path))  # noqa: PTH100
+        if resume:
+            checkpoint = Checkpoint.load(checkpoint.input)
+        started = time.perf_counter()
+        rows_before = checkpoint.stats.rows
+        with open(self.path, "rb") as file, open(self.rejects_path, "a") as rejects:  # noqa: PTH123
+            rejects.truncate(checkpoint.rejects_offset)
+            chunk: list[Record] = []
+            for record in self.reader(file, checkpoint.offset, checkpoint.line):
+                chunk.append(record)
+                if len(chunk) >= self.chunk_size:
+                    self.load_chunk(chunk, checkpoint, rejects)
+                    self.report(checkpoint, started, rows_before)
+                    chunk = []
+            if chunk:
+                self.load_chunk(chunk, checkpoint, rejects)
+                self.report(checkpoint, started, rows_before)
+        checkpoint.delete()
+        return checkpoint.stats, time.perf_counter() - started
+
+    def load_chunk(self, chunk: list[Record], checkpoint: Checkpoint, rejects: IO[str]) -> None:
+        """Load `chunk` and save the checkpoint after it in one transaction."""
+        parsed = [record for record in chunk if record.error is None]
+        with transaction.atomic():
+            loaded = iter(self.loader([record.item for record in parsed], upsert=self.upsert) if parsed else [])
+            results = [
+                {"status": "error", "errors": record.error} if record.error is not None else next(loaded)
+                for record in chunk
+            ]
+            for record, result in zip(chunk, results):
+                if result["status"] == "error":
+                    line = {"line": record.line, "errors": result["errors"], "item": record.item}
+                    rejects.write(json.dumps(line) + "\n")
+            rejects.flush()
+
+            checkpoint.stats.add(chunk, results)
+            checkpoint.offset = chunk[-1].end_offset
+            checkpoint.line = chunk[-1].line + chunk[-1].rows - 1
+            checkpoint.rejects_offset = os.fstat(rejects.fileno()).st_size
+            checkpoint.save()
+
+    def report(self, checkpoint: Checkpoint, started: float, rows_before: int) -> None:
+        if self.progress is not None:
+            self.progress(checkpoint, (checkpoint.stats.rows - rows_before) / max(time.perf_counter() - started, 1e-9))
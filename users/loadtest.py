@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .benchmarks import benchmark_database
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from django.core.handlers.asgi import ASGIHandler
+
+
+class Connection(Protocol):
+    async def get(self) -> int: ...
+
+    async def close(self) -> None: ...
+
+
+class HTTPConnection:
+    """A keep-alive HTTP/1.1 connection to the server of `url`, reconnecting when the server closes it."""
+
+    def __init__(self, url: str) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.netloc = parts.netloc
+        self.target = f"{parts.path or '/'}{'?' + parts.query if parts.query else ''}"
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def get(self) -> int:
+        return await self.send("GET", self.target)
+
+    async def send(self, method: str, target: str, body: bytes | None = None) -> int:
+        """Send a request, with `body` as JSON, and return the response status once its body is read."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        head = f"{method} {target} HTTP/1.1\r\nHost: {self.netloc}\r\nAccept: application/json\r\n"
+        if body is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write(f"{head}\r\n".encode() + (body or b""))
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while size := int((await self.reader.readline()).split(b";")[0], 16):
+                await self.reader.readexactly(size + 2)
+            await self.reader.readline()
+        if headers.get("connection") == "close":
+            await self.close()
+        return status
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class ASGIConnection:
+    """`GET url` through a Django ASGI application in this process, without a server or sockets."""
+
+    def __init__(self, application: ASGIHandler, url: str) -> None:
+        self.application = application
+        parts = urlsplit(url)
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": parts.path,
+            "raw_path": parts.path.encode(),
+            "query_string": parts.query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"accept", b"application/json")],
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+        }
+
+    async def get(self) -> int:
+        status = 0
+
+        async def receive() -> dict:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await self.application(self.scope, receive, send)
+        return status
+
+    async def close(self) -> None:
+        pass
+
+
+async def run_load(connect: Callable[[], Connection], requests: int, concurrency: int, warmup: int = 0) -> dict:
+    """
+    Send `requests` requests over `concurrency` connections, each with one request in flight at a time.
+
+    Returns the throughput, the latency percentiles in milliseconds and the
+    number of failed (non-200) requests. `warmup` requests are sent first and
+    not measured.
+    """
+
+    async def send(count: int) -> tuple[list[float], int]:
+        latencies = []
+        errors = 0
+        remaining = count
+
+        async def worker() -> None:
+            nonlocal remaining, errors
+            connection = connect()
+            try:
+                while remaining > 0:
+                    remaining -= 1
+                    start = time.perf_counter()
+                    try:
+                        status = await connection.get()
+                    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                        await connection.close()
+                        status = 0
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    errors += status != 200  # noqa: PLR2004
+            finally:
+                await connection.close()
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, count))))
+        return latencies, errors
+
+    if warmup:
+        await send(warmup)
+    start = time.perf_counter()
+    latencies, errors = await send(requests)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        "errors": errors,
+    }
+
+
+# Validity start of the first address created by `RequestMix`, one second apart after it.
+VALID_FROM = datetime(2000, 1, 1, tzinfo=timezone.utc)
+# Operation -> share of the requests, for `RequestMix`.
+DEFAULT_MIX = {"list": 50, "retrieve": 25, "address_list": 15, "create": 4, "update": 4, "address_create": 2}
+# Operation -> (method, path, status of a successful response).
+OPERATIONS = {
+    "list": ("GET", "/api/users/", 200),
+    "retrieve": ("GET", "/api/users/{user}/", 200),
+    "address_list": ("GET", "/api/users/{user}/address/", 200),
+    "create": ("POST", "/api/users/", 201),
+    "update": ("PATCH", "/api/users/{user}/", 200),
+    "address_create": ("POST", "/api/users/{user}/address/", 201),
+}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    """A mix given as `operation=weight,...`, e.g. `list=80,create=20`."""
+    mix = {}
+    for item in filter(None, value.replace(" ", "").split(",")):
+        operation, _, weight = item.partition("=")
+        if operation not in OPERATIONS:
+            msg = f"Unknown operation {operation!r}, expected one of {', '.join(OPERATIONS)}"
+            raise ValueError(msg)
+        mix[operation] = int(weight or "1")
+    return mix
+
+
+class RequestMix:
+    """
+    Requests drawn from `mix` over the users `user_ids`, the same sequence for the same `seed`.
+
+    Created users and addresses get unique emails and validity dates, so
+    that writes succeed however many requests are drawn.
+    """
+
+    def __init__(self, mix: dict[str, int], user_ids: list[int], seed: int = 0) -> None:
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.user_ids = user_ids
+        self.random = random.Random(seed)  # noqa: S311
+        self.seed = seed
+        self.sequence = 0
+
+    def next(self) -> tuple[str, str, str, bytes | None, int]:
+        """The operation, method, path, JSON body and expected status of the next request."""
+        operation = self.random.choices(self.operations, self.weights)[0]
+        method, path, expected_status = OPERATIONS[operation]
+        user = self.random.choice(self.user_ids)
+        self.sequence += 1
+        body = None
+        if operation == "create":
+            body = {"last_name": "Load", "email": f"load{self.seed}-{self.sequence}@loadtest.example.com"}
+        elif operation == "update":
+            body = {"first_name": f"Load{self.sequence}"}
+        elif operation == "address_create":
+            body = {
+                "address_type": "HOME",
+                "valid_from": (VALID_FROM + timedelta(seconds=self.sequence)).isoformat(),
+                "post_code": "12345",
+                "city": "Load City",
+                "country_code": "USA",
+                "street": "Load Street",
+                "building_number": str(self.sequence),
+            }
+        return operation, method, path.format(user=user), json.dumps(body).encode() if body else None, expected_status
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """The `fraction` percentile of the sorted `values`."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_arrivals(
+    connect: Callable[[], HTTPConnection],
+    mix: RequestMix,
+    rate: float,
+    duration: float,
+    max_connections: int = 256,
+) -> dict:
+    """
+    Send requests from `mix` at `rate` per second for `duration` seconds, whatever the server's pace.
+
+    Arrivals are a Poisson process seeded like `mix`. A request is timed from
+    its scheduled arrival, so the time it waits for one of `max_connections`
+    connections counts: a saturated server shows as growing latency and a
+    throughput below `rate`, not as a slower arrival rate. Returns the totals,
+    and the latency percentiles (ms) and errors of each operation.
+    """
+    loop = asyncio.get_running_loop()
+    arrivals = random.Random(mix.seed)  # noqa: S311
+    slots = asyncio.Semaphore(max_connections)
+    idle: list[HTTPConnection] = []
+    connections: list[HTTPConnection] = []
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+
+    async def send(scheduled: float, request: tuple[str, str, str, bytes | None, int]) -> None:
+        operation, method, path, body, expected = request
+        async with slots:
+            if idle:
+                connection = idle.pop()
+            else:
+                connection = connect()
+                connections.append(connection)
+            try:
+                status = await connection.send(method, path, body)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                await connection.close()
+                status = 0
+            idle.append(connection)
+        latencies.setdefault(operation, []).append((loop.time() - scheduled) * 1000)
+        errors[operation] = errors.get(operation, 0) + (status != expected)
+
+    tasks = []
+    start = loop.time()
+    offset = 0.0
+    while offset < duration:
+        await asyncio.sleep(max(0.0, start + offset - loop.time()))
+        tasks.append(asyncio.create_task(send(start + offset, mix.next())))
+        offset += arrivals.expovariate(rate)
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+    for connection in connections:
+        await connection.close()
+
+    every = sorted(latency for values in latencies.values() for latency in values)
+    return {
+        "rate": rate,
+        "requests": len(every),
+        # Arrivals per second actually drawn, which vary around `rate` over a short run.
+        "offered_rps": round(len(every) / duration, 1),
+        "rps": round(len(every) / elapsed, 1),
+        "p50_ms": round(statistics.median(every), 3),
+        "p90_ms": round(percentile(every, 0.9), 3),
+        "p99_ms": round(percentile(every, 0.99), 3),
+        "error_rate": round(sum(errors.values()) / len(every), 4),
+        "connections": len(connections),
+        "operations": {
+            operation: {
+                "requests": len(values),
+                "p50_ms": round(statistics.median(sorted(values)), 3),
+                "p99_ms": round(percentile(sorted(values), 0.99), 3),
+                "errors": errors[operation],
+            }
+            for operation, values in sorted(latencies.items())
+        },
+    }
+
+
+def is_saturated(result: dict, slo_ms: float, max_error_rate: float = 0.01) -> bool:
+    """Whether the server fell behind the arrival rate, broke the p99 objective or failed requests."""
+    return (
+        result["rps"] < result["offered_rps"] * 0.95
+        or result["p99_ms"] > slo_ms
+        or result["error_rate"] > max_error_rate
+    )
+
+
+@contextmanager
+def run_servers(interface: str, workers: int, environment: dict[str, str]) -> Iterator[str]:
+    """
+    Start `workers` processes serving `app.wsgi` or `app.asgi` on one local port; yields its URL.
+
+    The workers share a socket bound here (see app.servers), with the
+    environment of this process updated with `environment`.
+    """
+    listener = socket.create_server(("127.0.0.1", 0), backlog=1024)
+    env = {**os.environ, **environment}
+    processes = [
+        subprocess.Popen(  # noqa: S603
+            [sys.executable, "-m", "app.servers", interface, "--fd", str(listener.fileno())],
+            cwd=settings.BASE_DIR,
+            env=env,
+            pass_fds=[listener.fileno()],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(workers)
+    ]
+    try:
+        for process in processes:
+            if process.stdout.readline().strip() != "ready":
+                msg = f"{interface} worker exited with {process.wait()}"
+                raise RuntimeError(msg)
+        host, port = listener.getsockname()
+        yield f"http://{host}:{port}"
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+            process.stdout.close()
+        listener.close()
+
+
+@contextmanager
+def load_database(directory: str) -> Iterator[dict[str, str]]:
+    """
+    A throwaway test database that server processes can share; yields the environment pointing them at it.
+
+    SQLite test databases live in memory unless named, so this one is a file
+    in `directory`.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "loadtest.sqlite3")
+    with benchmark_database():
+        yield {"DATABASE_NAME": connection.settings_dict["NAME"], "DATABASE_REPLICAS": ""}
@@ -0,0 +1,70 @@
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from users.benchmarks import SCENARIOS, BenchmarkOptions, benchmark_database, compare_results, format_table
+
+
+class Command(BaseCommand):
+    help = "Run a users API benchmark scenario against a throwaway test database."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        defaults = BenchmarkOptions()
+        parser.add_argument("scenario", choices=sorted(SCENARIOS))
+        parser.add_argument("--users", type=int, default=defaults.users, help="Number of users to seed.")
+        parser.add_argument("--addresses", type=int, default=defaults.addresses, help="Addresses per user.")
+        parser.add_argument("--repeat", type=int, default=defaults.repeat, help="Requests per measurement.")
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=defaults.skew,
+            help="Zipf exponent of the addresses per user, e.g. 1.2; 0 gives every user --addresses.",
+        )
+        parser.add_argument("--output", type=Path, help="Write the options and results to this JSON file.")
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            help="JSON file written by --output to compare with; fails on regressions beyond --threshold.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Relative change of ops/s, latency or peak memory counted as a regression.",
+        )
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        benchmark_options = BenchmarkOptions(
+            users=options["users"],
+            addresses=options["addresses"],
+            repeat=options["repeat"],
+            skew=options["skew"],
+        )
+        baseline = None
+        if options["baseline"]:
+            baseline = json.loads(options["baseline"].read_text())
+            recorded = {**baseline["options"], "repeat": benchmark_options.repeat}
+            if baseline["scenario"] != options["scenario"] or recorded != asdict(benchmark_options):
+                msg = f"{options['baseline']} was recorded for {baseline['scenario']} with {baseline['options']}"
+                raise CommandError(msg)
+
+        with benchmark_database():
+            rows = SCENARIOS[options["scenario"]](benchmark_options)
+
+        for line in format_table(rows):
+            self.stdout.write(line)
+        if options["output"]:
+            output = {"scenario": options["scenario"], "options": asdict(benchmark_options), "results": rows}
+            options["output"].write_text(json.dumps(output, indent=2) + "\n")
+
+        if baseline is not None:
+            comparison = compare_results(baseline["results"], rows, options["threshold"])
+            self.stdout.write("")
+            for line in format_table(comparison):
+                self.stdout.write(line)
+            regressions = [row for row in comparison if row["regressed"]]
+            if regressions:
+                msg = f"{len(regressions)} regressions against {options['baseline']}"
+                raise CommandError(msg)
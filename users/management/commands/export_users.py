@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from users.export import EXPORT_FORMATS, export_users
+from users.filters import filter_users
+from users.models import User
+from users.serializers import UserExportFilterSerializer
+
+
+class Command(BaseCommand):
+    help = "Stream all users with their addresses as NDJSON or CSV."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default=EXPORT_FORMATS[0], dest="export_format")
+        parser.add_argument("--output", "-o", help="File to write to; defaults to standard output.")
+        parser.add_argument("--status", choices=[code for code, _ in User.STATUS_CHOICES])
+        parser.add_argument("--updated-after", help="Only users updated at or after this ISO 8601 timestamp.")
+        parser.add_argument("--updated-before", help="Only users updated before this ISO 8601 timestamp.")
+        parser.add_argument("--chunk-size", type=int, help="Rows fetched per database round trip.")
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        data = {name: options[name] for name in ("status", "updated_after", "updated_before") if options[name]}
+        filters = UserExportFilterSerializer(data=data)
+        if not filters.is_valid():
+            raise CommandError(filters.errors)
+
+        queryset = filter_users(User.objects.all(), **filters.validated_data)
+        chunks = export_users(queryset, options["export_format"], options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "wb") as output:  # noqa: PTH123
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
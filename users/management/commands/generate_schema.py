@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from app.schema import SCHEMA_FORMATS, generate_schema
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema as openapi.json and openapi.yaml, served by /api.json/ and /api.yaml/."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--output-dir",
+            default=settings.OPENAPI_SCHEMA_DIR,
+            help="Directory to write the schema files to; OPENAPI_SCHEMA_DIR by default.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Write nothing; fail if the files differ from the schema of the current code.",
+        )
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        directory = Path(options["output_dir"])
+        if not options["check"]:
+            directory.mkdir(parents=True, exist_ok=True)
+        stale = []
+        for schema_format in SCHEMA_FORMATS:
+            path = directory / f"openapi.{schema_format}"
+            content = generate_schema(schema_format)
+            if options["check"]:
+                if not path.is_file() or path.read_bytes() != content:
+                    stale.append(str(path))
+                continue
+            path.write_bytes(content)
+            self.stdout.write(f"Wrote {path} ({len(content)} bytes)")
+        if stale:
+            msg = f"Out of date, run manage.py generate_schema: {', '.join(stale)}"
+            raise CommandError(msg)
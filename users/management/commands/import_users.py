@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from users.imports import IMPORT_FORMATS, LOADERS, Checkpoint, UserImporter
+
+
+class Command(BaseCommand):
+    help = "Import users with their addresses from an NDJSON or CSV file in the layout written by export_users."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help="NDJSON or CSV file to import.")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            dest="input_format",
+            help="Input format; detected from the file extension by default.",
+        )
+        parser.add_argument("--upsert", action="store_true", help="Update users that already exist (matched on email).")
+        parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.USERS_IMPORT_CHUNK_SIZE,
+            help="Items per transaction and checkpoint.",
+        )
+        parser.add_argument(
+            "--method",
+            choices=sorted(LOADERS),
+            help="Load with PostgreSQL COPY or batched bulk_create; picked from the database backend by default.",
+        )
+        parser.add_argument("--rejects", help="File receiving rejected items; defaults to <path>.rejected.ndjson.")
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        path = options["path"]
+        input_format = options["input_format"] or ("csv" if Path(path).suffix.lower() == ".csv" else "ndjson")
+        importer = UserImporter(
+            path,
+            input_format,
+            upsert=options["upsert"],
+            chunk_size=options["chunk_size"],
+            method=options["method"],
+            rejects_path=options["rejects"],
+            progress=self.report_progress if options["verbosity"] > 1 else None,
+        )
+        try:
+            stats, elapsed = importer.run(resume=options["resume"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc) from exc
+
+        rows = stats.rows
+        self.stdout.write(
+            f"Imported {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s): "
+            f"{stats.created} created, {stats.updated} updated, {stats.rejected} rejected.",
+        )
+        if stats.rejected:
+            self.stdout.write(f"Rejected items were written to {importer.rejects_path}")
+
+    def report_progress(self, checkpoint: Checkpoint, rate: float) -> None:
+        self.stdout.write(f"line {checkpoint.line}: {checkpoint.stats.rows} rows, {rate:.0f} rows/s")
@@ -0,0 +1,51 @@
+import asyncio
+from functools import partial
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandParser
+from django.test.utils import override_settings
+
+from app.urls import URLConf
+from users.benchmarks import benchmark_database, format_table, seed_users
+from users.loadtest import ASGIConnection, HTTPConnection, run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test GET requests at high concurrency and report requests/s and latency percentiles. "
+        "Without --url, the sync and async views are compared in this process through Django's ASGI handler, "
+        "against a throwaway test database."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--url",
+            action="append",
+            default=[],
+            help="URL of a running deployment to load; repeat to compare deployments, e.g. gunicorn and uvicorn.",
+        )
+        parser.add_argument("--path", default="/api/users/", help="Path (and query) requested in this process.")
+        parser.add_argument("--requests", type=int, default=2_000, help="Measured requests per target.")
+        parser.add_argument("--concurrency", type=int, default=100, help="Connections with a request in flight.")
+        parser.add_argument("--users", type=int, default=1_000, help="Users to seed in this process.")
+        parser.add_argument("--addresses", type=int, default=1, help="Addresses per seeded user.")
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        load = {"requests": options["requests"], "concurrency": options["concurrency"]}
+        load["warmup"] = min(load["requests"], load["concurrency"])
+        rows = []
+        if options["url"]:
+            for url in options["url"]:
+                result = asyncio.run(run_load(partial(HTTPConnection, url), **load))
+                rows.append({"target": url, **result})
+        else:
+            with benchmark_database():
+                seed_users(options["users"], options["addresses"])
+                application = ASGIHandler()
+                for label, async_views in (("sync views", False), ("async views", True)):
+                    with override_settings(ROOT_URLCONF=URLConf(async_views=async_views)):
+                        connect = partial(ASGIConnection, application, options["path"])
+                        rows.append({"target": label, **asyncio.run(run_load(connect, **load))})
+
+        for line in format_table(rows):
+            self.stdout.write(line)
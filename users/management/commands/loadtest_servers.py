@@ -0,0 +1,108 @@
+import asyncio
+import json
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from users.benchmarks import format_table, seed_users
+from users.loadtest import (
+    DEFAULT_MIX,
+    HTTPConnection,
+    RequestMix,
+    is_saturated,
+    load_database,
+    parse_mix,
+    run_arrivals,
+    run_servers,
+)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app through app/wsgi.py or app/asgi.py on local worker processes, against a throwaway seeded "
+        "database, and replay a read/write mix at increasing arrival rates until the server saturates."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--server",
+            action="append",
+            choices=("wsgi", "asgi"),
+            help="Server mode to load; repeat to compare (default: both).",
+        )
+        parser.add_argument(
+            "--workers",
+            action="append",
+            type=int,
+            help="Worker processes; repeat to compare (default: 1).",
+        )
+        parser.add_argument(
+            "--rates",
+            default="25,50,100,200,400",
+            help="Comma-separated arrival rates (requests/s), each run for --duration until one saturates.",
+        )
+        parser.add_argument("--duration", type=float, default=10, help="Seconds of each rate.")
+        parser.add_argument("--warmup", type=float, default=2, help="Seconds at the first rate, not measured.")
+        parser.add_argument(
+            "--mix",
+            default=",".join(f"{operation}={weight}" for operation, weight in DEFAULT_MIX.items()),
+            help="Weights of the operations as operation=weight,...",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the request mix and arrival times.")
+        parser.add_argument("--slo-ms", type=float, default=250, help="p99 latency above which a rate saturates.")
+        parser.add_argument("--max-connections", type=int, default=256, help="Client connections at most.")
+        parser.add_argument("--users", type=int, default=1_000, help="Users to seed.")
+        parser.add_argument("--addresses", type=int, default=1, help="Addresses per seeded user.")
+        parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent of the addresses per user.")
+        parser.add_argument("--output", type=Path, help="Write the options and results to this JSON file.")
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        try:
+            mix = parse_mix(options["mix"])
+            rates = [float(rate) for rate in options["rates"].split(",")]
+        except ValueError as error:
+            raise CommandError(error) from error
+
+        rows = []
+        for interface in options["server"] or ["wsgi", "asgi"]:
+            for workers in options["workers"] or [1]:
+                rows += self.load(interface, workers, mix, rates, options)
+
+        for line in format_table([{key: value for key, value in row.items() if key != "operations"} for row in rows]):
+            self.stdout.write(line)
+        for target in dict.fromkeys(row["target"] for row in rows):
+            saturated = [row["rate"] for row in rows if row["target"] == target and row["saturated"]]
+            summary = (
+                f"saturated at {saturated[0]:g} req/s" if saturated else f"not saturated up to {rates[-1]:g} req/s"
+            )
+            self.stdout.write(f"{target}: {summary}")
+        if options["output"]:
+            recorded = {key: options[key] for key in ("rates", "duration", "warmup", "mix", "seed", "slo_ms")}
+            output = {"options": {**recorded, "users": options["users"], "addresses": options["addresses"]}}
+            options["output"].write_text(json.dumps({**output, "results": rows}, indent=2) + "\n")
+
+    def load(self, interface: str, workers: int, mix: dict[str, int], rates: list[float], options: dict) -> list[dict]:
+        """The results of each rate against `workers` `interface` workers, up to the first saturated one."""
+        target = f"{interface} x{workers}"
+        rows = []
+        # A fresh database for each target, so that every run replays the same requests against the same data.
+        with tempfile.TemporaryDirectory() as directory, load_database(directory) as environment:
+            seed_users(options["users"], options["addresses"], skew=options["skew"])
+            requests = RequestMix(mix, list(User.objects.values_list("id", flat=True)), seed=options["seed"])
+            environment["DJANGO_ASYNC_VIEWS"] = str(interface == "asgi").lower()
+            with run_servers(interface, workers, environment) as url:
+                connect = partial(HTTPConnection, url)
+                arrivals = partial(run_arrivals, connect, requests, max_connections=options["max_connections"])
+                if options["warmup"]:
+                    asyncio.run(arrivals(rates[0], options["warmup"]))
+                for rate in rates:
+                    result = asyncio.run(arrivals(rate, options["duration"]))
+                    saturated = is_saturated(result, options["slo_ms"])
+                    rows.append({"target": target, **result, "saturated": saturated})
+                    self.stderr.write(f"{target} at {rate:g} req/s: {result['rps']} req/s, p99 {result['p99_ms']} ms")
+                    if saturated:
+                        break
+        return rows
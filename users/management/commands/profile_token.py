@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.profiling import PROFILE_HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = "Print a token that profiles the requests sending it in the X-Profile header, when profiling is enabled."
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        self.stdout.write(f"{PROFILE_HEADER}: {make_token()}")
+        self.stderr.write(f"Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds.")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from users.cache import response_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the users response cache, reset them, or invalidate every cached response."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--reset-stats", action="store_true", help="Reset the hit/miss counters.")
+        parser.add_argument("--invalidate", action="store_true", help="Invalidate every cached response.")
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        stats = response_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups if lookups else 0
+        self.stdout.write(f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {ratio:.1%}")
+        if options["reset_stats"]:
+            response_cache.reset_stats()
+            self.stdout.write("Counters reset.")
+        if options["invalidate"]:
+            response_cache.invalidate()
+            self.stdout.write("Cached responses invalidated.")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from app.startup import imported_only_by, profile_startup
+from users.benchmarks import format_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Start fresh worker processes with and without DJANGO_LAZY_LOADING, and report their cold start time, "
+        "import time (-X importtime) and peak RSS, and the packages only the eager workers import."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi", help="Entry point of the workers.")
+        parser.add_argument("--path", default="/health/", help="Path resolved by the workers, loading the URLconf.")
+        parser.add_argument("--repeat", type=int, default=5, help="Workers started in each mode.")
+        parser.add_argument("--top", type=int, default=10, help="Packages to list by import time.")
+
+    def handle(self, *args: object, **options: object) -> None:  # noqa: ARG002
+        entry_point = f"app.{options['server']}"
+        rows, imports = [], []
+        for lazy_loading in (False, True):
+            row, worker_imports = profile_startup(
+                entry_point,
+                options["path"],
+                lazy_loading=lazy_loading,
+                repeat=options["repeat"],
+            )
+            rows.append(row)
+            imports.append(worker_imports)
+
+        for line in format_table(rows):
+            self.stdout.write(line)
+        self.stdout.write("")
+        self.stdout.write("Imported on startup without lazy loading only:")
+        packages = imported_only_by(*imports)
+        for package, microseconds in list(packages.items())[: options["top"]]:
+            self.stdout.write(f"  {package:<32} {microseconds / 1000:8.1f} ms")
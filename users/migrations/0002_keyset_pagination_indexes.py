@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="user",
+            options={"verbose_name": "User", "verbose_name_plural": "Users"},
+        ),
+        migrations.AlterModelOptions(
+            name="useraddress",
+            options={"verbose_name": "User Address", "verbose_name_plural": "User Addresses"},
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["created_at", "id"], name="users_created_at_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="useraddress",
+            index=models.Index(fields=["user", "valid_from", "id"], name="users_addr_user_valid_id_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="useraddress",
+            index=models.Index(fields=["user", "id"], name="users_addr_user_id_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_export_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="useraddress",
+            index=models.Index(fields=["user", "address_type", "-valid_from"], name="users_addr_current_idx"),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:20
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_current_address_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["status", "created_at", "id"], name="users_status_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["updated_at", "id"], name="users_updated_at_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["last_name", "id"], name="users_last_name_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(django.db.models.functions.text.Upper("email"), name="users_email_upper_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="useraddress",
+            index=models.Index(fields=["country_code", "city", "user"], name="users_addr_country_city_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="useraddress",
+            index=models.Index(fields=["city", "user"], name="users_addr_city_user_idx"),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+import users.models
+
+# Trigram indexes matching the `UPPER(field::text) LIKE ...` that `icontains` compiles to.
+POSTGRESQL_INDEXES = {
+    "users": ("first_name", "last_name", "initials", "email"),
+    "users_addresses": ("street", "city"),
+}
+
+# FTS5 tables indexing the same fields, filled from the existing rows and kept in sync by users.search.
+SQLITE_TABLES = {
+    "users_search": ("users", ("first_name", "last_name", "initials", "email")),
+    "users_addresses_search": ("users_addresses", ("street", "city")),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table, fields in POSTGRESQL_INDEXES.items():
+            for field in fields:
+                schema_editor.execute(
+                    f"CREATE INDEX {table}_{field}_trgm_idx ON {table} USING gin ((UPPER({field}::text)) gin_trgm_ops)"
+                )
+    elif vendor == "sqlite":
+        for table, (source, fields) in SQLITE_TABLES.items():
+            columns = ", ".join(fields)
+            schema_editor.execute(f"CREATE VIRTUAL TABLE {table} USING fts5({columns}, tokenize='trigram')")
+            schema_editor.execute(f"INSERT INTO {table} (rowid, {columns}) SELECT id, {columns} FROM {source}")
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for table, fields in POSTGRESQL_INDEXES.items():
+            for field in fields:
+                schema_editor.execute(f"DROP INDEX IF EXISTS {table}_{field}_trgm_idx")
+    elif vendor == "sqlite":
+        for table in SQLITE_TABLES:
+            schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_user_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserAddressSearchEntry",
+            fields=[
+                ("rank", models.FloatField()),
+                ("address", models.OneToOneField(db_column="rowid", db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name="search_entry", serialize=False, to="users.useraddress")),
+                ("document", users.models.FullTextField(db_column="users_addresses_search")),
+            ],
+            options={
+                "db_table": "users_addresses_search",
+                "abstract": False,
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="UserSearchEntry",
+            fields=[
+                ("rank", models.FloatField()),
+                ("user", models.OneToOneField(db_column="rowid", db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name="search_entry", serialize=False, to="users.user")),
+                ("document", users.models.FullTextField(db_column="users_search")),
+            ],
+            options={
+                "db_table": "users_search",
+                "abstract": False,
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
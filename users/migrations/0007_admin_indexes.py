@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="useraddress",
+            index=models.Index(fields=["created_at", "id"], name="users_addr_created_at_id_idx"),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024, unique=True)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('line', models.BigIntegerField(default=0)),
+                ('rejects_offset', models.BigIntegerField(default=0)),
+                ('stats', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'users_import_checkpoints',
+            },
+        ),
+    ]
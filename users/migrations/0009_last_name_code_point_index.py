@@ -0,0 +1,26 @@
+from django.db import migrations
+
+# Index of the `last_name COLLATE "C"` ranges `last_name_prefix` compares, see users.filters.prefix_range.
+# SQLite compares by code point already, through users_last_name_id_idx.
+POSTGRESQL_INDEX = 'CREATE INDEX users_last_name_c_idx ON users ((last_name COLLATE "C"))'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(POSTGRESQL_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS users_last_name_c_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_import_checkpoints"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Any, Callable, ClassVar
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+from app.db.routers import is_pinned, read_database
+
+from .cache import ResponseCache, response_cache
+from .renderers import LIST_RENDERER_CLASSES
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from django.db.models import Aggregate, Prefetch, QuerySet
+    from django.http import HttpRequest, HttpResponseBase
+    from rest_framework.renderers import BaseRenderer
+    from rest_framework.request import Request
+    from rest_framework.response import Response
+    from rest_framework.serializers import BaseSerializer
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=a,b` / `?omit=c` support for read requests.
+
+    Requested names are validated against the serializer's `Meta.fields`. The
+    subset trims the serializer, is pushed into the queryset with `only()`,
+    and relations listed in `prefetch_fields` are only prefetched when their
+    field is part of the response.
+    """
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+    # Serializer field name -> lookup to prefetch when that field is rendered.
+    prefetch_fields: ClassVar[dict[str, str | Prefetch]] = {}
+
+    def _parse_field_names(self, param: str, allowed: list[str]) -> list[str]:
+        names = [name.strip() for name in self.request.query_params.get(param, "").split(",") if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ValidationError(
+                {param: [f"Unknown field(s): {', '.join(unknown)}. Available fields: {', '.join(allowed)}."]},
+            )
+        return names
+
+    def get_requested_fields(self) -> tuple[str, ...] | None:
+        """Fields to render for this request, or `None` when all fields are rendered."""
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = None
+            params = self.request.query_params
+            if self.request.method in SAFE_METHODS and (
+                self.fields_query_param in params or self.omit_query_param in params
+            ):
+                allowed = list(self.get_serializer_class().Meta.fields)
+                selected = self._parse_field_names(self.fields_query_param, allowed) or allowed
+                omitted = self._parse_field_names(self.omit_query_param, allowed)
+                self._requested_fields = tuple(name for name in allowed if name in selected and name not in omitted)
+        return self._requested_fields
+
+    def get_projection_extra_fields(self) -> tuple[str, ...]:
+        """Columns that must be loaded even when not rendered, such as the keyset pagination ordering."""
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, "get_ordering_fields"):
+            return paginator.get_ordering_fields(self.request)
+        return ()
+
+    def get_prefetch_fields(self) -> dict[str, str | Prefetch]:
+        return self.prefetch_fields
+
+    def project_queryset(self, queryset: QuerySet) -> QuerySet:
+        fields = self.get_requested_fields()
+        prefetches = [lookup for name, lookup in self.get_prefetch_fields().items() if fields is None or name in fields]
+        queryset = queryset.prefetch_related(*prefetches)
+        if fields is None:
+            return queryset
+
+        opts = queryset.model._meta  # noqa: SLF001
+        serializer_fields = self.get_serializer_class()().fields
+        columns = []
+        for name in fields:
+            try:
+                model_field = opts.get_field(serializer_fields[name].source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                columns.append(model_field.name)
+        # `only()` cannot defer a relation that `select_related()` traverses; serializers render relations by pk.
+        return queryset.select_related(None).only(*columns, *self.get_projection_extra_fields())
+
+    def get_serializer(self, *args: Any, **kwargs: Any) -> BaseSerializer:  # noqa: ANN401
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+def has_validators(request: HttpRequest) -> bool:
+    """Whether `request` is conditional, sending `If-None-Match` or `If-Modified-Since`."""
+    return "If-None-Match" in request.headers or "If-Modified-Since" in request.headers
+
+
+class ConditionalGetMixin:
+    """
+    `ETag` / `Last-Modified` validators for `list` and `retrieve`.
+
+    Validators come from a single aggregate query: the latest `updated_at` and
+    the row count of the requested objects and of the reverse relations in
+    `conditional_relations` (nested in the response). So editing, adding or
+    deleting a nested row changes the parent's ETag. Matching `If-None-Match`
+    / `If-Modified-Since` requests get a 304 without the objects being loaded.
+
+    The query only runs for conditional requests, which get the validators
+    with the 304 or the response; other reads skip it and carry none.
+    Views call `get_early_response()` first thing in the handler.
+    """
+
+    conditional_actions: ClassVar[tuple[str, ...]] = ("list", "retrieve")
+    # Reverse relations rendered inside each object, e.g. nested serializers.
+    conditional_relations: ClassVar[tuple[str, ...]] = ()
+
+    validators: tuple[str, datetime | None] | None = None
+
+    def get_conditional_queryset(self) -> QuerySet:
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_version_aggregates(self) -> dict[str, Aggregate]:
+        """The latest `updated_at` and the row count of the requested objects and of `conditional_relations`."""
+        aggregates = {"updated": Max("updated_at"), "count": Count("pk", distinct=bool(self.conditional_relations))}
+        for relation in self.conditional_relations:
+            aggregates[f"{relation}_updated"] = Max(f"{relation}__updated_at")
+            aggregates[f"{relation}_count"] = Count(f"{relation}__pk")
+        return aggregates
+
+    def get_validators(self) -> tuple[str, datetime | None] | None:
+        """`(etag, last_modified)` of the response, or `None` when the requested object does not exist."""
+        # Aggregating drops the queryset's select_related()/prefetch_related()/only().
+        versions = self.get_conditional_queryset().order_by().aggregate(**self.get_version_aggregates())
+        return self.make_validators(versions)
+
+    async def aget_validators(self) -> tuple[str, datetime | None] | None:
+        versions = await self.get_conditional_queryset().order_by().aaggregate(**self.get_version_aggregates())
+        return self.make_validators(versions)
+
+    def make_validators(self, versions: dict[str, Any]) -> tuple[str, datetime | None] | None:
+        if self.action == "retrieve" and not versions["count"]:
+            return None
+
+        timestamps = [value for name, value in versions.items() if name.endswith("updated") and value is not None]
+        accepted_media_type = getattr(self.request, "accepted_media_type", "")
+        fingerprint = repr([self.request.get_full_path(), accepted_media_type, sorted(versions.items())])
+        etag = quote_etag(hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest())
+        return etag, max(timestamps, default=None)
+
+    def is_conditional(self) -> bool:
+        return (
+            self.request.method in ("GET", "HEAD")
+            and self.action in self.conditional_actions
+            and has_validators(self.request)
+        )
+
+    def get_early_response(self) -> HttpResponseBase | None:
+        """A 304 (or 412) response when the client's validators match, otherwise `None`."""
+        if not self.is_conditional():
+            return None
+        self.validators = self.get_validators()
+        return self.get_conditional_response()
+
+    async def aget_early_response(self) -> HttpResponseBase | None:
+        if not self.is_conditional():
+            return None
+        self.validators = await self.aget_validators()
+        return self.get_conditional_response()
+
+    def get_conditional_response(self) -> HttpResponseBase | None:
+        if self.validators is None:
+            return None
+        etag, last_modified = self.validators
+        return get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+
+    def finalize_response(self, request: Request, response: Response, *args: Any, **kwargs: Any) -> Response:  # noqa: ANN401
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.validators is not None and response.status_code in (200, 304):
+            etag, last_modified = self.validators
+            response.headers.setdefault("ETag", etag)
+            if last_modified is not None:
+                response.headers.setdefault("Last-Modified", http_date(last_modified.timestamp()))
+        return response
+
+
+class ListFormatsMixin:
+    """
+    Offer `list_renderer_classes` on the `list_formats_actions`, on top of the view's renderers.
+
+    These are the compact formats for bulk consumers: columnar JSON and, with
+    the msgpack package installed, MessagePack (see users.renderers). JSON
+    stays the default when the client does not ask for them.
+    """
+
+    list_renderer_classes: ClassVar[list[type[BaseRenderer]]] = LIST_RENDERER_CLASSES
+    list_formats_actions: ClassVar[tuple[str, ...]] = ("list",)
+
+    def get_renderers(self) -> list[BaseRenderer]:
+        renderers = super().get_renderers()
+        if self.action in self.list_formats_actions:
+            renderers += [renderer() for renderer in self.list_renderer_classes]
+        return renderers
+
+
+class CachedResponseMixin:
+    """
+    Serve `list` and `retrieve` from `response_cache`.
+
+    Responses are keyed on the path, the sorted query string and the media
+    type, under the version counters of the user named by the
+    `cache_user_url_kwarg` URL argument, or of all users when there is none;
+    see `users.cache`. Hits are returned (or answered with a 304 from their
+    stored validators) without touching the database. Responses must not
+    depend on who is asking.
+
+    With read replicas (see app.db.routers), clients pinned to the primary
+    after a write skip the lookup, and responses read from a replica are kept
+    for at most `DATABASE_REPLICA_PIN_SECONDS`: a lagging replica may have
+    served rows older than the write that bumped the counters.
+
+    Listed before `ConditionalGetMixin`; views call `get_early_response()`.
+    """
+
+    cached_actions: ClassVar[tuple[str, ...]] = ("list", "retrieve")
+    response_cache: ClassVar[ResponseCache] = response_cache
+    # URL keyword argument holding the id of the user every response of the view belongs to.
+    cache_user_url_kwarg: ClassVar[str | None] = None
+
+    cache_key: str | None = None
+
+    def is_cached(self) -> bool:
+        return (
+            self.request.method in ("GET", "HEAD")
+            and self.action in self.cached_actions
+            and self.response_cache.enabled
+        )
+
+    def get_cached_response(self) -> HttpResponseBase | None:
+        """The cached response (or a 304 from its stored validators); on a miss, remember the key to store under."""
+        user_id = self.kwargs.get(self.cache_user_url_kwarg) if self.cache_user_url_kwarg else None
+        key = self.response_cache.make_key(self.request, user_id)
+        response = None if is_pinned(self.request) else self.response_cache.get(key)
+        # A response stored without validators cannot answer a conditional request; it is replaced by one with them.
+        if response is None or (has_validators(self.request) and not response.has_header("ETag")):
+            self.cache_key = key
+            return None
+
+        response["X-Cache"] = "HIT"
+        return get_conditional_response(
+            self.request,
+            etag=response.get("ETag"),
+            last_modified=parse_http_date_safe(response.get("Last-Modified")),
+            response=response,
+        )
+
+    def get_early_response(self) -> HttpResponseBase | None:
+        response = self.get_cached_response() if self.is_cached() else None
+        if response is not None:
+            return response
+        parent = getattr(super(), "get_early_response", None)
+        return parent() if parent else None
+
+    async def aget_early_response(self) -> HttpResponseBase | None:
+        # Cache backends are synchronous.
+        response = await sync_to_async(self.get_cached_response)() if self.is_cached() else None
+        if response is not None:
+            return response
+        parent = getattr(super(), "aget_early_response", None)
+        return await parent() if parent else None
+
+    def finalize_response(self, request: Request, response: Response, *args: Any, **kwargs: Any) -> Response:  # noqa: ANN401
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.cache_key is not None and response.status_code == 200 and not response.streaming:  # noqa: PLR2004
+            response["X-Cache"] = "MISS"
+            key = self.cache_key
+            timeout = settings.DATABASE_REPLICA_PIN_SECONDS if read_database() is not None else None
+            if hasattr(response, "add_post_render_callback"):
+                response.add_post_render_callback(lambda rendered: self.response_cache.set(key, rendered, timeout))
+            else:
+                self.response_cache.set(key, response, timeout)
+        return response
+
+
+async def aget_object_or_404(queryset: QuerySet, **kwargs: Any) -> Any:  # noqa: ANN401
+    """`django.shortcuts.get_object_or_404()` on the async ORM."""
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist as exc:
+        message = f"No {queryset.model._meta.object_name} matches the given query."  # noqa: SLF001
+        raise Http404(message) from exc
+
+
+class AsyncViewMixin:
+    """
+    Dispatch a DRF view on the event loop instead of in a worker thread.
+
+    Under ASGI, Django runs a synchronous view in a worker thread, and by
+    default every synchronous view shares the same thread. This mixin makes the
+    view a coroutine. A handler with an `a`-prefixed variant (`alist` for
+    `list`, `aget` for `get`) is awaited, so its queries run on the async ORM.
+    The other handlers, such as writes going through DRF serializers, still
+    run in the worker thread and behave as before. Authentication, permissions
+    and throttling may read the session or the user table, so they also run
+    there.
+    """
+
+    @classmethod
+    def as_view(cls, *args: Any, **initkwargs: Any) -> Callable:  # noqa: ANN401
+        # The view function returns `dispatch()`'s coroutine.
+        return markcoroutinefunction(super().as_view(*args, **initkwargs))
+
+    async def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponseBase:  # noqa: ANN401
+        # `APIView.dispatch()` with awaited handlers.
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            handler = getattr(self, method, None) if method in self.http_method_names else None
+            handler = handler or self.http_method_not_allowed
+            async_handler = getattr(self, f"a{handler.__name__}", None)
+            if async_handler is not None:
+                response = await async_handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def apaginate_queryset(self, queryset: QuerySet) -> list | None:
+        """`paginate_queryset()` through the paginator's `apaginate_queryset()`."""
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
@@ -1,6 +1,93 @@
-from typing import ClassVar
+from __future__ import annotations
 
-from django.db import models
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from django.db import connections, models
+from django.db.models.functions import RowNumber, Upper
+from django.utils import timezone
+
+from .signals import users_changed
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import datetime
+
+
+class ChangeSignalQuerySet(models.QuerySet):
+    """Send `users_changed` for bulk writes, which do not send `post_save`."""
+
+    # Attribute holding the id of the user an object belongs to.
+    user_id_attname = "pk"
+
+    def _send_users_changed(self, objs: Iterable[models.Model] | None = None) -> None:
+        user_ids = None if objs is None else {getattr(obj, self.user_id_attname) for obj in objs}
+        self._send_user_ids(user_ids)
+
+    def _send_user_ids(self, user_ids: set[Any] | None) -> None:
+        users_changed.send(sender=self.model, user_ids=None if user_ids is None else user_ids - {None})
+
+    def update(self, **kwargs: Any) -> int:  # noqa: ANN401
+        """
+        `QuerySet.update()`, reporting the users of the updated rows.
+
+        They are read before the update, and only when someone listens. An
+        update of every row reports `None`, which receivers take as all users.
+        """
+        user_ids = None
+        if users_changed.has_listeners(self.model) and self.query.has_filters():
+            user_ids = set(self.values_list(self.user_id_attname, flat=True))
+            if self.user_id_attname != "pk":
+                # Rows moved to another user change that user too.
+                new_user = kwargs.get(self.user_id_attname, kwargs.get(self.user_id_attname.removesuffix("_id")))
+                user_ids.add(getattr(new_user, "pk", new_user))
+        rows = super().update(**kwargs)
+        if rows:
+            self._send_user_ids(user_ids)
+        return rows
+
+    def bulk_create(self, objs: Iterable[models.Model], *args: Any, **kwargs: Any) -> list[models.Model]:  # noqa: ANN401
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            self._send_users_changed(objs)
+        return objs
+
+    def bulk_update(self, objs: Iterable[models.Model], *args: Any, **kwargs: Any) -> int:  # noqa: ANN401
+        objs = list(objs)
+        rows = super().bulk_update(objs, *args, **kwargs)
+        if rows:
+            self._send_users_changed(objs)
+        return rows
+
+
+class UserAddressQuerySet(ChangeSignalQuerySet):
+    user_id_attname = "user_id"
+
+    def ranked(self, partition_by: list[str], order_by: list[str], limit: int) -> UserAddressQuerySet:
+        """The first `limit` rows of each `partition_by` group in `order_by` order, through a `ROW_NUMBER()` window."""
+        rank = models.Window(
+            RowNumber(),
+            partition_by=[models.F(field) for field in partition_by],
+            order_by=[models.F(field[1:]).desc() if field.startswith("-") else models.F(field) for field in order_by],
+        )
+        return self.annotate(partition_rank=rank).filter(partition_rank__lte=limit)
+
+    def current(self, at: datetime | None = None, *, window: bool = False) -> UserAddressQuerySet:
+        """
+        Addresses in effect at `at` (default: now): per user and type, the one with the latest `valid_from <= at`.
+
+        One query: `DISTINCT ON` where the backend supports it, a `ROW_NUMBER()`
+        window elsewhere or with `window=True` (which, unlike `DISTINCT ON`, can
+        be reordered). Both read `users_addr_current_idx`. Filter users before
+        calling this, not after.
+        """
+        queryset = self.filter(valid_from__lte=at or timezone.now())
+        if not window and connections[self.db].features.can_distinct_on_fields:
+            return queryset.order_by("user_id", "address_type", "-valid_from").distinct("user_id", "address_type")
+        return queryset.ranked(["user_id", "address_type"], ["-valid_from"], 1).order_by("user_id", "address_type")
+
+    def most_recent(self, limit: int) -> UserAddressQuerySet:
+        """Per user, the `limit` addresses with the latest `valid_from`, of any type."""
+        return self.ranked(["user_id"], ["-valid_from", "-id"], limit)
 
 
 class User(models.Model):
@@ -17,14 +104,26 @@ class User(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ChangeSignalQuerySet.as_manager()
+
     class Meta:
         db_table = "users"
+        indexes: ClassVar[list[models.Index]] = [
+            # Keyset pagination order, see users.pagination.UserKeysetPagination.
+            models.Index(fields=["created_at", "id"], name="users_created_at_id_idx"),
+            # List filters and orderings, see users.filters.filter_users.
+            models.Index(fields=["status", "created_at", "id"], name="users_status_created_id_idx"),
+            models.Index(fields=["updated_at", "id"], name="users_updated_at_id_idx"),
+            models.Index(fields=["last_name", "id"], name="users_last_name_id_idx"),
+            models.Index(Upper("email"), name="users_email_upper_idx"),
+        ]
         verbose_name = "User"
         verbose_name_plural = "Users"
 
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name} ({self.email})"
 
+
 class UserAddress(models.Model):
     ADDRESS_TYPE_CHOICES: ClassVar[list[tuple[str, str]]] = [
         ("HOME", "Home"),
@@ -44,11 +143,118 @@ class UserAddress(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserAddressQuerySet.as_manager()
+
     class Meta:
         db_table = "users_addresses"
         unique_together = ("user", "address_type", "valid_from")
+        indexes: ClassVar[list[models.Index]] = [
+            # Keyset pagination order, see users.pagination.UserAddressKeysetPagination.
+            models.Index(fields=["user", "valid_from", "id"], name="users_addr_user_valid_id_idx"),
+            # Streaming export merge order, see users.export.iter_users.
+            models.Index(fields=["user", "id"], name="users_addr_user_id_idx"),
+            # Latest address per type, see UserAddressQuerySet.current.
+            models.Index(fields=["user", "address_type", "-valid_from"], name="users_addr_current_idx"),
+            # "Has an address in" user filters, see users.filters.filter_users.
+            models.Index(fields=["country_code", "city", "user"], name="users_addr_country_city_idx"),
+            models.Index(fields=["city", "user"], name="users_addr_city_user_idx"),
+            # Admin changelist order and date hierarchy, see users.admin.HighVolumeAdminMixin.
+            models.Index(fields=["created_at", "id"], name="users_addr_created_at_id_idx"),
+        ]
         verbose_name = "User Address"
         verbose_name_plural = "User Addresses"
 
     def __str__(self) -> str:
         return f"{self.user.email} - {self.address_type} ({self.street} {self.building_number})"
+
+
+class FullTextField(models.TextField):
+    """Hidden FTS5 column named after its table; filter with `__match`."""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    """`column MATCH query`, the SQLite FTS5 full-text operator."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler: Any, connection: Any) -> tuple[str, list]:  # noqa: ANN401
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class SearchEntry(models.Model):
+    """
+    Row of a SQLite FTS5 trigram table indexing the text fields of another model, see users.search.
+
+    The primary key is the FTS `rowid`, a one-to-one link to the indexed row,
+    so searches join the FTS table instead of probing it once per row.
+    `document` is the hidden column named after the table, the left-hand side
+    of `MATCH`, and `rank` its hidden BM25 rank (lower is better). The tables
+    only exist on SQLite and are written with raw SQL; these models only read
+    them.
+    """
+
+    rank = models.FloatField()
+
+    class Meta:
+        abstract = True
+        managed = False
+
+    def __str__(self) -> str:
+        return str(self.pk)
+
+
+class UserSearchEntry(SearchEntry):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_entry",
+    )
+    document = FullTextField(db_column="users_search")
+
+    class Meta(SearchEntry.Meta):
+        abstract = False
+        db_table = "users_search"
+
+
+class UserAddressSearchEntry(SearchEntry):
+    address = models.OneToOneField(
+        UserAddress,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        related_name="search_entry",
+    )
+    document = FullTextField(db_column="users_addresses_search")
+
+    class Meta(SearchEntry.Meta):
+        abstract = False
+        db_table = "users_addresses_search"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of `manage.py import_users` through one input file, see users.imports.
+
+    It is saved in the transaction of each chunk it records, so a resumed
+    import continues exactly after the last committed chunk.
+    """
+
+    path = models.CharField(max_length=1024, unique=True)
+    offset = models.BigIntegerField(default=0)
+    line = models.BigIntegerField(default=0)
+    rejects_offset = models.BigIntegerField(default=0)
+    stats = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "users_import_checkpoints"
+
+    def __str__(self) -> str:
+        return f"{self.path} (line {self.line})"
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Model, Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+if TYPE_CHECKING:
+    from rest_framework.request import Request
+    from rest_framework.views import APIView
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed, unique ordering.
+
+    The cursor is an opaque, URL-safe token holding the ordering values of the
+    last (or first) row of the current page. Pages are fetched with a
+    `WHERE (a, b) > (x, y)` style filter instead of `OFFSET`, so the cost of a
+    page does not depend on its depth, no `COUNT(*)` is issued, and rows
+    inserted concurrently never shift or duplicate results.
+
+    `ordering` must end with a unique column (usually `id`) and is always
+    ascending.
+    """
+
+    ordering: ClassVar[tuple[str, ...]] = ("id",)
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_queryset(self, queryset: QuerySet, request: Request) -> QuerySet:
+        """The rows of the requested page, plus one to tell whether there is another page."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        if self.reverse:
+            queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.seek_filter(self.position, reverse=self.reverse))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows: list) -> list:
+        position = self.position
+        has_more = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        if self.page:
+            self.next_position = self.get_position(self.page[-1])
+            self.previous_position = self.get_position(self.page[0])
+        else:
+            # An empty page is only reachable through a cursor; point both links back at it.
+            self.next_position = self.previous_position = position
+        return self.page
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: APIView | None = None) -> list:  # noqa: ARG002
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view: APIView | None = None) -> list:  # noqa: ARG002
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def seek_filter(self, position: tuple, *, reverse: bool) -> Q:
+        """
+        Build `(f1, f2, ...) > (v1, v2, ...)` (or `<` when reversed) as a disjunction.
+
+        The leading `f1 >= v1` conjunct is redundant but lets the planner use a
+        range scan on an index starting with `f1`.
+        """
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for index in range(len(self.ordering)):
+            equal = {field: position[i] for i, field in enumerate(self.ordering[:index])}
+            condition |= Q(**equal, **{f"{self.ordering[index]}__{lookup}": position[index]})
+        return Q(**{f"{self.ordering[0]}__{lookup}e": position[0]}) & condition
+
+    def get_position(self, instance: Any) -> tuple:  # noqa: ANN401
+        if isinstance(instance, dict):
+            return tuple(instance[field] for field in self.ordering)
+        return tuple(getattr(instance, field) for field in self.ordering)
+
+    def encode_cursor(self, position: tuple, *, reverse: bool) -> str:
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        payload = json.dumps({"p": values, "r": int(reverse)}, separators=(",", ":"))
+        token = urlsafe_b64encode(payload.encode()).decode("ascii").rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request: Request, model: type[Model]) -> tuple[tuple | None, bool]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            values = payload["p"]
+            if len(values) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            position = tuple(
+                model._meta.get_field(field).to_python(value)  # noqa: SLF001
+                for field, value in zip(self.ordering, values)
+            )
+            reverse = bool(payload.get("r", 0))
+        except (binascii.Error, KeyError, TypeError, ValueError, ValidationError) as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous or self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            },
+        )
+
+
+class SelectablePagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination on request.
+
+    Clients opt in with `?pagination=cursor`; following a `next`/`previous`
+    link keeps them in keyset mode because the link carries a `cursor`.
+    Without either parameter responses are unchanged.
+    """
+
+    keyset_class: ClassVar[type[KeysetPagination]] = KeysetPagination
+    mode_query_param = "pagination"
+    keyset_mode = "cursor"
+
+    keyset: KeysetPagination | None = None
+
+    def uses_keyset(self, request: Request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == self.keyset_mode
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def get_ordering_fields(self, request: Request) -> tuple[str, ...]:
+        """Fields the page query orders by, which must be loaded even when not rendered."""
+        return self.keyset_class.ordering if self.uses_keyset(request) else ()
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: APIView | None = None) -> list | None:
+        if self.uses_keyset(request):
+            self.keyset = self.keyset_class()
+            page = self.keyset.paginate_queryset(queryset, request, view)
+            self.keyset.base_url = remove_query_param(self.keyset.base_url, self.mode_query_param)
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(
+        self,
+        queryset: QuerySet,
+        request: Request,
+        view: APIView | None = None,
+    ) -> list | None:
+        """`paginate_queryset()` on the async ORM."""
+        if self.uses_keyset(request):
+            self.keyset = self.keyset_class()
+            page = await self.keyset.apaginate_queryset(queryset, request, view)
+            self.keyset.base_url = remove_query_param(self.keyset.base_url, self.mode_query_param)
+            return page
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc))) from exc
+        self.page.object_list = [row async for row in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class UserKeysetPagination(KeysetPagination):
+    ordering: ClassVar[tuple[str, ...]] = ("created_at", "id")
+
+
+class UserAddressKeysetPagination(KeysetPagination):
+    ordering: ClassVar[tuple[str, ...]] = ("valid_from", "id")
+
+
+class UserPagination(SelectablePagination):
+    keyset_class: ClassVar[type[KeysetPagination]] = UserKeysetPagination
+
+
+class UserAddressPagination(SelectablePagination):
+    keyset_class: ClassVar[type[KeysetPagination]] = UserAddressKeysetPagination
+
+
+def estimate_count(queryset: QuerySet) -> int | None:
+    """
+    Number of rows of `queryset` according to the planner statistics, or `None` when there are none.
+
+    PostgreSQL estimates any query from its `EXPLAIN` plan. SQLite only keeps
+    per-table statistics (`sqlite_stat1`, written by `ANALYZE`), so only
+    unfiltered querysets are estimated there.
+    """
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        if connection.vendor != "sqlite" or queryset.query.where:
+            return None
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [queryset.model._meta.db_table])  # noqa: SLF001
+        row = cursor.fetchone()
+    # The first number of every `stat` is the number of rows of the table.
+    return None if row is None else int(row[0].split()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator reporting the planner's estimate instead of an exact `COUNT(*)` for large results.
+
+    Results estimated below `USERS_ADMIN_EXACT_COUNT_LIMIT` rows, or that
+    cannot be estimated, are counted exactly. The last pages of an
+    overestimated result are empty.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= settings.USERS_ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
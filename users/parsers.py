@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import io
+from typing import IO, Any
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """
+    `JSONParser` through orjson when it is installed, and DRF's stdlib parsing otherwise.
+
+    orjson rejects NaN and infinities, like DRF's strict parsing. Bodies orjson
+    cannot parse, or not in UTF-8, go to DRF's parser, so that invalid JSON
+    gets the same `ParseError` message either way.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream: IO[bytes], media_type: str | None = None, parser_context: dict | None = None) -> Any:  # noqa: ANN401
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
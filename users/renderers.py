@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import csv
+import json
+from typing import TYPE_CHECKING, Any
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    from rest_framework.serializers import BaseSerializer
+
+# Datetimes go to the encoder's `default`, which writes UTC as `Z` like DRF does.
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+# U+2028 and U+2029 in UTF-8.
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` through orjson when it is installed, and DRF's stdlib rendering otherwise.
+
+    The output is the same JSON as DRF's but for whitespace: types orjson does
+    not know (dates, `Decimal`, lazy strings, ...) go through DRF's
+    `JSONEncoder.default`. Indented output, `UNICODE_JSON = False` and data
+    orjson rejects, such as integers beyond 64 bits, fall back to DRF's
+    rendering. Unlike DRF, orjson renders NaN and infinities as `null`.
+    """
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:  # noqa: ANN401
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like DRF does, so that the JSON is also valid JavaScript.
+        return rendered.replace(LINE_SEPARATOR, b"\\u2028").replace(PARAGRAPH_SEPARATOR, b"\\u2029")
+
+
+def to_columns(rows: Sequence[dict], serializer: BaseSerializer) -> dict[str, list]:
+    """
+    `rows` rendered by `serializer` as `{"fields": [...], "columns": [...]}`, with one list of values per field.
+
+    A nested `many=True` serializer, such as a user's addresses, becomes a
+    child table: `{"offsets": [...], "fields": [...], "columns": [...]}`,
+    where the children of row `i` are rows `offsets[i]` to `offsets[i + 1]`.
+    The layout follows the serializer, so it is the same whatever the rows hold.
+    """
+    fields = {name: field for name, field in serializer.fields.items() if not field.write_only}
+    columns: list[Any] = []
+    for name, field in fields.items():
+        values = [row[name] for row in rows]
+        if isinstance(field, ListSerializer):
+            offsets = [0]
+            children: list[dict] = []
+            for value in values:
+                children.extend(value)
+                offsets.append(len(children))
+            columns.append({"offsets": offsets, **to_columns(children, field.child)})
+        else:
+            columns.append(values)
+    return {"fields": list(fields), "columns": columns}
+
+
+def from_columns(table: dict[str, list]) -> list[dict]:
+    """The rows of a `to_columns()` table."""
+    columns = []
+    for column in table["columns"]:
+        if isinstance(column, dict):
+            children = from_columns(column)
+            offsets = column["offsets"]
+            columns.append([children[start:end] for start, end in zip(offsets, offsets[1:])])
+        else:
+            columns.append(column)
+    return [dict(zip(table["fields"], values)) for values in zip(*columns)]
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    JSON with the objects of a list, or of a page's `results`, as `to_columns()` tables of the view's serializer.
+
+    Field names are sent once instead of once per object. Other data, such as
+    errors, is rendered as plain JSON.
+    """
+
+    media_type = "application/vnd.columnar+json"
+    format = "columnar"
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:  # noqa: ANN401
+        view = (renderer_context or {}).get("view")
+        if isinstance(data, list):
+            data = to_columns(data, view.get_serializer())
+        elif isinstance(data, dict) and isinstance(data.get("results"), list):
+            data = {**data, "results": to_columns(data["results"], view.get_serializer())}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack of the same data as the JSON renderers; needs the msgpack package."""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:  # noqa: ANN401, ARG002
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=JSONEncoder().default)
+
+
+# Renderers the list endpoints offer on top of `DEFAULT_RENDERER_CLASSES`, for bulk consumers.
+LIST_RENDERER_CLASSES: list[type[BaseRenderer]] = [ColumnarJSONRenderer, *([MessagePackRenderer] if msgpack else [])]
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: one compact JSON document per line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:  # noqa: ANN401, ARG002
+        items = data if isinstance(data, list) else [data]
+        return b"".join(self.render_stream(items))
+
+    def render_stream(self, items: Iterable[Any]) -> Iterator[bytes]:
+        for item in items:
+            yield json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+class _LineBuffer:
+    """File-like object handing back what `csv.writer` writes instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV with a header row; each item must be a flat dict."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data: Any, accepted_media_type: str | None = None, renderer_context: dict | None = None) -> bytes:  # noqa: ANN401, ARG002
+        items = data if isinstance(data, list) else [data]
+        header = list(dict.fromkeys(key for item in items for key in item))
+        return b"".join(self.render_stream(items, header))
+
+    def render_stream(self, items: Iterable[dict], fields: Sequence[str], *, header: bool = True) -> Iterator[bytes]:
+        """The rows of `items`, after the header row of `fields` unless `header` is false."""
+        writer = csv.DictWriter(_LineBuffer(), fieldnames=fields, extrasaction="ignore")
+        if header:
+            yield writer.writeheader().encode()
+        for item in items:
+            yield writer.writerow(item).encode()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from functools import reduce
+from operator import and_, or_
+from typing import TYPE_CHECKING, Any
+
+from django.db import connections, router
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User, UserAddress, UserAddressSearchEntry, UserSearchEntry
+from .signals import users_changed
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from django.db.backends.base.base import BaseDatabaseWrapper
+    from django.db.models import Model, QuerySet
+
+USER_SEARCH_FIELDS = ("first_name", "last_name", "initials", "email")
+ADDRESS_SEARCH_FIELDS = ("street", "city")
+# Trigram indexes cannot narrow down shorter terms.
+MIN_TERM_LENGTH = 3
+# Rows reindexed per statement, below SQLite's bound parameter limit.
+INDEX_BATCH_SIZE = 500
+
+
+class WordSimilarity(Func):
+    """`word_similarity(term, field)` of pg_trgm: 1 when `term` occurs in `field`, less for partial matches."""
+
+    function = "word_similarity"
+    output_field = FloatField()
+
+
+def contains_all(fields: Sequence[str], terms: Iterable[str]) -> Q:
+    """Every term in at least one of `fields`, case-insensitively: the condition of the admin's `search_fields`."""
+    return reduce(and_, (reduce(or_, (Q(**{f"{field}__icontains": term}) for field in fields)) for term in terms), Q())
+
+
+def fts_query(terms: Iterable[str]) -> str:
+    """FTS5 query matching rows containing every term, each as a quoted substring."""
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def uses_fts(connection: BaseDatabaseWrapper, terms: Sequence[str]) -> bool:
+    return connection.vendor == "sqlite" and all(len(term) >= MIN_TERM_LENGTH for term in terms)
+
+
+def search_users(queryset: QuerySet[User], query: str) -> QuerySet[User]:
+    """
+    Users whose `USER_SEARCH_FIELDS` contain every term of `query`, annotated with `search_rank`.
+
+    On SQLite the users are joined to their `users_search` FTS5 trigram row
+    and ranked by BM25, with the FTS table driving the join. On PostgreSQL the
+    `icontains` conditions are answered from the `UPPER(field::text)
+    gin_trgm_ops` indexes and ranked by `word_similarity`. Elsewhere, and for
+    terms shorter than three characters, it is a plain `icontains` scan with a
+    rank of 0. Higher ranks are better.
+    """
+    terms = query.split()
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0))
+    connection = connections[queryset.db]
+    if uses_fts(connection, terms):
+        return queryset.filter(search_entry__document__match=fts_query(terms)).annotate(
+            search_rank=-F("search_entry__rank"),
+        )
+    queryset = queryset.filter(contains_all(USER_SEARCH_FIELDS, terms))
+    if connection.vendor == "postgresql":
+        return queryset.annotate(
+            search_rank=Greatest(*(WordSimilarity(Value(query), F(field)) for field in USER_SEARCH_FIELDS)),
+        )
+    return queryset.annotate(search_rank=Value(0.0))
+
+
+def search_addresses(
+    queryset: QuerySet[UserAddress],
+    query: str,
+    *,
+    include_users: bool = True,
+) -> QuerySet[UserAddress]:
+    """
+    Addresses whose `ADDRESS_SEARCH_FIELDS` contain every term of `query`, or whose user matches `search_users`.
+
+    Annotated with `search_rank` like `search_users`. Without
+    `include_users` only the address fields are searched. With it, SQLite
+    matches both FTS tables through `IN` lists and does not rank: a BM25 rank
+    needs the FTS table joined, which an `OR` of two tables rules out.
+    """
+    terms = query.split()
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0))
+    connection = connections[queryset.db]
+    users = search_users(User.objects.using(queryset.db), query).values("pk")
+    if uses_fts(connection, terms):
+        if not include_users:
+            return queryset.filter(search_entry__document__match=fts_query(terms)).annotate(
+                search_rank=-F("search_entry__rank"),
+            )
+        matches = UserAddressSearchEntry.objects.using(queryset.db).filter(document__match=fts_query(terms))
+        return queryset.filter(Q(pk__in=matches.values("pk")) | Q(user_id__in=users)).annotate(search_rank=Value(0.0))
+
+    condition = contains_all(ADDRESS_SEARCH_FIELDS, terms)
+    fields = list(ADDRESS_SEARCH_FIELDS)
+    if include_users:
+        condition |= Q(user_id__in=users)
+        fields.extend(f"user__{field}" for field in USER_SEARCH_FIELDS)
+    queryset = queryset.filter(condition)
+    if connection.vendor == "postgresql":
+        return queryset.annotate(search_rank=Greatest(*(WordSimilarity(Value(query), F(field)) for field in fields)))
+    return queryset.annotate(search_rank=Value(0.0))
+
+
+def _reindex(model: type[Model], table: str, fields: Sequence[str], pks: Iterable[Any] | None) -> None:
+    """Replace the FTS rows of `pks` (every row when `None`) of `model` with their current values."""
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor != "sqlite":
+        return
+    source = model._meta.db_table  # noqa: SLF001
+    columns = ", ".join(fields)
+    insert = f"INSERT INTO {table} (rowid, {columns}) SELECT id, {columns} FROM {source}"  # noqa: S608
+    with connection.cursor() as cursor:
+        if pks is None:
+            cursor.execute(f"DELETE FROM {table}")  # noqa: S608
+            cursor.execute(insert)
+            return
+        pks = list(pks)
+        for start in range(0, len(pks), INDEX_BATCH_SIZE):
+            batch = pks[start : start + INDEX_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            # Deleted rows are removed and not re-inserted.
+            cursor.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", batch)  # noqa: S608
+            cursor.execute(f"{insert} WHERE id IN ({placeholders})", batch)
+
+
+def index_users(user_ids: Iterable[Any] | None = None) -> None:
+    """Bring `users_search` up to date for `user_ids`, or rebuild it when `None`. A no-op outside SQLite."""
+    _reindex(User, UserSearchEntry._meta.db_table, USER_SEARCH_FIELDS, user_ids)  # noqa: SLF001
+
+
+def index_addresses(address_ids: Iterable[Any] | None = None) -> None:
+    """Bring `users_addresses_search` up to date for `address_ids`, or rebuild it when `None`."""
+    _reindex(UserAddress, UserAddressSearchEntry._meta.db_table, ADDRESS_SEARCH_FIELDS, address_ids)  # noqa: SLF001
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def index_user(sender: type[User], instance: User, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    index_users([instance.pk])
+
+
+@receiver(post_save, sender=UserAddress)
+@receiver(post_delete, sender=UserAddress)
+def index_user_address(sender: type[UserAddress], instance: UserAddress, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    index_addresses([instance.pk])
+
+
+@receiver(users_changed)
+def index_changed_users(sender: type, user_ids: Iterable[Any] | None, **kwargs: Any) -> None:  # noqa: ANN401, ARG001
+    if sender is User:
+        index_users(user_ids)
+    elif user_ids is None:
+        index_addresses()
+    else:
+        # Bulk address writes report their users, not the addresses.
+        index_addresses(UserAddress.objects.filter(user_id__in=list(user_ids)).values_list("pk", flat=True))
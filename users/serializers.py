@@ -1,11 +1,35 @@
-from typing import ClassVar
+from __future__ import annotations
 
-from rest_framework import serializers
+from collections import defaultdict
+from datetime import tzinfo
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
 from .models import User, UserAddress
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import datetime
+
+    from django.db.models import QuerySet
+
+
+class SparseFieldsMixin:
+    """Restrict a serializer to a subset of its fields through a `fields` keyword argument."""
+
+    def __init__(self, *args: Any, fields: Iterable[str] | None = None, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 
-class UserAddressSerializer(serializers.ModelSerializer):
+class UserAddressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = UserAddress
         fields: ClassVar[list[str]] = [
@@ -24,7 +48,7 @@ class UserAddressSerializer(serializers.ModelSerializer):
         read_only_fields: ClassVar[list[str]] = ["id", "user", "created_at", "updated_at"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     addresses = UserAddressSerializer(many=True, read_only=True)
 
     class Meta:
@@ -47,3 +71,317 @@ class UserSerializer(serializers.ModelSerializer):
         if User.objects.filter(email=value).exclude(pk=self.instance.pk if self.instance else None).exists():
             raise serializers.ValidationError(message)
         return value
+
+
+# Converters are compiled per field once and bound to the active time zone once per `serialize()` call.
+Converter = Callable[[Any], Any]
+ConverterFactory = Callable[[Optional[tzinfo]], Converter]
+
+
+def _identity(value: Any) -> Any:  # noqa: ANN401
+    return value
+
+
+def _datetime_converter(field: serializers.DateTimeField) -> ConverterFactory:
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, "timezone") or not settings.USE_TZ:
+        return lambda _tz: field.to_representation
+
+    def bind(tz: tzinfo) -> Converter:
+        def convert(value: datetime) -> str:
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+        return convert
+
+    return bind
+
+
+def _compile_converter(field: serializers.Field) -> ConverterFactory:
+    """Return a factory of functions matching `field.to_representation` for a `.values()` cell."""
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.ChoiceField) and all(isinstance(key, str) for key in field.choices):
+        return lambda _tz: _identity
+    if isinstance(field, (serializers.CharField, serializers.IntegerField, serializers.PrimaryKeyRelatedField)):
+        # Database values already have the representation type; `.values()` yields the pk for relations.
+        return lambda _tz: _identity
+    return lambda _tz: field.to_representation
+
+
+def _group_by(fk: str, children: list[dict], items: list[dict]) -> dict[Any, list[dict]]:
+    grouped = defaultdict(list)
+    for child, item in zip(children, items):
+        grouped[child[fk]].append(item)
+    return grouped
+
+
+class ValuesSerializer:
+    """
+    Read-only counterpart of a `ModelSerializer` working on `.values()` rows.
+
+    Field converters are compiled once from `serializer_class`'s fields, so the
+    output matches `serializer_class(instance).data` without running the
+    per-field `get_attribute`/`to_representation` machinery for every row.
+    Nested `many=True` serializers are loaded with one query per nesting level.
+
+    `fields` restricts the output (and the selected columns) to a subset of the
+    serializer's fields; use `for_fields()` to reuse compiled instances.
+    """
+
+    serializer_class: ClassVar[type[serializers.ModelSerializer]]
+    # Nested field name -> (values serializer class, foreign key on the nested model).
+    nested_serializers: ClassVar[dict[str, tuple[type[ValuesSerializer], str]]] = {}
+
+    def __init__(self, fields: Iterable[str] | None = None) -> None:
+        self.fields = None if fields is None else frozenset(fields)
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def for_fields(cls, fields: tuple[str, ...] | None = None) -> ValuesSerializer:
+        return cls(fields)
+
+    @cached_property
+    def plan(self) -> list[tuple[str, str, ConverterFactory | None]]:
+        """(output key, `.values()` column, converter factory) per readable field; nested fields have none."""
+        plan = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only or (self.fields is not None and name not in self.fields):
+                continue
+            converter = None if name in self.nested_serializers else _compile_converter(field)
+            plan.append((name, field.source, converter))
+        return plan
+
+    @cached_property
+    def pk(self) -> str:
+        return self.serializer_class.Meta.model._meta.pk.name  # noqa: SLF001
+
+    @cached_property
+    def columns(self) -> list[str]:
+        columns = [column for _, column, converter in self.plan if converter is not None]
+        return columns if self.pk in columns else [self.pk, *columns]
+
+    def get_queryset(self, queryset: QuerySet, extra_columns: Iterable[str] = ()) -> QuerySet:
+        """Project `queryset` onto the columns this serializer reads, plus `extra_columns` (e.g. for ordering)."""
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.columns, *extra_columns]))
+
+    @cached_property
+    def nested(self) -> dict[str, tuple[ValuesSerializer, str]]:
+        return {
+            name: (serializer(), fk)
+            for name, (serializer, fk) in self.nested_serializers.items()
+            if self.fields is None or name in self.fields
+        }
+
+    def get_nested_querysets(
+        self,
+        rows: list[dict],
+        querysets: dict[str, QuerySet] | None = None,
+    ) -> dict[str, QuerySet]:
+        """`.values()` querysets of the nested relations of `rows`; `querysets` may replace a relation's default."""
+        pks = [row[self.pk] for row in rows]
+        nested = {}
+        for name, (serializer, fk) in self.nested.items():
+            queryset = (querysets or {}).get(name, serializer.serializer_class.Meta.model.objects.all())
+            nested[name] = (
+                queryset.filter(**{f"{fk}__in": pks})
+                .order_by(serializer.pk)
+                .values(*dict.fromkeys([*serializer.columns, fk]))
+            )
+        return nested
+
+    def load_nested(
+        self,
+        rows: list[dict],
+        querysets: dict[str, QuerySet] | None = None,
+    ) -> dict[str, dict[Any, list[dict]]]:
+        """
+        Serialize nested relations of `rows`, grouped by parent pk, with one query per relation.
+
+        `querysets` may replace the default `Model.objects.all()` of a relation,
+        e.g. to load only some of the related rows.
+        """
+        nested = {}
+        for name, queryset in self.get_nested_querysets(rows, querysets).items():
+            serializer, fk = self.nested[name]
+            children = list(queryset)
+            nested[name] = _group_by(fk, children, serializer.serialize(children))
+        return nested
+
+    async def aload_nested(
+        self,
+        rows: list[dict],
+        querysets: dict[str, QuerySet] | None = None,
+    ) -> dict[str, dict[Any, list[dict]]]:
+        """`load_nested()` on the async ORM."""
+        nested = {}
+        for name, queryset in self.get_nested_querysets(rows, querysets).items():
+            serializer, fk = self.nested[name]
+            children = [child async for child in queryset]
+            nested[name] = _group_by(fk, children, await serializer.aserialize(children))
+        return nested
+
+    def bind(self) -> list[tuple[str, str, Converter | None]]:
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [(name, column, factory and factory(tz)) for name, column, factory in self.plan]
+
+    def to_representation(
+        self,
+        row: dict,
+        nested: dict[str, dict[Any, list[dict]]] | None = None,
+        plan: list[tuple[str, str, Converter | None]] | None = None,
+    ) -> dict:
+        ret = {}
+        for name, column, convert in plan or self.bind():
+            if convert is None:
+                ret[name] = nested[name].get(row[self.pk], []) if nested else []
+            else:
+                value = row[column]
+                ret[name] = None if value is None else convert(value)
+        return ret
+
+    def serialize(self, rows: Iterable[dict], nested_querysets: dict[str, QuerySet] | None = None) -> list[dict]:
+        rows = list(rows)
+        nested = self.load_nested(rows, nested_querysets) if rows and self.nested else None
+        plan = self.bind()
+        return [self.to_representation(row, nested, plan) for row in rows]
+
+    async def aserialize(self, rows: list[dict], nested_querysets: dict[str, QuerySet] | None = None) -> list[dict]:
+        """`serialize()` of already loaded `rows`, loading nested relations on the async ORM."""
+        nested = await self.aload_nested(rows, nested_querysets) if rows and self.nested else None
+        plan = self.bind()
+        return [self.to_representation(row, nested, plan) for row in rows]
+
+
+class UserAddressValuesSerializer(ValuesSerializer):
+    serializer_class = UserAddressSerializer
+
+
+class UserValuesSerializer(ValuesSerializer):
+    serializer_class = UserSerializer
+    nested_serializers: ClassVar[dict[str, tuple[type[ValuesSerializer], str]]] = {
+        "addresses": (UserAddressValuesSerializer, "user"),
+    }
+
+
+class BulkUserAddressSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserAddress
+        fields: ClassVar[list[str]] = [
+            "address_type",
+            "valid_from",
+            "post_code",
+            "city",
+            "country_code",
+            "street",
+            "building_number",
+        ]
+
+
+class BulkUserSerializer(serializers.ModelSerializer):
+    """One item of a bulk request; email uniqueness is checked for the whole batch by `users.bulk`."""
+
+    addresses = BulkUserAddressSerializer(many=True, required=False)
+
+    class Meta:
+        model = User
+        fields: ClassVar[list[str]] = ["first_name", "last_name", "initials", "email", "status", "addresses"]
+        extra_kwargs: ClassVar[dict[str, dict]] = {"email": {"validators": []}}
+
+    def validate_addresses(self, value: list[dict]) -> list[dict]:
+        keys = [(address["address_type"], address["valid_from"]) for address in value]
+        if len(keys) != len(set(keys)):
+            message = "Addresses must have unique address_type and valid_from."
+            raise serializers.ValidationError(message)
+        return value
+
+
+class BulkUserRequestSerializer(serializers.Serializer):
+    upsert = serializers.BooleanField(
+        default=False,
+        help_text="Update users matched by email and addresses matched by (address_type, valid_from).",
+    )
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_users(self, value: list[dict]) -> list[dict]:
+        if len(value) > settings.USERS_BULK_MAX_ITEMS:
+            message = f"Ensure this field has no more than {settings.USERS_BULK_MAX_ITEMS} elements."
+            raise serializers.ValidationError(message)
+        return value
+
+
+class BulkUserResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=["created", "updated", "error"])
+    id = serializers.IntegerField(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class BulkUserResponseSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = BulkUserResultSerializer(many=True)
+
+
+class UserExportFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=User.STATUS_CHOICES, required=False)
+    updated_after = serializers.DateTimeField(required=False, help_text="Only users updated at or after this time.")
+    updated_before = serializers.DateTimeField(required=False, help_text="Only users updated before this time.")
+
+
+class UserFilterSerializer(UserExportFilterSerializer):
+    created_after = serializers.DateTimeField(required=False, help_text="Only users created at or after this time.")
+    created_before = serializers.DateTimeField(required=False, help_text="Only users created before this time.")
+    last_name_prefix = serializers.CharField(required=False, help_text="Only users whose last name starts with this.")
+    email = serializers.CharField(required=False, help_text="Only the user with this email, ignoring case.")
+    address_country = serializers.CharField(
+        required=False,
+        max_length=3,
+        help_text="Only users with an address in this country.",
+    )
+    address_city = serializers.CharField(required=False, help_text="Only users with an address in this city.")
+
+
+class CurrentAddressQuerySerializer(serializers.Serializer):
+    at = serializers.DateTimeField(required=False, help_text="Point in time to resolve addresses at; defaults to now.")
+
+
+class CurrentAddressBatchQuerySerializer(CurrentAddressQuerySerializer):
+    max_users = 1000
+
+    user_ids = serializers.CharField(help_text="Comma-separated user ids.")
+
+    def validate_user_ids(self, value: str) -> list[int]:
+        try:
+            user_ids = sorted({int(user_id) for user_id in value.split(",") if user_id.strip()})
+        except ValueError as exc:
+            message = "Enter a comma-separated list of user ids."
+            raise serializers.ValidationError(message) from exc
+        if not user_ids or len(user_ids) > self.max_users:
+            message = f"Enter between 1 and {self.max_users} user ids."
+            raise serializers.ValidationError(message)
+        return user_ids
+
+
+class NestedAddressesQuerySerializer(serializers.Serializer):
+    """`?addresses=` mode of the user endpoints: `all`, `current`, `latest:N` or `none`."""
+
+    max_latest = 100
+    modes = ("all", "current", "latest", "none")
+
+    addresses = serializers.CharField(required=False, default="all")
+
+    def validate_addresses(self, value: str) -> tuple[str, int | None]:
+        mode, _, limit = value.partition(":")
+        if mode not in self.modes or bool(limit) != (mode == "latest"):
+            message = f"Enter one of: all, current, latest:N (1 <= N <= {self.max_latest}), none."
+            raise serializers.ValidationError(message)
+        if mode != "latest":
+            return mode, None
+        if not limit.isdigit() or not 1 <= int(limit) <= self.max_latest:
+            message = f"Enter a number of addresses between 1 and {self.max_latest}."
+            raise serializers.ValidationError(message)
+        return mode, int(limit)
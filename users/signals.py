@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after writes that skip `post_save`/`post_delete`: `QuerySet.update()`, `bulk_create()`,
+# `bulk_update()` and raw SQL. `user_ids` lists the affected users, or is `None` when unknown.
+users_changed = Signal()
@@ -1,10 +1,83 @@
-from django.test import TestCase
-from django.urls import reverse
+import asyncio
+import contextlib
+import csv
+import gzip
+import io
+import ipaddress
+import json
+import os
+import tempfile
+import time
+import warnings
+from collections import Counter
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+from unittest import mock, skipUnless
+from uuid import UUID
+
+import yaml
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.models import Prefetch
+from django.http import HttpRequest, HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
 from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.test import APITestCase
 
-from .models import User, UserAddress
+from app.compression import ENCODINGS, accepted_encodings, brotli, negotiate_encoding
+from app.db.inspector import NPlusOneError, query_shape
+from app.db.pool import ConnectionPool, PooledDatabaseWrapperMixin, PoolTimeoutError, get_pool, reset_pools
+from app.db.routers import PIN_COOKIE, PIN_HEADER, ReplicaSet, check_database, get_replicas
+from app.metrics import registry
+from app.middleware import QueryInspectorMiddleware
+from app.openapi import QueryParameter
+from app.profiling import list_profiles, make_token
+from app.schema import encode_schema, generate_schema, load_schema, schema_view
+from app.servers import handle_asgi
+from app.startup import imported_only_by, start_worker
+from app.testing import replica_test_settings
+from app.urls import LazyURLResolver, URLConf
+
+from . import bulk
+from .admin import UserAddressInline
+from .benchmarks import address_counts, compare_results
+from .cache import response_cache
+from .export import csv_header
+from .imports import Checkpoint, UserImporter
+from .loadtest import OPERATIONS, HTTPConnection, RequestMix, parse_mix, run_arrivals
+from .models import ImportCheckpoint, User, UserAddress
+from .pagination import estimate_count
+from .parsers import FastJSONParser
+from .renderers import (
+    ColumnarJSONRenderer,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    from_columns,
+    msgpack,
+    to_columns,
+)
+from .search import search_addresses, search_users
+from .serializers import UserAddressSerializer, UserSerializer, UserValuesSerializer
+from .signals import users_changed
+from .views import UserViewSet
 
 
 class UserModelTest(TestCase):
@@ -266,3 +339,2034 @@ class UserAPITest(APITestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.id, original_id)
         self.assertEqual(self.user.created_at, original_created_at)
+
+
+class UserPaginationTest(APITestCase):
+    def setUp(self) -> None:
+        self.users = [
+            User.objects.create(last_name=f"User{i:02d}", email=f"user{i:02d}@example.com") for i in range(25)
+        ]
+        self.list_url = reverse("user-list")
+
+    def _collect(self, url: str) -> list[dict]:
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results.extend(response.data["results"])
+            url = response.data["next"]
+        return results
+
+    def test_page_number_pagination_is_default(self) -> None:
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 25)
+
+    def test_cursor_pagination_has_no_count(self) -> None:
+        response = self.client.get(self.list_url, {"pagination": "cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(len(response.data["results"]), 20)
+        self.assertIsNone(response.data["previous"])
+        self.assertIn("cursor=", response.data["next"])
+        self.assertNotIn("pagination=", response.data["next"])
+
+    def test_cursor_pagination_walks_all_users_in_order(self) -> None:
+        results = self._collect(f"{self.list_url}?pagination=cursor")
+
+        expected = sorted(self.users, key=lambda user: (user.created_at, user.id))
+        self.assertEqual([row["id"] for row in results], [user.id for user in expected])
+
+    def test_cursor_pagination_is_stable_under_concurrent_inserts(self) -> None:
+        first_page = self.client.get(self.list_url, {"pagination": "cursor"}).data
+        User.objects.create(last_name="Late", email="late@example.com")
+        early = User.objects.create(last_name="Early", email="early@example.com")
+        User.objects.filter(pk=early.pk).update(created_at=self.users[0].created_at - timedelta(days=1))
+
+        second_page = self.client.get(first_page["next"]).data
+
+        seen = [row["id"] for row in first_page["results"] + second_page["results"]]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertTrue({user.id for user in self.users}.issubset(seen))
+        self.assertNotIn(early.pk, seen)
+
+    def test_cursor_pagination_previous_link(self) -> None:
+        first_page = self.client.get(self.list_url, {"pagination": "cursor"}).data
+        second_page = self.client.get(first_page["next"]).data
+
+        previous_page = self.client.get(second_page["previous"]).data
+
+        self.assertEqual(previous_page["results"], first_page["results"])
+        self.assertIsNone(previous_page["previous"])
+
+    def test_invalid_cursor(self) -> None:
+        response = self.client.get(self.list_url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_address_cursor_pagination_orders_by_valid_from(self) -> None:
+        user = self.users[0]
+        now = timezone.now()
+        addresses = [
+            UserAddress.objects.create(
+                user=user,
+                address_type="HOME",
+                valid_from=now - timedelta(days=i),
+                post_code="12345",
+                city="Test City",
+                country_code="US",
+                street="Test Street",
+                building_number=str(i),
+            )
+            for i in range(3)
+        ]
+        url = reverse("user-address-list", kwargs={"id": user.pk})
+
+        response = self.client.get(url, {"pagination": "cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data["results"]], [a.id for a in reversed(addresses)])
+
+        # Page numbers follow the same order, which the paginator needs to page consistently.
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", UnorderedObjectListWarning)
+            response = self.client.get(url)
+
+        self.assertEqual([row["id"] for row in response.data["results"]], [a.id for a in reversed(addresses)])
+
+
+class UserValuesSerializerTest(APITestCase):
+    def setUp(self) -> None:
+        now = timezone.now()
+        self.users = [
+            User.objects.create(first_name="John", last_name="Doe", initials="JD", email="john.doe@example.com"),
+            User.objects.create(last_name="Smith", email="smith@example.com", status="INACTIVE"),
+            User.objects.create(first_name="Zoë", last_name="Łukasz", email="zoe@example.com"),
+        ]
+        for i, address_type in enumerate(["HOME", "WORK", "INVOICE"]):
+            UserAddress.objects.create(
+                user=self.users[i % 2],
+                address_type=address_type,
+                valid_from=now.replace(microsecond=0) - timedelta(days=i),
+                post_code="12345",
+                city="Test City",
+                country_code="US",
+                street="Test Street",
+                building_number=str(i),
+            )
+
+    def _render_user_serializer(self) -> bytes:
+        queryset = User.objects.order_by("id").prefetch_related(
+            Prefetch("addresses", queryset=UserAddress.objects.order_by("id")),
+        )
+        return JSONRenderer().render(UserSerializer(queryset, many=True).data)
+
+    def _render_values_serializer(self) -> bytes:
+        serializer = UserValuesSerializer()
+        return JSONRenderer().render(serializer.serialize(serializer.get_queryset(User.objects.order_by("id"))))
+
+    def test_output_is_byte_identical_to_user_serializer(self) -> None:
+        self.assertEqual(self._render_values_serializer(), self._render_user_serializer())
+
+    def test_output_is_byte_identical_in_non_utc_timezone(self) -> None:
+        with timezone.override("Europe/Warsaw"):
+            self.assertEqual(self._render_values_serializer(), self._render_user_serializer())
+
+    def test_retrieve_response_is_byte_identical(self) -> None:
+        user = self.users[0]
+        response = self.client.get(reverse("user-detail", kwargs={"pk": user.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(UserSerializer(user).data))
+
+    def test_list_loads_addresses_in_one_query(self) -> None:
+        # Page count, users, addresses.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("user-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(len(row["addresses"]) for row in response.data["results"]), 3)
+
+
+class SparseFieldsetTest(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(first_name="John", last_name="Doe", email="john.doe@example.com")
+        self.address = UserAddress.objects.create(
+            user=self.user,
+            address_type="HOME",
+            valid_from=timezone.now(),
+            post_code="12345",
+            city="Test City",
+            country_code="US",
+            street="Test Street",
+            building_number="123",
+        )
+        self.list_url = reverse("user-list")
+        self.detail_url = reverse("user-detail", kwargs={"pk": self.user.pk})
+        self.address_list_url = reverse("user-address-list", kwargs={"id": self.user.pk})
+
+    def test_list_fields_skips_address_prefetch(self) -> None:
+        # Page count, users.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url, {"fields": "id,email,status"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{"id": self.user.pk, "email": self.user.email, "status": "ACTIVE"}])
+
+    def test_list_fields_selects_only_requested_columns(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.list_url, {"fields": "id,email,status"})
+
+        select = queries.captured_queries[-1]["sql"]
+        self.assertIn('"email"', select)
+        self.assertNotIn('"last_name"', select)
+
+    def test_list_with_addresses_uses_prefetch_query(self) -> None:
+        with self.assertNumQueries(3):
+            response = self.client.get(self.list_url, {"fields": "id,addresses"})
+
+        self.assertEqual(list(response.data["results"][0]), ["id", "addresses"])
+        self.assertEqual(response.data["results"][0]["addresses"][0]["city"], "Test City")
+
+    def test_retrieve_omit_addresses(self) -> None:
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, {"omit": "addresses,created_at,updated_at"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), ["id", "first_name", "last_name", "initials", "email", "status"])
+
+    def test_cursor_pagination_with_fields(self) -> None:
+        response = self.client.get(self.list_url, {"fields": "email", "pagination": "cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{"email": self.user.email}])
+
+    def test_unknown_field_is_rejected(self) -> None:
+        response = self.client.get(self.list_url, {"fields": "id,password"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+
+    def test_unknown_omit_field_is_rejected(self) -> None:
+        response = self.client.get(self.address_list_url, {"omit": "secret"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("omit", response.data)
+
+    def test_address_list_fields(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.address_list_url, {"fields": "id,city"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{"id": self.address.pk, "city": "Test City"}])
+        self.assertNotIn('"street"', queries.captured_queries[-1]["sql"])
+        self.assertNotIn('"users"', queries.captured_queries[-1]["sql"])
+
+    def test_address_retrieve_fields(self) -> None:
+        url = reverse("user-address-detail", kwargs={"id": self.user.pk, "address_id": self.address.pk})
+        response = self.client.get(url, {"fields": "address_type"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"address_type": "HOME"})
+
+    def test_fields_are_ignored_on_writes(self) -> None:
+        response = self.client.patch(f"{self.detail_url}?fields=id", {"first_name": "Johnny"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["first_name"], "Johnny")
+
+
+class UserBulkAPITest(APITestCase):
+    def setUp(self) -> None:
+        self.url = reverse("user-bulk")
+        self.existing = User.objects.create(first_name="John", last_name="Doe", email="john.doe@example.com")
+        self.existing_address = UserAddress.objects.create(
+            user=self.existing,
+            address_type="HOME",
+            valid_from="2025-01-01T00:00:00Z",
+            post_code="12345",
+            city="Old City",
+            country_code="US",
+            street="Old Street",
+            building_number="1",
+        )
+
+    def _item(self, i: int, **overrides: object) -> dict:
+        return {
+            "last_name": f"User{i}",
+            "email": f"user{i}@example.com",
+            "addresses": [
+                {
+                    "address_type": "HOME",
+                    "valid_from": "2025-01-01T00:00:00Z",
+                    "post_code": "12345",
+                    "city": "Test City",
+                    "country_code": "US",
+                    "street": "Test Street",
+                    "building_number": str(i),
+                },
+            ],
+            **overrides,
+        }
+
+    def test_bulk_create_users_with_addresses(self) -> None:
+        response = self.client.post(self.url, {"users": [self._item(1), self._item(2)]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["failed"], 0)
+        user = User.objects.get(email="user2@example.com")
+        self.assertEqual(response.data["results"][1], {"index": 1, "status": "created", "id": user.pk})
+        self.assertEqual(user.addresses.get().building_number, "2")
+
+    def test_bulk_reports_per_item_errors(self) -> None:
+        items = [
+            self._item(1),
+            self._item(2, email="invalid-email"),
+            self._item(3, email="user1@example.com"),
+            self._item(4, email=self.existing.email),
+        ]
+        response = self.client.post(self.url, {"users": items}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["failed"], 3)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["created", *["error"] * 3])
+        for result in response.data["results"][1:]:
+            self.assertIn("email", result["errors"])
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_bulk_rejects_duplicate_address_keys_in_item(self) -> None:
+        item = self._item(1)
+        item["addresses"] *= 2
+        response = self.client.post(self.url, {"users": [item]}, format="json")
+
+        self.assertEqual(response.data["results"][0]["status"], "error")
+        self.assertIn("addresses", response.data["results"][0]["errors"])
+
+    def test_bulk_upsert_updates_users_and_addresses(self) -> None:
+        item = self._item(1, email=self.existing.email, first_name="Johnny")
+        item["addresses"].append({**item["addresses"][0], "address_type": "WORK"})
+        response = self.client.post(self.url, {"upsert": True, "users": [item, self._item(2)]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.existing.refresh_from_db()
+        self.existing_address.refresh_from_db()
+        self.assertEqual(self.existing.first_name, "Johnny")
+        self.assertEqual(self.existing_address.city, "Test City")
+        self.assertEqual(self.existing.addresses.count(), 2)
+
+    def _post_racing(self, email: str, data: dict) -> Response:
+        """Post `data` while another request inserts a user with `email` between the lookup and the insert."""
+        stage_users = bulk._stage_users  # noqa: SLF001
+
+        def stage_users_racing(*args: object) -> tuple:
+            if not User.objects.filter(email=email).exists():
+                User.objects.create(last_name="Racer", email=email)
+            return stage_users(*args)
+
+        with mock.patch("users.bulk._stage_users", side_effect=stage_users_racing):
+            return self.client.post(self.url, data, format="json")
+
+    def test_bulk_retries_after_concurrent_insert(self) -> None:
+        response = self._post_racing("user1@example.com", {"users": [self._item(1), self._item(2)]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["error", "created"])
+        self.assertEqual(response.data["results"][0]["errors"], {"email": [bulk.USER_EXISTS_MESSAGE]})
+
+        response = self._post_racing("user3@example.com", {"upsert": True, "users": [self._item(3)]})
+        self.assertEqual(response.data["results"][0]["status"], "updated")
+        self.assertEqual(User.objects.get(email="user3@example.com").last_name, "User3")
+
+    def test_bulk_reports_persistent_conflicts(self) -> None:
+        with mock.patch("users.bulk._insert_users", side_effect=IntegrityError):
+            response = self.client.post(self.url, {"users": [self._item(1), self._item(2, email="bad")]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual(response.data["results"][0]["errors"], {"non_field_errors": [bulk.CONFLICT_MESSAGE]})
+        self.assertIn("email", response.data["results"][1]["errors"])
+        self.assertFalse(User.objects.filter(email="user1@example.com").exists())
+
+    def test_bulk_query_count_does_not_grow_with_items(self) -> None:
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {"users": [self._item(i) for i in range(2)]}, format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {"users": [self._item(i) for i in range(10, 40)]}, format="json")
+
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_rejects_too_many_items(self) -> None:
+        with self.settings(USERS_BULK_MAX_ITEMS=1):
+            response = self.client.post(self.url, {"users": [self._item(1), self._item(2)]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("users", response.data)
+
+
+class FastJSONTest(APITestCase):
+    data = {  # noqa: RUF012
+        "created": datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        "day": date(2024, 1, 2),
+        "amount": Decimal("1.50"),
+        "label": gettext_lazy("Email address"),
+        "id": UUID("12345678-1234-5678-1234-567812345678"),
+        "text": "Zażółć\u2028gęślą",
+        "items": [1, 2.5, None, True, {"nested": "x"}],
+        1: "non-string key",
+    }
+
+    def test_renderer_matches_drf(self) -> None:
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertIn(b"\\u2028", FastJSONRenderer().render(self.data))
+        indented = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, indented),
+            JSONRenderer().render(self.data, indented),
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_parser_matches_drf(self) -> None:
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for invalid in (b"{", b'{"value": NaN}', b"[Infinity]"):
+            with self.assertRaises(ParseError) as fast:  # noqa: PT027
+                FastJSONParser().parse(io.BytesIO(invalid))
+            with self.assertRaises(ParseError) as drf:  # noqa: PT027
+                JSONParser().parse(io.BytesIO(invalid))
+            self.assertEqual(str(fast.exception), str(drf.exception))
+
+    def test_api_uses_renderer_profile(self) -> None:
+        profile = settings.API_RENDERER_PROFILES[settings.API_RENDERER_PROFILE]
+        renderers = [type(renderer) for renderer in UserViewSet(action="retrieve").get_renderers()]
+        self.assertEqual(renderers, list(map(import_string, profile)))
+        self.assertIsInstance(UserViewSet().get_parsers()[0], FastJSONParser)
+
+        body = {"first_name": "Zoë", "last_name": "Doe", "email": "zoe@example.com"}
+        response = self.client.post(reverse("user-list"), json.dumps(body), content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.get(reverse("user-list"))
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        browsable = settings.API_RENDERER_PROFILE == "development"
+        response = self.client.get(reverse("user-list"), HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, status.HTTP_200_OK if browsable else status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class UserExportTest(APITestCase):
+    def setUp(self) -> None:
+        self.url = reverse("user-export")
+        self.users = [
+            User.objects.create(last_name=f"User{i}", email=f"user{i}@example.com", status=status_)
+            for i, status_ in enumerate(["ACTIVE", "INACTIVE", "ACTIVE"])
+        ]
+        for i, address_type in enumerate(["HOME", "WORK"]):
+            UserAddress.objects.create(
+                user=self.users[0],
+                address_type=address_type,
+                valid_from=timezone.now(),
+                post_code="12345",
+                city=f"City{i}",
+                country_code="US",
+                street="Test Street",
+                building_number=str(i),
+            )
+
+    def _content(self, response: object) -> bytes:
+        return b"".join(response.streaming_content)
+
+    def _lines(self, response: object) -> list[dict]:
+        return [json.loads(line) for line in self._content(response).splitlines()]
+
+    def test_export_ndjson_matches_user_serializer(self) -> None:
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        users = User.objects.order_by("id").prefetch_related(Prefetch("addresses", UserAddress.objects.order_by("id")))
+        self.assertEqual(
+            self._lines(response),
+            json.loads(JSONRenderer().render(UserSerializer(users, many=True).data)),
+        )
+
+    def test_export_csv_has_one_row_per_address(self) -> None:
+        response = self.client.get(self.url, {"format": "csv"})
+
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.DictReader(io.StringIO(self._content(response).decode())))
+        self.assertEqual(
+            [row["email"] for row in rows],
+            ["user0@example.com"] * 2 + ["user1@example.com", "user2@example.com"],
+        )
+        self.assertEqual([row["address_city"] for row in rows], ["City0", "City1", "", ""])
+        self.assertNotIn("address_user", rows[0])
+
+    def test_export_filters(self) -> None:
+        User.objects.filter(pk=self.users[2].pk).update(updated_at=timezone.now() + timedelta(days=1))
+
+        inactive = self._lines(self.client.get(self.url, {"status": "INACTIVE"}))
+        recent = self._lines(
+            self.client.get(self.url, {"updated_after": (timezone.now() + timedelta(hours=1)).isoformat()}),
+        )
+
+        self.assertEqual([user["id"] for user in inactive], [self.users[1].pk])
+        self.assertEqual([user["id"] for user in recent], [self.users[2].pk])
+        self.assertEqual(self.client.get(self.url, {"status": "UNKNOWN"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_query_count_does_not_grow_with_users(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            lines = self._lines(self.client.get(self.url))
+
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(len(queries), 2)
+
+    def test_export_users_command(self) -> None:
+        output = io.StringIO()
+        call_command("export_users", "--status", "ACTIVE", "--chunk-size", "1", stdout=output)
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([user["id"] for user in lines], [self.users[0].pk, self.users[2].pk])
+        self.assertEqual(len(lines[0]["addresses"]), 2)
+
+
+class UserImportTest(TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.address = {
+            "address_type": "HOME",
+            "valid_from": "2025-01-01T00:00:00Z",
+            "post_code": "12345",
+            "city": "Test City",
+            "country_code": "US",
+            "street": "Test Street",
+            "building_number": "1",
+        }
+
+    def _write(self, name: str, lines: list[str]) -> str:
+        path = self.directory / name
+        path.write_text("".join(f"{line}\n" for line in lines))
+        return str(path)
+
+    def _ndjson(self, items: list) -> str:
+        return self._write("users.ndjson", [item if isinstance(item, str) else json.dumps(item) for item in items])
+
+    def test_import_ndjson_writes_rejects(self) -> None:
+        path = self._ndjson(
+            [
+                {"last_name": "A", "email": "a@example.com", "addresses": [self.address]},
+                "not json",
+                {"last_name": "B", "email": "invalid-email"},
+                {"last_name": "C", "email": "a@example.com"},
+            ],
+        )
+        output = io.StringIO()
+        call_command("import_users", path, "--chunk-size", "2", stdout=output)
+
+        self.assertIn("4 rows", output.getvalue())
+        self.assertEqual(User.objects.get().addresses.get().city, "Test City")
+        rejects = [json.loads(line) for line in Path(f"{path}.rejected.ndjson").read_text().splitlines()]
+        self.assertEqual([reject["line"] for reject in rejects], [2, 3, 4])
+        self.assertIn("email", rejects[2]["errors"])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_csv_round_trips_export(self) -> None:
+        user = User.objects.create(last_name="Doe", email="john.doe@example.com")
+        UserAddress.objects.create(user=user, **{**self.address, "valid_from": timezone.now()})
+        UserAddress.objects.create(user=user, **{**self.address, "address_type": "WORK", "valid_from": timezone.now()})
+        User.objects.create(last_name="Roe", email="jane.roe@example.com")
+        path = str(self.directory / "users.csv")
+        call_command("export_users", "--format", "csv", "--output", path)
+        User.objects.filter(pk=user.pk).update(last_name="Changed")
+        UserAddress.objects.update(city="Changed")
+
+        call_command("import_users", path, "--upsert", stdout=io.StringIO())
+
+        user.refresh_from_db()
+        self.assertEqual(user.last_name, "Doe")
+        self.assertEqual(list(user.addresses.values_list("city", flat=True)), ["Test City"] * 2)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_import_resumes_from_checkpoint(self) -> None:
+        path = self._ndjson([{"last_name": str(i), "email": f"user{i}@example.com"} for i in range(5)])
+
+        class InterruptedImporter(UserImporter):
+            def load_chunk(self, chunk: list, *args: object) -> None:
+                if chunk[0].line == 4:  # noqa: PLR2004
+                    raise KeyboardInterrupt
+                super().load_chunk(chunk, *args)
+
+        with contextlib.suppress(KeyboardInterrupt):
+            InterruptedImporter(path, "ndjson", chunk_size=1).run()
+        self.assertEqual(User.objects.count(), 3)
+
+        stats, _ = UserImporter(path, "ndjson", chunk_size=1).run(resume=True)
+
+        self.assertEqual((stats.rows, stats.created, stats.rejected), (5, 5, 0))
+        self.assertEqual(User.objects.count(), 5)
+
+    def test_checkpoint_commits_with_its_chunk(self) -> None:
+        path = self._ndjson([{"last_name": str(i), "email": f"user{i}@example.com"} for i in range(4)] + ["not json"])
+        save = Checkpoint.save
+
+        def save_then_crash(checkpoint: Checkpoint) -> None:
+            save(checkpoint)
+            if checkpoint.line == 5:  # noqa: PLR2004
+                raise KeyboardInterrupt
+
+        # Interrupted after the last chunk wrote its reject, before its transaction commits.
+        with mock.patch.object(Checkpoint, "save", save_then_crash), contextlib.suppress(KeyboardInterrupt):
+            UserImporter(path, "ndjson", chunk_size=2).run()
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(ImportCheckpoint.objects.get().line, 4)
+        self.assertEqual(Path(f"{path}.rejected.ndjson").read_text().count("\n"), 1)
+
+        stats, _ = UserImporter(path, "ndjson", chunk_size=2).run(resume=True)
+
+        self.assertEqual((stats.rows, stats.created, stats.rejected), (5, 4, 1))
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(len(Path(f"{path}.rejected.ndjson").read_text().splitlines()), 1)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    @skipUnless(connection.vendor == "postgresql", "COPY is PostgreSQL only")
+    def test_import_with_copy(self) -> None:
+        User.objects.create(last_name="Old", email="a@example.com")
+        path = self._ndjson(
+            [
+                {"last_name": "A", "email": "a@example.com", "addresses": [self.address]},
+                {"last_name": "B", "email": "b@example.com", "addresses": [self.address]},
+            ],
+        )
+
+        stats, _ = UserImporter(path, "ndjson", method="copy", upsert=True).run()
+
+        self.assertEqual((stats.created, stats.updated), (1, 1))
+        self.assertEqual(User.objects.get(email="a@example.com").last_name, "A")
+        self.assertEqual(UserAddress.objects.count(), 2)
+
+
+@override_settings(USERS_RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalGetTest(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(first_name="John", last_name="Doe", email="john.doe@example.com")
+        self.address = UserAddress.objects.create(
+            user=self.user,
+            address_type="HOME",
+            valid_from=timezone.now(),
+            post_code="12345",
+            city="Test City",
+            country_code="US",
+            street="Test Street",
+            building_number="123",
+        )
+        self.detail_url = reverse("user-detail", kwargs={"pk": self.user.pk})
+        self.address_list_url = reverse("user-address-list", kwargs={"id": self.user.pk})
+        self.address_detail_url = reverse(
+            "user-address-detail",
+            kwargs={"id": self.user.pk, "address_id": self.address.pk},
+        )
+
+    def _revalidate(self, url: str, etag: str, **params: str) -> object:
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    def _validate(self, url: str, **params: str) -> object:
+        """A full response with its validators, which only conditional requests get."""
+        response = self._revalidate(url, '"unknown"', **params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_matching_etag_returns_304_with_one_query(self) -> None:
+        for url in (reverse("user-list"), self.detail_url, self.address_list_url, self.address_detail_url):
+            with self.subTest(url=url):
+                response = self._validate(url)
+                self.assertIn("Last-Modified", response)
+
+                with self.assertNumQueries(1):
+                    not_modified = self._revalidate(url, response["ETag"])
+
+                self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(not_modified["ETag"], response["ETag"])
+
+    def test_unconditional_reads_skip_validators(self) -> None:
+        # Page count, users, addresses.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("user-list"))
+
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_if_modified_since(self) -> None:
+        response = self._validate(self.detail_url)
+
+        not_modified = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_address_changes_invalidate_user_etag(self) -> None:
+        etag = self._validate(self.detail_url)["ETag"]
+
+        self.address.city = "New City"
+        self.address.save()
+        updated = self._revalidate(self.detail_url, etag)
+        self.assertEqual(updated.status_code, status.HTTP_200_OK)
+
+        self.address.delete()
+        deleted = self._revalidate(self.detail_url, updated["ETag"])
+        self.assertEqual(deleted.status_code, status.HTTP_200_OK)
+        self.assertEqual(deleted.data["addresses"], [])
+
+    def test_etag_depends_on_representation(self) -> None:
+        etag = self._validate(self.detail_url)["ETag"]
+
+        response = self._revalidate(self.detail_url, etag, fields="id,email")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_current_addresses_have_no_validators(self) -> None:
+        response = self._revalidate(self.detail_url, "*", addresses="current")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
+
+    def test_missing_user_is_not_found(self) -> None:
+        response = self.client.get(reverse("user-detail", kwargs={"pk": 999}), HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResponseCacheTest(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(first_name="John", last_name="Doe", email="john.doe@example.com")
+        self.other = User.objects.create(first_name="Jane", last_name="Roe", email="jane.roe@example.com")
+        self.address = UserAddress.objects.create(
+            user=self.user,
+            address_type="HOME",
+            valid_from=timezone.now(),
+            post_code="12345",
+            city="Test City",
+            country_code="US",
+            street="Test Street",
+            building_number="123",
+        )
+        self.list_url = reverse("user-list")
+        self.detail_url = reverse("user-detail", kwargs={"pk": self.user.pk})
+        self.address_list_url = reverse("user-address-list", kwargs={"id": self.user.pk})
+        response_cache.reset_stats()
+
+    def _get(self, url: str, **params: str) -> object:
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_hit_serves_without_queries(self) -> None:
+        first = self._get(self.detail_url)
+
+        with self.assertNumQueries(0):
+            second = self._get(self.detail_url)
+
+        self.assertEqual((first["X-Cache"], second["X-Cache"]), ("MISS", "HIT"))
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(response_cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_hit_answers_conditional_request(self) -> None:
+        self._get(self.detail_url)
+        # The response cached without validators is replaced by one with them.
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH='"unknown"')
+        self.assertEqual((response.status_code, response["X-Cache"]), (status.HTTP_200_OK, "MISS"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_current_addresses_are_not_cached(self) -> None:
+        later = timezone.now() + timedelta(hours=1)
+        UserAddress.objects.create(
+            user=self.user,
+            address_type="HOME",
+            valid_from=later,
+            post_code="54321",
+            city="Next City",
+            country_code="US",
+            street="Next Street",
+            building_number="1",
+        )
+        self.assertEqual(self._get(self.detail_url, addresses="current").data["addresses"][0]["city"], "Test City")
+
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self._get(self.detail_url, addresses="current")
+
+        self.assertNotIn("X-Cache", response)
+        self.assertEqual(response.data["addresses"][0]["city"], "Next City")
+
+    def test_key_normalizes_query_string(self) -> None:
+        self.client.get(f"{self.list_url}?omit=updated_at&fields=id,email")
+
+        self.assertEqual(self.client.get(f"{self.list_url}?fields=id,email&omit=updated_at")["X-Cache"], "HIT")
+        self.assertEqual(self.client.get(f"{self.list_url}?fields=id")["X-Cache"], "MISS")
+
+    def test_writes_invalidate_cached_reads(self) -> None:
+        writes = {
+            "user save": lambda: self.client.patch(self.detail_url, {"first_name": "Johnny"}, format="json"),
+            "address save": lambda: self.client.patch(
+                reverse("user-address-detail", kwargs={"id": self.user.pk, "address_id": self.address.pk}),
+                {"city": "New City"},
+                format="json",
+            ),
+            "user update()": lambda: User.objects.filter(pk=self.user.pk).update(last_name="Updated"),
+            "address update()": lambda: UserAddress.objects.filter(user=self.user).update(street="Updated"),
+            "bulk endpoint": lambda: self.client.post(
+                reverse("user-bulk"),
+                {"upsert": True, "users": [{"last_name": "Bulk", "email": self.user.email}]},
+                format="json",
+            ),
+            "address delete": lambda: UserAddress.objects.filter(pk=self.address.pk).delete(),
+        }
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                for url in (self.list_url, self.detail_url, self.address_list_url):
+                    self._get(url)
+                write()
+                for url in (self.list_url, self.detail_url, self.address_list_url):
+                    response = self._get(url)
+                    self.assertEqual(response["X-Cache"], "MISS")
+
+        self.assertEqual(self._get(self.detail_url).data["last_name"], "Bulk")
+
+    def test_other_users_stay_cached(self) -> None:
+        other_url = reverse("user-detail", kwargs={"pk": self.other.pk})
+        self._get(other_url)
+
+        self.client.patch(self.detail_url, {"first_name": "Johnny"}, format="json")
+
+        self.assertEqual(self._get(other_url)["X-Cache"], "HIT")
+        self.assertEqual(self._get(self.list_url)["X-Cache"], "MISS")
+
+    def test_update_reports_its_users(self) -> None:
+        sent = []
+
+        def receiver(sender: type, user_ids: object, **kwargs: object) -> None:  # noqa: ARG001
+            sent.append((sender, user_ids))
+
+        users_changed.connect(receiver)
+        self.addCleanup(users_changed.disconnect, receiver)
+        other_url = reverse("user-detail", kwargs={"pk": self.other.pk})
+        self._get(other_url)
+
+        User.objects.filter(pk=self.user.pk).update(last_name="Updated")
+        self.assertEqual(self._get(other_url)["X-Cache"], "HIT")
+        UserAddress.objects.filter(pk=self.address.pk).update(user=self.other)
+        User.objects.update(status="ACTIVE")
+
+        expected = [(User, {self.user.pk}), (UserAddress, {self.user.pk, self.other.pk}), (User, None)]
+        self.assertEqual(sent, expected)
+
+
+class AddressHistoryTestCase(APITestCase):
+    """Two users with past, current and future HOME and WORK addresses."""
+
+    def setUp(self) -> None:
+        self.now = timezone.now()
+        self.users = [User.objects.create(last_name=f"User{i}", email=f"user{i}@example.com") for i in range(2)]
+        self.history = {}
+        for user in self.users:
+            for address_type in ("HOME", "WORK"):
+                for days in (-10, -5, 5):
+                    self.history[user.pk, address_type, days] = UserAddress.objects.create(
+                        user=user,
+                        address_type=address_type,
+                        valid_from=self.now + timedelta(days=days),
+                        post_code="12345",
+                        city=f"{address_type} {days}",
+                        country_code="US",
+                        street="Test Street",
+                        building_number="1",
+                    )
+
+
+class CurrentAddressTest(AddressHistoryTestCase):
+    def test_current_picks_latest_valid_from_per_type(self) -> None:
+        user = self.users[0]
+
+        current = UserAddress.objects.filter(user=user).current(self.now)
+        past = UserAddress.objects.filter(user=user).current(self.now - timedelta(days=7))
+
+        self.assertEqual(list(current), [self.history[user.pk, "HOME", -5], self.history[user.pk, "WORK", -5]])
+        self.assertEqual(list(past), [self.history[user.pk, "HOME", -10], self.history[user.pk, "WORK", -10]])
+        self.assertFalse(UserAddress.objects.current(self.now - timedelta(days=30)).exists())
+
+    def test_current_endpoint(self) -> None:
+        user = self.users[0]
+        url = reverse("user-address-current", kwargs={"id": user.pk})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"fields": "id,city"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [{"id": self.history[user.pk, t, -5].pk, "city": f"{t} -5"} for t in ("HOME", "WORK")],
+        )
+        future = self.client.get(url, {"at": (self.now + timedelta(days=6)).isoformat()})
+        self.assertEqual([address["city"] for address in future.data], ["HOME 5", "WORK 5"])
+
+    def test_current_addresses_of_many_users_in_one_query(self) -> None:
+        url = reverse("user-current-addresses")
+        user_ids = ",".join(str(user.pk) for user in self.users)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"user_ids": user_ids})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = [self.history[user.pk, t, -5] for user in self.users for t in ("HOME", "WORK")]
+        self.assertEqual(response.data, UserAddressSerializer(expected, many=True).data)
+        self.assertEqual(self.client.get(url, {"user_ids": "1,x"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NestedAddressesTest(AddressHistoryTestCase):
+    def _cities(self, response: Response) -> list[list[str]]:
+        return [[address["city"] for address in user["addresses"]] for user in response.data["results"]]
+
+    def test_current_mode(self) -> None:
+        # Page count, users, addresses.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("user-list"), {"addresses": "current"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._cities(response), [["HOME -5", "WORK -5"]] * len(self.users))
+
+    def test_latest_mode_limits_addresses_per_user(self) -> None:
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("user-list"), {"addresses": "latest:3"})
+
+        # The three latest by `valid_from`, nested in id order.
+        self.assertEqual(self._cities(response), [["HOME 5", "WORK -5", "WORK 5"]] * len(self.users))
+        detail = self.client.get(reverse("user-detail", kwargs={"pk": self.users[0].pk}), {"addresses": "latest:1"})
+        self.assertEqual([address["city"] for address in detail.data["addresses"]], ["WORK 5"])
+
+    def test_all_mode_is_the_default(self) -> None:
+        response = self.client.get(reverse("user-list"), {"addresses": "all"})
+
+        self.assertEqual(response.data, self.client.get(reverse("user-list")).data)
+        self.assertEqual([len(addresses) for addresses in self._cities(response)], [6] * len(self.users))
+
+    def test_none_mode_omits_addresses(self) -> None:
+        # Page count, users.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("user-list"), {"addresses": "none", "fields": "id,addresses"})
+
+        self.assertEqual(response.data["results"][0], {"id": self.users[0].pk})
+
+    def test_invalid_mode(self) -> None:
+        for mode in ("some", "latest", "latest:0", "latest:101", "latest:x", "current:2"):
+            with self.subTest(mode=mode):
+                response = self.client.get(reverse("user-list"), {"addresses": mode})
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("addresses", response.data)
+
+
+class ListFormatsTest(AddressHistoryTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.users.append(User.objects.create(last_name="Homeless", email="homeless@example.com"))
+
+    def test_columns_round_trip(self) -> None:
+        rows = UserSerializer(User.objects.prefetch_related("addresses").order_by("id"), many=True).data
+        table = to_columns(rows, UserSerializer())
+        self.assertEqual(table["fields"], list(UserSerializer.Meta.fields))
+        addresses = table["columns"][table["fields"].index("addresses")]
+        self.assertEqual(addresses["offsets"], [0, 6, 12, 12])
+        self.assertEqual(json.loads(json.dumps(from_columns(table))), json.loads(json.dumps(rows)))
+
+    def test_columns_follow_the_serializer(self) -> None:
+        # No rows, or no addresses in any row, still make an addresses child table.
+        for rows in ([], UserSerializer(self.users[-1:], many=True).data):
+            with self.subTest(rows=len(rows)):
+                table = to_columns(rows, UserSerializer())
+                addresses = table["columns"][table["fields"].index("addresses")]
+
+                self.assertEqual(addresses["offsets"], [0] * (len(rows) + 1))
+                self.assertEqual(addresses["fields"], list(UserAddressSerializer.Meta.fields))
+                self.assertEqual(from_columns(table), rows)
+
+    def test_columnar_list(self) -> None:
+        url = reverse("user-list")
+        expected = self.client.get(url).data
+        response = self.client.get(url, HTTP_ACCEPT=ColumnarJSONRenderer.media_type)
+        self.assertEqual(response["Content-Type"], ColumnarJSONRenderer.media_type)
+        page = json.loads(response.content)
+        self.assertEqual(page["count"], 3)
+        self.assertEqual(from_columns(page["results"]), json.loads(json.dumps(expected["results"])))
+        # Field names are sent once per table.
+        self.assertEqual(response.content.count(b'"city"'), 1)
+        for params in ({"fields": "id,email"}, {"addresses": "none"}):
+            with self.subTest(params=params):
+                expected = self.client.get(url, params).data
+                response = self.client.get(url, params, HTTP_ACCEPT=ColumnarJSONRenderer.media_type)
+                results = from_columns(json.loads(response.content)["results"])
+                self.assertEqual(results, json.loads(json.dumps(expected["results"])))
+
+        url = reverse("user-address-list", kwargs={"id": self.users[0].pk})
+        expected = self.client.get(url).data
+        response = self.client.get(url, HTTP_ACCEPT=ColumnarJSONRenderer.media_type)
+        results = from_columns(json.loads(response.content)["results"])
+        self.assertEqual(results, json.loads(json.dumps(expected["results"])))
+
+        url = reverse("user-detail", args=[self.users[0].pk])
+        response = self.client.get(url, HTTP_ACCEPT=ColumnarJSONRenderer.media_type)
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_list(self) -> None:
+        url = reverse("user-list")
+        expected = self.client.get(url).data
+        response = self.client.get(url, HTTP_ACCEPT=MessagePackRenderer.media_type)
+        self.assertEqual(response["Content-Type"], MessagePackRenderer.media_type)
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json.dumps(expected)))
+
+    @override_settings(COMPRESSION_MIN_SIZE=1024)
+    def test_compression(self) -> None:
+        url = reverse("user-list")
+        # Conditional, to get validators.
+        plain = self.client.get(url, HTTP_IF_NONE_MATCH='"unknown"')
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        self.assertGreater(len(plain.content), 1024)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate, br;q=0", HTTP_IF_NONE_MATCH='"unknown"')
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], f"W/{plain['ETag']}")
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+        self.assertNotIn("Content-Encoding", response)
+        with override_settings(COMPRESSION_MIN_SIZE=len(plain.content) + 1):
+            self.assertNotIn("Content-Encoding", self.client.get(url, HTTP_ACCEPT_ENCODING="gzip"))
+        response = self.client.get(url, HTTP_ACCEPT=ColumnarJSONRenderer.media_type, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli_preferred(self) -> None:
+        url = reverse("user-list")
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), self.client.get(url).content)
+
+    def test_accepted_encodings(self) -> None:
+        self.assertEqual(accepted_encodings("gzip;q=0.5, BR, identity;q=0, deflate;q=x"), {"gzip", "br"})
+        self.assertEqual(negotiate_encoding("*"), ENCODINGS[0])
+        self.assertIsNone(negotiate_encoding("deflate"))
+
+
+class UserFilterTest(APITestCase):
+    def setUp(self) -> None:
+        self.list_url = reverse("user-list")
+        self.users = {
+            name: User.objects.create(last_name=name, email=f"{name}@Example.com", status=user_status)
+            for name, user_status in (("Smith", "ACTIVE"), ("Smithers", "INACTIVE"), ("Jones", "ACTIVE"))
+        }
+        for name, country_code, city in (("Smith", "POL", "Warsaw"), ("Jones", "DEU", "Berlin")):
+            UserAddress.objects.create(
+                user=self.users[name],
+                address_type="HOME",
+                valid_from=timezone.now(),
+                post_code="12345",
+                city=city,
+                country_code=country_code,
+                street="Test Street",
+                building_number="1",
+            )
+
+    def _names(self, **params: str) -> list:
+        response = self.client.get(self.list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [user["last_name"] for user in response.data["results"]]
+
+    def _explain_page_query(self, **params: str) -> str:
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.list_url, params).status_code, status.HTTP_200_OK)
+        sql = next(query["sql"] for query in queries if "LIMIT" in query["sql"] and '"users"' in query["sql"])
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # The tables are tiny: without this the planner rightly prefers a sequential scan.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+            return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+
+    def test_filters(self) -> None:
+        since = (timezone.now() - timedelta(minutes=1)).isoformat()
+
+        self.assertEqual(self._names(status="ACTIVE"), ["Smith", "Jones"])
+        self.assertEqual(self._names(last_name_prefix="Smith"), ["Smith", "Smithers"])
+        self.assertEqual(self._names(last_name_prefix="smith"), [])
+        self.assertEqual(self._names(email="SMITHERS@example.COM"), ["Smithers"])
+        self.assertEqual(self._names(address_country="POL"), ["Smith"])
+        self.assertEqual(self._names(address_city="Berlin", status="ACTIVE"), ["Jones"])
+        self.assertEqual(self._names(created_after=since, updated_before=since), [])
+        self.assertEqual(len(self._names(created_after=since)), len(self.users))
+
+    def test_invalid_filters(self) -> None:
+        for params in ({"status": "GONE"}, {"created_after": "yesterday"}, {"address_country": "POLAND"}):
+            with self.subTest(params=params):
+                response = self.client.get(self.list_url, params)
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(next(iter(params)), response.data)
+
+    def test_ordering(self) -> None:
+        self.assertEqual(self._names(ordering="-last_name"), ["Smithers", "Smith", "Jones"])
+        self.assertEqual(self._names(ordering="status,-created_at"), ["Jones", "Smith", "Smithers"])
+
+        unknown = self.client.get(self.list_url, {"ordering": "first_name"})
+        self.assertEqual(unknown.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ordering", unknown.data)
+        keyset = self.client.get(self.list_url, {"ordering": "email", "pagination": "cursor"})
+        self.assertEqual(keyset.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_common_filters_use_indexes(self) -> None:
+        since = (timezone.now() - timedelta(minutes=1)).isoformat()
+        cases = [
+            ({"status": "ACTIVE", "ordering": "created_at"}, "users_status_created_id_idx"),
+            ({"status": "ACTIVE", "created_after": since, "ordering": "-created_at"}, "users_status_created_id_idx"),
+            ({"updated_after": since, "ordering": "updated_at"}, "users_updated_at_id_idx"),
+            (
+                {"last_name_prefix": "Smi"},
+                "users_last_name_c_idx" if connection.vendor == "postgresql" else "users_last_name_id_idx",
+            ),
+            ({"email": "smith@example.com"}, "users_email_upper_idx"),
+            ({"address_country": "POL", "address_city": "Warsaw"}, "users_addr_country_city_idx"),
+            ({"address_city": "Warsaw"}, "users_addr_city_user_idx"),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                plan = self._explain_page_query(**params)
+
+                self.assertIn(index, plan)
+                self.assertNotRegex(plan, r"\bSCAN users\b|Seq Scan on users\b")
+
+
+class SearchTest(APITestCase):
+    def setUp(self) -> None:
+        self.list_url = reverse("user-list")
+        self.smith = User.objects.create(first_name="John", last_name="Smith", email="john@example.com")
+        self.jane = User.objects.create(first_name="Jane", last_name="Smithers", email="jane@smith.org")
+        self.bob = User.objects.create(first_name="Bob", last_name="Jones", email="bob@example.com")
+        self.address = UserAddress.objects.create(
+            user=self.bob,
+            address_type="HOME",
+            valid_from=timezone.now(),
+            post_code="12345",
+            city="Smithville",
+            country_code="USA",
+            street="Main Street",
+            building_number="1",
+        )
+
+    def _search(self, query: str) -> list:
+        return [user.pk for user in search_users(User.objects.order_by("pk"), query)]
+
+    def test_search_endpoint_is_ranked(self) -> None:
+        response = self.client.get(self.list_url, {"q": "smith"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Jane matches in two fields, John in one.
+        self.assertEqual([user["id"] for user in response.data["results"]], [self.jane.pk, self.smith.pk])
+        self.assertEqual(response.data["count"], 2)
+        ordered = self.client.get(self.list_url, {"q": "smith", "ordering": "id"})
+        self.assertEqual([user["id"] for user in ordered.data["results"]], [self.smith.pk, self.jane.pk])
+
+    def test_every_term_must_match(self) -> None:
+        self.assertEqual(self._search("SMITH john"), [self.smith.pk])
+        # Terms shorter than a trigram fall back to `icontains`.
+        self.assertEqual(self._search("jo"), [self.smith.pk, self.bob.pk])
+        self.assertEqual(self._search("smith xyz"), [])
+
+    def test_index_follows_writes(self) -> None:
+        self.jane.email = "jane@example.com"
+        self.jane.save()
+        User.objects.filter(pk=self.bob.pk).update(last_name="Smithson")
+        User.objects.bulk_create([User(last_name="Blacksmith", email="black@example.com")])
+        self.smith.delete()
+
+        self.assertEqual(
+            list(search_users(User.objects.all(), "smith").values_list("last_name", flat=True).order_by("pk")),
+            ["Smithers", "Smithson", "Blacksmith"],
+        )
+
+    def test_address_search(self) -> None:
+        addresses = search_addresses(UserAddress.objects.all(), "smith")
+        self.assertEqual(list(addresses), [self.address])
+        self.assertEqual(list(search_addresses(UserAddress.objects.all(), "jones")), [self.address])
+
+        url = reverse("user-address-list", kwargs={"id": self.bob.pk})
+        self.assertEqual(len(self.client.get(url, {"q": "smithv"}).data["results"]), 1)
+        # The user is fixed by the URL, so user fields are not searched.
+        self.assertEqual(self.client.get(url, {"q": "jones"}).data["results"], [])
+
+    def test_admin_search(self) -> None:
+        admin_user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin_user)
+
+        response = self.client.get(reverse("admin:users_user_changelist"), {"q": "smithers"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.context["cl"].result_list), [self.jane])
+
+
+class HighVolumeAdminTest(TestCase):
+    def setUp(self) -> None:
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "password"))
+        self.user = User.objects.create(first_name="John", last_name="Doe", email="john@example.com")
+        self.add_users(1)
+        self.add_addresses(1)
+
+    def add_users(self, count: int) -> None:
+        start = User.objects.count()
+        User.objects.bulk_create(
+            User(first_name="Jane", last_name=f"Doe{i}", email=f"jane{i}@example.com")
+            for i in range(start, start + count)
+        )
+
+    def add_addresses(self, count: int) -> None:
+        now = timezone.now()
+        UserAddress.objects.bulk_create(
+            UserAddress(
+                user=user,
+                address_type="HOME",
+                valid_from=now - timedelta(days=i),
+                post_code="00-001",
+                city="Warsaw",
+                country_code="POL",
+                street="Main Street",
+                building_number=str(i),
+            )
+            for user in User.objects.all()
+            for i in range(UserAddress.objects.filter(user=user).count(), count)
+        )
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_changelist_queries_do_not_depend_on_rows(self) -> None:
+        urls = [reverse("admin:users_user_changelist"), reverse("admin:users_useraddress_changelist")]
+        # The first view of a page also loads content types.
+        for url in urls:
+            self.client.get(url)
+        before = [self.count_queries(url) for url in urls]
+        self.add_users(10)
+        self.add_addresses(5)
+
+        # Session, user, statistics lookup, count, page, then the date hierarchy: all rows are from
+        # today, so it drills down to days with a second MIN/MAX and probes the one day.
+        with self.assertNumQueries(8):
+            self.client.get(urls[0])
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_change_view_loads_latest_addresses(self) -> None:
+        urls = [
+            reverse("admin:users_user_change", args=[self.user.pk]),
+            reverse("admin:users_useraddress_change", args=[self.user.addresses.get().pk]),
+        ]
+        # The first view of a page also loads content types.
+        for url in urls:
+            self.client.get(url)
+        before = [self.count_queries(url) for url in urls]
+        self.add_users(10)
+        self.add_addresses(UserAddressInline.max_addresses + 5)
+
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+        response = self.client.get(urls[0])
+        self.assertEqual(response.context["inline_admin_formsets"][0].formset.total_form_count(), 20)
+        self.assertContains(response, f"?user__id__exact={self.user.pk}")
+        # `user` is an autocomplete widget, not a <select> of every user.
+        self.assertNotContains(self.client.get(urls[1]), "jane5@example.com")
+
+    def test_date_hierarchy_probes_periods(self) -> None:
+        User.objects.filter(pk=self.user.pk).update(created_at=timezone.now().replace(year=2020, month=3, day=15))
+        url = reverse("admin:users_user_changelist")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, "created_at__year=2020")
+        self.assertContains(response, f"created_at__year={timezone.now().year}")
+        self.assertNotContains(response, "created_at__year=2021")
+        self.assertFalse(any("DISTINCT" in query["sql"] for query in queries))
+
+        response = self.client.get(url, {"created_at__year": "2020"})
+        self.assertContains(response, "created_at__month=3")
+        self.assertNotContains(response, "created_at__month=4")
+
+    @skipUnless(connection.vendor == "sqlite", "Table statistics are read from sqlite_stat1")
+    @override_settings(USERS_ADMIN_EXACT_COUNT_LIMIT=2)
+    def test_changelist_shows_estimated_count(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.add_users(3)
+
+        response = self.client.get(reverse("admin:users_user_changelist"))
+        # The statistics predate the last three users.
+        self.assertEqual(response.context["cl"].result_count, 2)
+        self.assertEqual(estimate_count(User.objects.all()), 2)
+        filtered = self.client.get(reverse("admin:users_user_changelist"), {"status__exact": "ACTIVE"})
+        self.assertEqual(filtered.context["cl"].result_count, 5)
+
+
+class PooledSQLiteDatabaseWrapper(PooledDatabaseWrapperMixin, SQLiteDatabaseWrapper):
+    pass
+
+
+class ConnectionPoolTest(TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(reset_pools)
+        self.settings_dict = {
+            **connection.settings_dict,
+            "NAME": str(Path(directory.name) / "pooled.sqlite3"),
+            "CONN_MAX_AGE": 0,
+            "POOL": {"MAX_SIZE": 2, "TIMEOUT": 0.05, "MAX_LIFETIME": 60},
+        }
+
+    def _wrapper(self, **settings: object) -> PooledSQLiteDatabaseWrapper:
+        wrapper = PooledSQLiteDatabaseWrapper({**self.settings_dict, **settings}, alias="pooled")
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _request(self, wrapper: PooledSQLiteDatabaseWrapper) -> object:
+        """One request's worth of database work, between the `close_old_connections` of its start and end."""
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        raw_connection = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        return raw_connection
+
+    def test_connection_reused_across_requests(self) -> None:
+        wrapper = self._wrapper()
+
+        raw_connections = {id(self._request(wrapper)) for _ in range(3)}
+
+        self.assertEqual(len(raw_connections), 1)
+        stats = get_pool("pooled", self.settings_dict).stats()
+        self.assertEqual(stats["opened"], 1)
+        self.assertEqual(stats["acquisitions"], 3)
+        self.assertEqual((stats["idle"], stats["in_use"]), (1, 0))
+
+    def test_persistent_connection_kept_across_requests(self) -> None:
+        wrapper = self._wrapper(CONN_MAX_AGE=60)
+
+        raw_connections = {id(self._request(wrapper)) for _ in range(3)}
+
+        self.assertEqual(len(raw_connections), 1)
+        stats = get_pool("pooled", self.settings_dict).stats()
+        self.assertEqual(stats["acquisitions"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_concurrent_wrappers_share_the_pool(self) -> None:
+        first, second, third = self._wrapper(), self._wrapper(), self._wrapper()
+        first.ensure_connection()
+        second.ensure_connection()
+
+        self.assertIsNot(first.connection, second.connection)
+        with self.assertRaises(PoolTimeoutError):  # noqa: PT027
+            third.ensure_connection()
+        stats = get_pool("pooled", self.settings_dict).stats()
+        self.assertEqual((stats["size"], stats["in_use"], stats["timeouts"]), (2, 2, 1))
+
+        raw_connection = second.connection
+        second.close()
+        third.ensure_connection()
+        self.assertIs(third.connection, raw_connection)
+
+    def test_rolls_back_on_release(self) -> None:
+        wrapper = self._wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TABLE pooled (id integer)")
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute("INSERT INTO pooled VALUES (1)")
+        wrapper.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM pooled")
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_discards_expired_and_broken_connections(self) -> None:
+        opened = []
+
+        def connect() -> object:
+            opened.append(SQLiteDatabaseWrapper.Database.connect(":memory:"))
+            return opened[-1]
+
+        pool = ConnectionPool(connect, max_size=1, max_lifetime=0)
+        pool.release(pool.acquire())
+        self.assertEqual(pool.stats()["idle"], 0)
+
+        pool.max_lifetime = 60
+        pool.release(pool.acquire())
+        self.assertIs(pool.acquire(check=lambda _: False), opened[2])
+        self.assertEqual(len(opened), 3)
+
+    def test_health_check_reports_pool(self) -> None:
+        get_pool(connection.alias, connection.settings_dict)
+
+        response = self.client.get(reverse("health-check"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pool = response.data["checks"][0]["pool"]
+        self.assertLessEqual({"in_use", "waiting", "acquire_ms_avg", "acquire_ms_max"}, pool.keys())
+
+
+# The stand-in replicas app.testing.TestRunner configures (TEST_REPLICAS), with their weights.
+REPLICA_WEIGHTS = {"replica1": 2, "replica2": 1}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICA_WEIGHTS, USERS_RESPONSE_CACHE_TIMEOUT=0)
+class ReplicaRoutingTest(APITestCase):
+    databases = frozenset({DEFAULT_DB_ALIAS, *REPLICA_WEIGHTS})
+
+    def setUp(self) -> None:
+        # The same user id in every database, named after it.
+        for alias in self.databases:
+            User.objects.using(alias).create(
+                id=1,
+                first_name=alias,
+                last_name="Replica",
+                initials="R",
+                email=f"{alias}@example.com",
+                status="ACTIVE",
+            )
+        self.detail_url = reverse("user-detail", kwargs={"pk": 1})
+
+    def _served_by(self, **headers: str) -> str:
+        response = self.client.get(self.detail_url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["first_name"]
+
+    def test_replicas_have_their_own_test_databases(self) -> None:
+        default = {"NAME": "app", "TEST": {"NAME": None}}
+        postgres = replica_test_settings(default, "replica1", "postgresql")
+        sqlite = replica_test_settings(default, "replica1", "sqlite")
+
+        self.assertEqual(postgres["TEST"], {"NAME": "test_app_replica1", "MIRROR": None})
+        self.assertEqual(postgres["NAME"], "app")
+        self.assertIsNone(sqlite["TEST"]["NAME"])
+        named = replica_test_settings({**default, "TEST": {"NAME": "test_custom"}}, "replica2", "mysql")
+        self.assertEqual(named["TEST"]["NAME"], "test_custom_replica2")
+        signatures = {connections[alias].creation.test_db_signature() for alias in self.databases}
+        self.assertEqual(len(signatures), len(self.databases))
+
+    def test_reads_weighted_round_robin(self) -> None:
+        served_by = Counter(self._served_by() for _ in range(6))
+
+        self.assertEqual(served_by, {"replica1": 4, "replica2": 2})
+
+    def test_list_and_addresses_read_from_replica(self) -> None:
+        UserAddress.objects.using("replica1").create(
+            user_id=1,
+            address_type="HOME",
+            valid_from=timezone.now(),
+            post_code="12345",
+            city="Replica City",
+            country_code="US",
+            street="Replica Street",
+            building_number="1",
+        )
+        get_replicas().check = lambda alias: alias == "replica1"
+        self.addCleanup(get_replicas().refresh, force=True)
+        self.addCleanup(setattr, get_replicas(), "check", check_database)
+        get_replicas().refresh(force=True)
+
+        users = self.client.get(reverse("user-list")).data["results"]
+        addresses = self.client.get(reverse("user-address-list", kwargs={"id": 1})).data["results"]
+
+        self.assertEqual([user["first_name"] for user in users], ["replica1"])
+        self.assertEqual([address["city"] for address in addresses], ["Replica City"])
+
+    def test_write_goes_to_primary_and_pins_reads(self) -> None:
+        response = self.client.patch(self.detail_url, {"last_name": "Written"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(User.objects.using(DEFAULT_DB_ALIAS).get(pk=1).last_name, "Written")
+        self.assertEqual(response.cookies[PIN_COOKIE].value, response[PIN_HEADER])
+        self.assertEqual({self._served_by() for _ in range(3)}, {DEFAULT_DB_ALIAS})
+
+        # Clients without cookies send the header back instead.
+        self.client.cookies.clear()
+        self.assertEqual(self._served_by(HTTP_X_PRIMARY_PINNED_UNTIL=response[PIN_HEADER]), DEFAULT_DB_ALIAS)
+        self.assertIn(self._served_by(), REPLICA_WEIGHTS)
+
+    def test_expired_or_out_of_window_pin_ignored(self) -> None:
+        for until in (time.time() - 1, time.time() + 3600, "soon"):
+            with self.subTest(until=until):
+                self.assertIn(self._served_by(HTTP_X_PRIMARY_PINNED_UNTIL=str(until)), REPLICA_WEIGHTS)
+
+    def test_failing_replica_ejected(self) -> None:
+        get_replicas().check = lambda alias: alias != "replica1"
+        self.addCleanup(get_replicas().refresh, force=True)
+        self.addCleanup(setattr, get_replicas(), "check", check_database)
+
+        response = self.client.get(reverse("health-check"))
+
+        self.assertEqual(response.data["status"], "UP")
+        self.assertEqual(
+            response.data["checks"][1],
+            {"name": "databaseReplicas", "status": "DOWN", "replicas": {"replica1": "DOWN", "replica2": "UP"}},
+        )
+        self.assertEqual({self._served_by() for _ in range(3)}, {"replica2"})
+
+    def test_all_replicas_down_reads_primary(self) -> None:
+        replicas = ReplicaSet(REPLICA_WEIGHTS, check=lambda _: False)
+
+        self.assertIsNone(replicas.choose())
+
+    def test_replica_rechecked_after_interval(self) -> None:
+        healthy = {"replica1": False, "replica2": True}
+        replicas = ReplicaSet(REPLICA_WEIGHTS, check=healthy.__getitem__, check_interval=0)
+
+        self.assertEqual({replicas.choose() for _ in range(3)}, {"replica2"})
+        healthy["replica1"] = True
+        self.assertEqual(Counter(replicas.choose() for _ in range(3)), {"replica1": 2, "replica2": 1})
+
+
+@override_settings(USERS_RESPONSE_CACHE_TIMEOUT=0)
+class SchemaTest(TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        call_command("generate_schema", "--output-dir", directory.name, stdout=io.StringIO())
+
+    def test_static_schema_matches_live(self) -> None:
+        live = schema_view.without_ui()(RequestFactory().get("/api.json/"), format=".json")
+        expected = json.loads(live.render().content)
+        # drf-yasg's view adds the host of the request it answers.
+        del expected["host"], expected["schemes"]
+
+        static = json.loads((self.directory / "openapi.json").read_text())
+        self.assertEqual(static, expected)
+        self.assertEqual(yaml.safe_load((self.directory / "openapi.yaml").read_text()), static)
+        call_command("generate_schema", "--output-dir", self.directory, "--check")
+        (self.directory / "openapi.yaml").write_text("swagger: '2.0'\n")
+        with self.assertRaises(CommandError):  # noqa: PT027
+            call_command("generate_schema", "--output-dir", self.directory, "--check")
+
+    def test_serves_static_schema(self) -> None:
+        url = reverse("schema-json", kwargs={"schema_format": "json"})
+        with override_settings(OPENAPI_SCHEMA_DIR=str(self.directory), OPENAPI_SCHEMA_MAX_AGE=600):
+            response = self.client.get(url)
+            self.assertEqual(response.content, (self.directory / "openapi.json").read_bytes())
+            self.assertRegex(response["ETag"], r'^"[0-9a-f]{64}"$')
+            self.assertEqual(response["Cache-Control"], "public, max-age=600")
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.content, b"")
+
+            response = self.client.get(reverse("schema-json", kwargs={"schema_format": "yaml"}))
+            self.assertEqual(response.content, (self.directory / "openapi.yaml").read_bytes())
+            self.assertTrue(response["Content-Type"].startswith("application/yaml"))
+            response = self.client.get(reverse("schema-json", kwargs={"schema_format": "xml"}))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_compressed_once_with_strong_etag(self) -> None:
+        url = reverse("schema-json", kwargs={"schema_format": "json"})
+        with override_settings(OPENAPI_SCHEMA_DIR=str(self.directory)):
+            plain = self.client.get(url)
+            for encoding in ENCODINGS:
+                with self.subTest(encoding=encoding):
+                    response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+                    self.assertEqual(response["Content-Encoding"], encoding)
+                    self.assertIn("Accept-Encoding", response["Vary"])
+                    decompress = brotli.decompress if encoding == "br" else gzip.decompress
+                    self.assertEqual(decompress(response.content), plain.content)
+                    # Strong, and naming the compressed bytes rather than those of `plain`.
+                    self.assertRegex(response["ETag"], r'^"[0-9a-f]{64}"$')
+                    self.assertNotEqual(response["ETag"], plain["ETag"])
+                    self.assertIs(encode_schema("json", encoding)[0], encode_schema("json", encoding)[0])
+
+                    etag = response["ETag"]
+                    response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                    self.assertEqual(response["ETag"], etag)
+                    response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=plain["ETag"])
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_generated_lazily_under_debug(self) -> None:
+        (self.directory / "openapi.json").write_text("{}")
+        url = reverse("schema-json", kwargs={"schema_format": "json"})
+        with override_settings(OPENAPI_SCHEMA_DIR=str(self.directory), DEBUG=True):
+            response = self.client.get(url)
+            self.assertEqual(response["Cache-Control"], "no-cache")
+            self.assertIn("/api/users/", json.loads(response.content)["paths"])
+            self.assertIs(load_schema("json"), load_schema("json"))
+
+    def test_ui_loads_schema_view(self) -> None:
+        response = self.client.get(reverse("schema-swagger-ui"))
+        self.assertContains(response, reverse("schema-json", kwargs={"schema_format": "json"}))
+
+
+class MetricsTest(APITestCase):
+    def setUp(self) -> None:
+        User.objects.create(first_name="John", last_name="Doe", initials="JD", email="john.doe@example.com")
+
+    def _sample(self, name: str, **labels: str) -> float:
+        """The value of the `name` sample with exactly `labels` in `/metrics`, 0 when missing."""
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        selector = ",".join(f'{label}="{value}"' for label, value in labels.items())
+        for line in response.content.decode().splitlines():
+            sample, _, value = line.rpartition(" ")
+            if sample == f"{name}{{{selector}}}":
+                return float(value)
+        return 0.0
+
+    def test_server_timing_counts_queries(self) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-list"))
+
+        timings = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertEqual(set(timings), {"total", "db", "render"})
+        self.assertTrue(timings["db"].endswith(f'desc="{len(queries)} queries"'))
+
+    async def test_server_timing_under_asgi(self) -> None:
+        # AsyncClient runs the middleware in async mode, like an ASGI server.
+        response = await AsyncClient().get(reverse("user-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertEqual(set(timings), {"total", "db", "render"})
+
+    def test_metrics_per_view_and_method(self) -> None:
+        labels = {"view": "user-list", "method": "GET"}
+        requests = self._sample("http_requests_total", **labels, status="200")
+        queries = self._sample("db_queries_total", **labels)
+        durations = self._sample("http_request_duration_seconds_count", **labels)
+        sizes = self._sample("http_response_size_bytes_count", **labels)
+        renders = self._sample("http_response_render_seconds_count", **labels)
+
+        captured = 0
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse("user-list"))
+            captured += len(context)
+
+        self.assertEqual(self._sample("http_requests_total", **labels, status="200"), requests + 2)
+        self.assertEqual(self._sample("db_queries_total", **labels), queries + captured)
+        self.assertEqual(self._sample("http_request_duration_seconds_count", **labels), durations + 2)
+        self.assertEqual(self._sample("http_response_size_bytes_count", **labels), sizes + 2)
+        self.assertEqual(self._sample("http_response_render_seconds_count", **labels), renders + 2)
+        self.assertEqual(
+            self._sample("http_request_duration_seconds_bucket", **labels, le="+Inf"),
+            self._sample("http_request_duration_seconds_count", **labels),
+        )
+
+    def test_metrics_summed_across_processes(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        labels = (("view", "user-list"), ("method", "GET"), ("status", "200"))
+        # A snapshot left by another worker.
+        other = {"counters": [["http_requests_total", labels, 5]], "histograms": []}
+        (Path(directory.name) / "1.json").write_text(json.dumps(other))
+
+        with override_settings(METRICS_DIR=directory.name):
+            self.client.get(reverse("user-list"))
+            counters = {
+                (name, tuple(map(tuple, names))): value for name, names, value in registry.snapshot()["counters"]
+            }
+            total = self._sample("http_requests_total", **dict(labels))
+            registry.flush(force=True)
+
+        self.assertEqual(total, counters["http_requests_total", labels] + 5)
+        self.assertTrue((Path(directory.name) / f"{os.getpid()}.json").exists())
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=[ipaddress.ip_network("10.0.0.0/8")], METRICS_TOKEN="secret")  # noqa: S106
+    def test_metrics_access(self) -> None:
+        url = reverse("metrics")
+        cases = [
+            ({"REMOTE_ADDR": "10.1.2.3"}, status.HTTP_200_OK),
+            ({"REMOTE_ADDR": "192.0.2.1", "HTTP_AUTHORIZATION": "Bearer secret"}, status.HTTP_200_OK),
+            ({"REMOTE_ADDR": "192.0.2.1", "HTTP_AUTHORIZATION": "Bearer wrong"}, status.HTTP_403_FORBIDDEN),
+            ({"REMOTE_ADDR": "127.0.0.1"}, status.HTTP_403_FORBIDDEN),
+        ]
+        for headers, expected in cases:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(url, **headers).status_code, expected)
+        with override_settings(METRICS_TOKEN=""):
+            response = self.client.get(url, REMOTE_ADDR="192.0.2.1", HTTP_AUTHORIZATION="Bearer ")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class QueryInspectorTest(APITestCase):
+    def setUp(self) -> None:
+        for index in range(6):
+            User.objects.create(first_name="John", last_name="Doe", initials="JD", email=f"john{index}@example.com")
+
+    @staticmethod
+    def count_addresses(request: HttpRequest) -> HttpResponse:  # noqa: ARG004
+        return HttpResponse(str([user.addresses.count() for user in User.objects.all()]))
+
+    @staticmethod
+    def count_prefetched_addresses(request: HttpRequest) -> HttpResponse:  # noqa: ARG004
+        return HttpResponse(str([len(user.addresses.all()) for user in User.objects.prefetch_related("addresses")]))
+
+    def test_query_shape(self) -> None:
+        self.assertEqual(
+            query_shape("SELECT *  FROM users\nWHERE id IN (%s, %s, %s) AND email = 'a''b' LIMIT 21"),
+            "SELECT * FROM users WHERE id IN (...) AND email = ? LIMIT ?",
+        )
+        self.assertEqual(
+            query_shape('SELECT * FROM "users" WHERE "users"."id" IN (%s)'),
+            query_shape('SELECT * FROM "users" WHERE "users"."id" IN (%s, %s)'),
+        )
+
+    @override_settings(QUERY_INSPECTOR="log")
+    def test_n_plus_one_logged_with_call_site(self) -> None:
+        request = RequestFactory().get("/users/")
+        with self.assertLogs("app.db.inspector", "WARNING") as logs:
+            QueryInspectorMiddleware(self.count_addresses)(request)
+
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report["queries"], 7)
+        [n_plus_one] = report["n_plus_one"]
+        self.assertEqual(n_plus_one["count"], 6)
+        self.assertIn('FROM "users_addresses" WHERE "users_addresses"."user_id" = ?', n_plus_one["shape"])
+        self.assertRegex(n_plus_one["call_site"], r"^users/tests\.py:\d+ in <listcomp>$")
+
+    def test_n_plus_one_raises_under_test_runner(self) -> None:
+        request = RequestFactory().get("/users/")
+        with self.assertRaises(NPlusOneError), self.assertLogs("app.db.inspector", "WARNING"):  # noqa: PT027
+            QueryInspectorMiddleware(self.count_addresses)(request)
+        # Prefetching runs one query for all the addresses.
+        QueryInspectorMiddleware(self.count_prefetched_addresses)(request)
+
+    def test_ignored_call_sites_and_threshold(self) -> None:
+        request = RequestFactory().get("/users/")
+        with override_settings(QUERY_INSPECTOR_IGNORE=["users/tests.py:* in <listcomp>"]):
+            QueryInspectorMiddleware(self.count_addresses)(request)
+        with override_settings(QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD=6):
+            QueryInspectorMiddleware(self.count_addresses)(request)
+
+    @override_settings(QUERY_INSPECTOR="log", QUERY_INSPECTOR_SLOW_QUERY_MS=0, USERS_RESPONSE_CACHE_TIMEOUT=0)
+    def test_slow_queries_logged_with_explain(self) -> None:
+        with self.assertLogs("app.db.inspector", "WARNING") as logs:
+            response = self.client.get(reverse("user-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report["view"], "user-list")
+        self.assertEqual(report["n_plus_one"], [])
+        # Every query is slow at 0 ms, but the EXPLAIN queries are not inspected themselves.
+        self.assertEqual(len(report["slow_queries"]), report["queries"])
+        selects = [query for query in report["slow_queries"] if query["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        for query in selects:
+            self.assertEqual(query["alias"], DEFAULT_DB_ALIAS)
+            self.assertTrue(query["explain"])
+            self.assertNotIn("EXPLAIN failed", query["explain"][0])
+
+    @override_settings(QUERY_INSPECTOR="off", QUERY_INSPECTOR_N_PLUS_ONE_THRESHOLD=0, QUERY_INSPECTOR_SLOW_QUERY_MS=0)
+    def test_off(self) -> None:
+        QueryInspectorMiddleware(self.count_addresses)(RequestFactory().get("/users/"))
+        self.assertEqual(self.client.get(reverse("user-list")).status_code, status.HTTP_200_OK)
+
+
+class BenchmarkTest(TestCase):
+    def test_address_counts_skewed_and_deterministic(self) -> None:
+        self.assertEqual(address_counts(4, 3), [3, 3, 3, 3])
+        counts = address_counts(1000, 3, skew=1.2)
+        self.assertEqual(sum(counts), 3000)
+        self.assertGreater(max(counts), 100)
+        self.assertEqual(counts, address_counts(1000, 3, skew=1.2))
+
+    def test_compare_results_flags_regressions(self) -> None:
+        baseline = [{"scenario": "list", "ops_s": 100.0, "median_ms": 10.0, "p99_ms": 20.0, "queries": 4}]
+        within = [{"scenario": "list", "ops_s": 95.0, "median_ms": 10.5, "p99_ms": 40.0, "queries": 4}]
+        slower = [{"scenario": "list", "ops_s": 80.0, "median_ms": 12.5, "p99_ms": 20.0, "queries": 5}]
+
+        self.assertFalse(any(row["regressed"] for row in compare_results(baseline, within, 0.1)))
+        regressed = {row["metric"] for row in compare_results(baseline, slower, 0.1) if row["regressed"]}
+        self.assertEqual(regressed, {"ops_s", "median_ms", "queries"})
+        self.assertEqual(compare_results(baseline, [{"scenario": "new", "ops_s": 1.0}], 0.1), [])
+
+
+class LoadHarnessTest(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(first_name="John", last_name="Doe", email="john.doe@example.com")
+
+    def test_request_mix_reproducible(self) -> None:
+        mix = parse_mix("list=2,create=1,address_create=1")
+        first, second = (RequestMix(mix, [self.user.pk], seed=7) for _ in range(2))
+        requests = [first.next() for _ in range(50)]
+
+        self.assertEqual(requests, [second.next() for _ in range(50)])
+        self.assertEqual({request[0] for request in requests}, {"list", "create", "address_create"})
+        emails = [json.loads(body)["email"] for operation, _, _, body, _ in requests if operation == "create"]
+        self.assertEqual(len(emails), len(set(emails)))
+        with self.assertRaises(ValueError):  # noqa: PT027
+            parse_mix("list=1,delete=1")
+
+    async def test_asgi_server_replays_mix(self) -> None:
+        application = ASGIHandler()
+        server = await asyncio.start_server(lambda r, w: handle_asgi(application, r, w), "127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        mix = RequestMix(parse_mix(",".join(OPERATIONS)), [self.user.pk])
+        try:
+            result = await run_arrivals(partial(HTTPConnection, f"http://{host}:{port}"), mix, rate=200, duration=0.2)
+            # A streamed response is chunked, and the connection stays open after it.
+            reader, writer = await asyncio.open_connection(host, port)
+            request = f"GET /api/users/export/ HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: text/csv\r\n\r\n"
+            writer.write(request.encode() * 2)
+            first = await reader.readuntil(b"\r\n0\r\n\r\n")
+            second = await reader.readuntil(b"\r\n0\r\n\r\n")
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+        self.assertEqual(result["error_rate"], 0)
+        self.assertEqual(sum(operation["requests"] for operation in result["operations"].values()), result["requests"])
+        for response in (first, second):
+            self.assertTrue(response.startswith(b"HTTP/1.1 200 OK\r\n"))
+            self.assertIn(b"transfer-encoding: chunked", response.lower())
+            self.assertIn(b"john.doe@example.com", response)
+
+
+class ProfilingTest(APITestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=directory.name, PROFILING_MAX_PROFILES=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Loads the middleware chain again, with the profiling middleware.
+        self.client = self.client_class()
+
+    def test_signed_header(self) -> None:
+        response = self.client.get(reverse("user-list"), HTTP_X_PROFILE=make_token())
+        profile_id = response["X-Profile-Id"]
+        metadata = json.loads((self.directory / f"{profile_id}.json").read_text())
+        self.assertEqual((metadata["view"], metadata["trigger"]), ("user-list", "header"))
+        self.assertTrue((self.directory / f"{profile_id}.prof").is_file())
+        lines = (self.directory / f"{profile_id}.collapsed").read_text().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            self.assertRegex(line, r"^[^;]+(;[^;]+)* \d+$")
+
+        self.assertNotIn("X-Profile-Id", self.client.get(reverse("user-list"), HTTP_X_PROFILE="forged"))
+        self.assertNotIn("X-Profile-Id", self.client.get(reverse("user-list")))
+
+    def test_parameter_for_staff_only(self) -> None:
+        url = reverse("user-list") + "?profile"
+        self.assertNotIn("X-Profile-Id", self.client.get(url))
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "password"))
+        self.assertIn("X-Profile-Id", self.client.get(url))
+
+    def test_sampled_into_bounded_ring(self) -> None:
+        with override_settings(PROFILING_SAMPLE_RATE=1):
+            profile_ids = [self.client.get(reverse("user-list"))["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual(len(set(profile_ids)), 3)
+        self.assertEqual([profile["id"] for profile in list_profiles()], profile_ids[:0:-1])
+        self.assertEqual(len(list(self.directory.iterdir())), 6)
+
+    def test_admin_lists_profiles(self) -> None:
+        profile_id = self.client.get(reverse("user-list"), HTTP_X_PROFILE=make_token())["X-Profile-Id"]
+        self.assertEqual(self.client.get(reverse("admin-profiles")).status_code, status.HTTP_302_FOUND)
+
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "password"))
+        response = self.client.get(reverse("admin-profiles"))
+        self.assertContains(response, reverse("admin-profile-file", args=(profile_id, "collapsed")))
+        response = self.client.get(reverse("admin-profile-file", args=(profile_id, "prof")))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(b"".join(response.streaming_content))
+        response = self.client.get(reverse("admin-profile-file", args=(profile_id, "json")))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_disabled(self) -> None:
+        with override_settings(PROFILING_ENABLED=False, PROFILING_SAMPLE_RATE=1):
+            client = self.client_class()
+            self.assertNotIn("X-Profile-Id", client.get(reverse("user-list"), HTTP_X_PROFILE=make_token()))
+        self.assertFalse(any(self.directory.iterdir()))
+
+
+class LazyLoadingTest(TestCase):
+    def test_workers_import_docs_and_admin_on_first_use(self) -> None:
+        eager = start_worker("app.wsgi", "/health/", {"DJANGO_LAZY_LOADING": "false"})
+        lazy = start_worker("app.wsgi", "/health/", {"DJANGO_LAZY_LOADING": "true"})
+        for module in ("drf_yasg.openapi", "app.schema", "app.admin_urls", "users.admin"):
+            self.assertIn(module, eager["modules"])
+            self.assertNotIn(module, lazy["modules"])
+        self.assertIn("drf_yasg", imported_only_by(eager["imports"], lazy["imports"]))
+
+    def test_lazy_urlconf(self) -> None:
+        with override_settings(ROOT_URLCONF=URLConf(async_views=False, lazy_loading=True)):
+            self.assertEqual(reverse("admin:users_user_changelist"), "/admin/users/user/")
+            response = self.client.get(reverse("schema-json", kwargs={"schema_format": "json"}))
+            self.assertIn("/api/users/", json.loads(response.content)["paths"])
+            self.assertEqual(self.client.get(reverse("schema-redoc")).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(reverse("admin-profiles")).status_code, status.HTTP_302_FOUND)
+
+            self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "password"))
+            self.assertEqual(self.client.get(reverse("admin:index")).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(reverse("admin-profiles")).status_code, status.HTTP_200_OK)
+
+    def test_reverse_into_lazy_admin_before_any_admin_request(self) -> None:
+        # LazyURLResolver overrides the private `URLResolver._populate()`.
+        urlconf = URLConf(async_views=False, lazy_loading=True)
+        (resolver,) = (pattern for pattern in urlconf.urlpatterns if isinstance(pattern, LazyURLResolver))
+        with override_settings(ROOT_URLCONF=urlconf, LAZY_LOADING=True):
+            self.assertEqual(reverse("user-list"), "/api/users/")
+            self.assertNotIn("urlconf_module", resolver.__dict__)
+
+            self.assertEqual(reverse("admin:index"), "/admin/")
+            self.assertIn("urlconf_module", resolver.__dict__)
+            self.assertEqual(resolve("/admin/").url_name, "index")
+            self.assertEqual(reverse("admin:users_user_changelist"), "/admin/users/user/")
+
+    def test_declared_parameters_in_schema(self) -> None:
+        overrides = UserViewSet.current_addresses._swagger_auto_schema  # noqa: SLF001
+        self.assertIsInstance(overrides["manual_parameters"][0], QueryParameter)
+
+        operation = json.loads(generate_schema("json"))["paths"]["/api/users/addresses/current/"]["get"]
+        parameters = {parameter["name"]: parameter for parameter in operation["parameters"]}
+        self.assertEqual(
+            parameters["user_ids"],
+            {
+                "name": "user_ids",
+                "in": "query",
+                "description": "Comma-separated user ids (at most 1000)",
+                "required": True,
+                "type": "string",
+            },
+        )
+        self.assertEqual(parameters["at"]["format"], "date-time")
+        self.assertNotIn("required", parameters["at"])
+
+
+ASYNC_URLCONF = URLConf(async_views=True)
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncUserAPITest(UserAPITest):
+    """The user and address endpoint tests against the async views."""
+
+    def test_views_are_coroutines(self) -> None:
+        for path in ("/api/users/", "/api/users/1/", "/api/users/1/address/", "/api/users/1/address/current/"):
+            with self.subTest(path=path):
+                self.assertTrue(asyncio.iscoroutinefunction(resolve(path).func))
+
+    def test_health_check(self) -> None:
+        response = self.client.get(reverse("health-check"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "UP")
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncUserPaginationTest(UserPaginationTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncSparseFieldsetTest(SparseFieldsetTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncConditionalGetTest(ConditionalGetTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncResponseCacheTest(ResponseCacheTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncCurrentAddressTest(CurrentAddressTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncNestedAddressesTest(NestedAddressesTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncUserFilterTest(UserFilterTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncSearchTest(SearchTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncReplicaRoutingTest(ReplicaRoutingTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncMetricsTest(MetricsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncQueryInspectorTest(QueryInspectorTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncProfilingTest(ProfilingTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncListFormatsTest(ListFormatsTest):
+    pass
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncUserExportTest(UserExportTest):
+    def _content(self, response: object) -> bytes:
+        async def read() -> bytes:
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        return async_to_sync(read)()
+
+    async def test_export_streams_under_asgi(self) -> None:
+        with warnings.catch_warnings():
+            # Raised by `StreamingHttpResponse` when it must buffer a synchronous iterator.
+            warnings.simplefilter("error")
+            response = await AsyncClient().get(self.url, {"format": "csv"})
+            # How ASGIHandler sends a streaming response.
+            with override_settings(USERS_EXPORT_CHUNK_SIZE=2):
+                chunks = [chunk async for chunk in response]
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(len(chunks), 2)
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual([row["address_city"] for row in rows], ["City0", "City1", "", ""])
+
+    def test_empty_export_has_csv_header(self) -> None:
+        User.objects.all().delete()
+
+        content = self._content(self.client.get(self.url, {"format": "csv"})).decode()
+
+        self.assertEqual(content.splitlines(), [",".join(csv_header())])
@@ -1,21 +1,34 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import UserAddressViewSet, UserViewSet
+from .views import AsyncUserAddressViewSet, AsyncUserViewSet, UserAddressViewSet, UserViewSet
 
-router = DefaultRouter()
-router.register(r"users", UserViewSet)
 
-urlpatterns = [
-    path("api/", include(router.urls)),
-    path("api/users/<int:id>/address/", UserAddressViewSet.as_view({
-        "get": "list",
-        "post": "create",
-    }), name="user-address-list"),
-    path("api/users/<int:id>/address/<int:address_id>/", UserAddressViewSet.as_view({
-        "get": "retrieve",
-        "put": "update",
-        "patch": "partial_update",
-        "delete": "destroy",
-    }), name="user-address-detail"),
-]
+def get_urlpatterns(*, async_views: bool = False) -> list:
+    """The users API routes, served by the async viewsets when `async_views` is set."""
+    user_viewset, address_viewset = (
+        (AsyncUserViewSet, AsyncUserAddressViewSet) if async_views else (UserViewSet, UserAddressViewSet)
+    )
+    router = DefaultRouter()
+    router.register(r"users", user_viewset)
+
+    return [
+        path("api/", include(router.urls)),
+        path("api/users/<int:id>/address/", address_viewset.as_view({
+            "get": "list",
+            "post": "create",
+        }), name="user-address-list"),
+        path("api/users/<int:id>/address/current/", address_viewset.as_view({
+            "get": "current",
+        }, pagination_class=None), name="user-address-current"),
+        path("api/users/<int:id>/address/<int:address_id>/", address_viewset.as_view({
+            "get": "retrieve",
+            "put": "update",
+            "patch": "partial_update",
+            "delete": "destroy",
+        }), name="user-address-detail"),
+    ]
+
+
+urlpatterns = get_urlpatterns(async_views=settings.ASYNC_VIEWS)
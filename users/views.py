@@ -1,15 +1,177 @@
-from django.db.models import QuerySet
+from __future__ import annotations
+
+from collections import Counter
+from functools import partial
+from typing import TYPE_CHECKING, ClassVar
+
+from django.db.models import Prefetch, QuerySet
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets
-from rest_framework.request import Request
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 
+from app.openapi import FORMAT_DATETIME, QueryParameter, schema_overrides
+
+from .bulk import bulk_upsert_users
+from .export import aexport_users, export_users
+from .filters import (
+    USER_ORDERING_FIELDS,
+    AllowListOrderingFilter,
+    IndexedSearchFilter,
+    UserFilterBackend,
+    filter_users,
+)
+from .mixins import (
+    AsyncViewMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ListFormatsMixin,
+    SparseFieldsetMixin,
+    aget_object_or_404,
+)
 from .models import User, UserAddress
-from .serializers import UserAddressSerializer, UserSerializer
+from .pagination import UserAddressKeysetPagination, UserAddressPagination, UserPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .search import search_addresses, search_users
+from .serializers import (
+    BulkUserRequestSerializer,
+    BulkUserResponseSerializer,
+    CurrentAddressBatchQuerySerializer,
+    CurrentAddressQuerySerializer,
+    NestedAddressesQuerySerializer,
+    UserAddressSerializer,
+    UserAddressValuesSerializer,
+    UserExportFilterSerializer,
+    UserSerializer,
+    UserValuesSerializer,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterable, Callable, Iterable
+
+    from rest_framework.filters import BaseFilterBackend
+    from rest_framework.request import Request
+
+pagination_parameters = [
+    QueryParameter(
+        "pagination",
+        description="Set to `cursor` to use keyset pagination (no total count, stable under concurrent inserts)",
+        enum=["cursor"],
+    ),
+    QueryParameter(
+        "cursor",
+        description="Opaque cursor taken from the `next`/`previous` link of a keyset-paginated response",
+    ),
+]
+
+fieldset_parameters = [
+    QueryParameter(
+        "fields",
+        description="Comma-separated list of fields to return; other columns are not loaded",
+    ),
+    QueryParameter(
+        "omit",
+        description="Comma-separated list of fields to leave out of the response",
+    ),
+]
+
+status_updated_parameters = [
+    QueryParameter(
+        "status",
+        description="Only users with this status",
+        enum=[code for code, _ in User.STATUS_CHOICES],
+    ),
+    QueryParameter(
+        "updated_after",
+        description="Only users updated at or after this ISO 8601 timestamp",
+        format=FORMAT_DATETIME,
+    ),
+    QueryParameter(
+        "updated_before",
+        description="Only users updated before this ISO 8601 timestamp",
+        format=FORMAT_DATETIME,
+    ),
+]
+
+export_parameters = [
+    QueryParameter(
+        "format",
+        description="Export format; defaults to the `Accept` header, then `ndjson`",
+        enum=[NDJSONRenderer.format, CSVRenderer.format],
+    ),
+    *status_updated_parameters,
+]
 
+filter_parameters = [
+    *status_updated_parameters,
+    QueryParameter(
+        "created_after",
+        description="Only users created at or after this ISO 8601 timestamp",
+        format=FORMAT_DATETIME,
+    ),
+    QueryParameter(
+        "created_before",
+        description="Only users created before this ISO 8601 timestamp",
+        format=FORMAT_DATETIME,
+    ),
+    QueryParameter(
+        "last_name_prefix",
+        description="Only users whose last name starts with this (case-sensitive)",
+    ),
+    QueryParameter(
+        "email",
+        description="Only the user with this email, ignoring case",
+    ),
+    QueryParameter(
+        "address_country",
+        description="Only users with an address, past or current, in this country",
+    ),
+    QueryParameter(
+        "address_city",
+        description="Only users with an address, past or current, in this city",
+    ),
+    QueryParameter(
+        "ordering",
+        description=(
+            "Comma-separated fields to order by, `-` for descending: "
+            f"{', '.join(USER_ORDERING_FIELDS)}. Not available with cursor pagination"
+        ),
+    ),
+]
 
-class UserViewSet(viewsets.ModelViewSet):
+search_parameter = QueryParameter(
+    "q",
+    description=(
+        "Search terms; results contain every term as a case-insensitive substring of one of the searched fields "
+        "and are ranked best first unless `ordering` is given"
+    ),
+)
+
+addresses_parameter = QueryParameter(
+    "addresses",
+    description=(
+        "Which addresses to nest in each user: `all` (default), `current` (the one in effect per address type), "
+        f"`latest:N` (the N most recent by `valid_from`, N <= {NestedAddressesQuerySerializer.max_latest}) "
+        "or `none` (leave the field out)"
+    ),
+)
+
+at_parameter = QueryParameter(
+    "at",
+    description="ISO 8601 timestamp to resolve addresses at; defaults to now",
+    format=FORMAT_DATETIME,
+)
+
+
+class UserViewSet(
+    ListFormatsMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet for managing Users with full CRUD operations.
 
@@ -20,22 +182,120 @@ class UserViewSet(viewsets.ModelViewSet):
     - PUT /api/users/{id}/ - Update a user (full update)
     - PATCH /api/users/{id}/ - Partially update a user
     - DELETE /api/users/{id}/ - Delete a user
+    - POST /api/users/bulk/ - Create or upsert many users with their addresses
+    - GET /api/users/export/ - Stream all users with their addresses as NDJSON or CSV
+    - GET /api/users/addresses/current/ - Addresses in effect at a point in time for many users
+
+    `list` and `retrieve` render `.values()` rows through `values_serializer_class`,
+    which produces the same output as `UserSerializer` at a fraction of the
+    Python cost; writes go through `UserSerializer`. Both read endpoints accept
+    `?fields=` / `?omit=` to load and render a subset of the fields, and answer
+    conditional requests (`If-None-Match` / `If-Modified-Since`) with a 304.
+    Responses are cached until the user or one of their addresses changes.
+    `?addresses=` bounds the nested addresses per user (`get_address_queryset()`).
+    The list is filtered by `UserFilterBackend` and ordered by `?ordering=`, and
+    is also rendered as columnar JSON or MessagePack (`ListFormatsMixin`).
+    Reads go to a replica when replicas are configured (see app.db.routers).
     """
 
-    queryset = User.objects.all().prefetch_related("addresses")
+    queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = UserPagination
+    filter_backends: ClassVar[list[type[BaseFilterBackend]]] = [
+        UserFilterBackend,
+        AllowListOrderingFilter,
+        IndexedSearchFilter,
+    ]
+    ordering_fields = USER_ORDERING_FIELDS
+    ordering = ("id",)
+    search_function = staticmethod(search_users)
+    values_serializer_class = UserValuesSerializer
+    conditional_relations: ClassVar[tuple[str, ...]] = ("addresses",)
+    cache_user_url_kwarg = "pk"
+    read_from_replicas = True
+
+    def get_addresses_mode(self) -> tuple[str, int | None]:
+        """The `?addresses=` mode of a read request as `(mode, limit)`; writes always nest all addresses."""
+        if not hasattr(self, "_addresses_mode"):
+            self._addresses_mode = ("all", None)
+            if self.request.method in SAFE_METHODS:
+                query = NestedAddressesQuerySerializer(data=self.request.query_params)
+                query.is_valid(raise_exception=True)
+                self._addresses_mode = query.validated_data["addresses"]
+        return self._addresses_mode
+
+    def is_cached(self) -> bool:
+        # Which address is current changes with time, not only on writes.
+        return super().is_cached() and self.get_addresses_mode()[0] != "current"
+
+    def is_conditional(self) -> bool:
+        # Likewise the validators, which only move on writes.
+        return super().is_conditional() and self.get_addresses_mode()[0] != "current"
 
-    @swagger_auto_schema(
+    def get_address_queryset(self) -> QuerySet[UserAddress]:
+        """
+        Addresses to nest in users, per `get_addresses_mode()`.
+
+        `current` and `latest:N` are bounded per user by a `ROW_NUMBER()`
+        window in the database, so a user with thousands of addresses costs
+        no more memory than one with a handful.
+        """
+        mode, limit = self.get_addresses_mode()
+        if mode == "current":
+            return UserAddress.objects.current(window=True)
+        if mode == "latest":
+            return UserAddress.objects.most_recent(limit)
+        return UserAddress.objects.all()
+
+    def get_requested_fields(self) -> tuple[str, ...] | None:
+        fields = super().get_requested_fields()
+        if self.get_addresses_mode()[0] != "none":
+            return fields
+        return tuple(name for name in fields or self.get_serializer_class().Meta.fields if name != "addresses")
+
+    def get_prefetch_fields(self) -> dict[str, str | Prefetch]:
+        return {"addresses": Prefetch("addresses", queryset=self.get_address_queryset().order_by("id"))}
+
+    def get_queryset(self) -> QuerySet[User]:
+        return self.project_queryset(super().get_queryset())
+
+    def get_values_serializer(self) -> UserValuesSerializer:
+        return self.values_serializer_class.for_fields(self.get_requested_fields())
+
+    def serialize_rows(self, serializer: UserValuesSerializer, rows: Iterable[dict]) -> list[dict]:
+        return serializer.serialize(rows, {"addresses": self.get_address_queryset()})
+
+    def get_values_queryset(self, serializer: UserValuesSerializer) -> QuerySet:
+        queryset = self.filter_queryset(self.get_queryset())
+        return serializer.get_queryset(queryset, self.get_projection_extra_fields())
+
+    @schema_overrides(
         operation_summary="List all users",
         operation_description="Retrieve a list of all users with their addresses",
+        manual_parameters=[
+            *pagination_parameters,
+            search_parameter,
+            *filter_parameters,
+            *fieldset_parameters,
+            addresses_parameter,
+        ],
         responses={
             200: UserSerializer(many=True),
+            304: "Not Modified - The client's ETag or Last-Modified is current",
         },
     )
-    def list(self, request: Request, *args: object, **kwargs: dict) -> Response:
-        return super().list(request, *args, **kwargs)
+    def list(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        early_response = self.get_early_response()
+        if early_response is not None:
+            return early_response
+        serializer = self.get_values_serializer()
+        queryset = self.get_values_queryset(serializer)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_rows(serializer, page))
+        return Response(self.serialize_rows(serializer, queryset))
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Create a new user",
         operation_description="Create a new user with the provided data",
         request_body=UserSerializer,
@@ -47,18 +307,26 @@ class UserViewSet(viewsets.ModelViewSet):
     def create(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().create(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Retrieve a user",
         operation_description="Retrieve a specific user by ID with their addresses",
+        manual_parameters=[*fieldset_parameters, addresses_parameter],
         responses={
             200: UserSerializer,
+            304: "Not Modified - The client's ETag or Last-Modified is current",
             404: "User not found",
         },
     )
-    def retrieve(self, request: Request, *args: object, **kwargs: dict) -> Response:
-        return super().retrieve(request, *args, **kwargs)
+    def retrieve(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        early_response = self.get_early_response()
+        if early_response is not None:
+            return early_response
+        serializer = self.get_values_serializer()
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        row = get_object_or_404(self.get_values_queryset(serializer), **lookup)
+        return Response(self.serialize_rows(serializer, [row])[0])
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Update a user",
         operation_description="Update all fields of a user",
         request_body=UserSerializer,
@@ -71,7 +339,7 @@ class UserViewSet(viewsets.ModelViewSet):
     def update(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().update(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Partially update a user",
         operation_description="Update specific fields of a user",
         request_body=UserSerializer,
@@ -84,7 +352,7 @@ class UserViewSet(viewsets.ModelViewSet):
     def partial_update(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().partial_update(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Delete a user",
         operation_description="Delete a user and all associated addresses",
         responses={
@@ -95,8 +363,110 @@ class UserViewSet(viewsets.ModelViewSet):
     def destroy(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().destroy(request, *args, **kwargs)
 
+    @schema_overrides(
+        operation_summary="Bulk create or upsert users",
+        operation_description=(
+            "Create many users with nested addresses in one request. With `upsert`, users matching an existing "
+            "email and addresses matching an existing (address_type, valid_from) are updated instead. "
+            "Returns one result per item; invalid items do not prevent valid ones from being saved."
+        ),
+        request_body=BulkUserRequestSerializer,
+        responses={
+            200: BulkUserResponseSerializer,
+            400: "Bad Request - Validation errors",
+        },
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request: Request) -> Response:
+        serializer = BulkUserRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_upsert_users(serializer.validated_data["users"], upsert=serializer.validated_data["upsert"])
+        counts = Counter(result["status"] for result in results)
+        return Response(
+            {
+                "created": counts["created"],
+                "updated": counts["updated"],
+                "failed": counts["error"],
+                "results": results,
+            },
+        )
+
+    @schema_overrides(
+        operation_summary="Export users",
+        operation_description=(
+            "Stream all users with their addresses as NDJSON (one user with nested addresses per line) "
+            "or CSV (one row per address). The response is not paginated."
+        ),
+        manual_parameters=export_parameters,
+        responses={
+            200: "NDJSON or CSV stream",
+            400: "Bad Request - Invalid filters",
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+    )
+    def export(self, request: Request) -> StreamingHttpResponse:  # noqa: ARG002
+        return self.get_export_response(export_users)
+
+    def get_export_response(self, encode: Callable[[QuerySet, str], Iterable | AsyncIterable]) -> StreamingHttpResponse:
+        """Stream the filtered users as encoded by `encode(queryset, format)`."""
+        filters = UserExportFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        renderer = self.request.accepted_renderer
+        response = StreamingHttpResponse(
+            encode(filter_users(User.objects.all(), **filters.validated_data), renderer.format),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = f'attachment; filename="users.{renderer.format}"'
+        return response
 
-class UserAddressViewSet(viewsets.ModelViewSet):
+    @schema_overrides(
+        operation_summary="Current addresses of many users",
+        operation_description=(
+            "For each of the given users and each address type, return the address with the latest "
+            "`valid_from` not after `at`, ordered by user and address type."
+        ),
+        manual_parameters=[
+            QueryParameter(
+                "user_ids",
+                description="Comma-separated user ids (at most 1000)",
+                required=True,
+            ),
+            at_parameter,
+        ],
+        responses={
+            200: UserAddressSerializer(many=True),
+            400: "Bad Request - Invalid user ids or timestamp",
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="addresses/current",
+        url_name="current-addresses",
+        pagination_class=None,
+    )
+    def current_addresses(self, request: Request) -> Response:
+        query = CurrentAddressBatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = UserAddress.objects.filter(user_id__in=query.validated_data["user_ids"])
+        serializer = UserAddressValuesSerializer.for_fields()
+        rows = serializer.get_queryset(queryset.current(query.validated_data.get("at")))
+        return Response(serializer.serialize(rows))
+
+
+class UserAddressViewSet(
+    ListFormatsMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet for managing User Addresses with full CRUD operations.
 
@@ -107,34 +477,50 @@ class UserAddressViewSet(viewsets.ModelViewSet):
     - PUT /api/users/{id}/address/{address_id}/ - Update a user address (full update)
     - PATCH /api/users/{id}/address/{address_id}/ - Partially update a user address
     - DELETE /api/users/{id}/address/{address_id}/ - Delete a user address
+    - GET /api/users/{id}/address/current/ - Addresses of the user in effect at a point in time
+
+    Reads answer conditional requests (`If-None-Match` / `If-Modified-Since`) with a 304
+    and are cached until the user or one of their addresses changes. They go to a replica
+    when replicas are configured.
     """
 
     serializer_class = UserAddressSerializer
+    pagination_class = UserAddressPagination
+    lookup_field = "id"
+    lookup_url_kwarg = "address_id"
+    cache_user_url_kwarg = "id"
+    read_from_replicas = True
+    filter_backends: ClassVar[list[type[BaseFilterBackend]]] = [IndexedSearchFilter]
+    # The user is fixed by the URL, so only the address fields are searched.
+    search_function = staticmethod(partial(search_addresses, include_users=False))
 
     def get_queryset(self) -> QuerySet[UserAddress]:
         user_id = self.kwargs.get("id")
-        return UserAddress.objects.filter(user_id=user_id).select_related("user")
+        # The keyset order, so that page numbers page consistently too.
+        queryset = UserAddress.objects.filter(user_id=user_id).order_by(*UserAddressKeysetPagination.ordering)
+        return self.project_queryset(queryset.select_related("user"))
 
     def perform_create(self, serializer: UserAddressSerializer) -> None:
         user_id = self.kwargs.get("id")
         serializer.save(user_id=user_id)
 
     def get_object(self) -> UserAddress:
-        user_id = self.kwargs.get("id")
         address_id = self.kwargs.get("address_id")
-        return get_object_or_404(UserAddress, user_id=user_id, id=address_id)
+        return get_object_or_404(self.get_queryset(), id=address_id)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="List all user addresses",
         operation_description="Retrieve a list of all user addresses",
+        manual_parameters=[*pagination_parameters, search_parameter, *fieldset_parameters],
         responses={
             200: UserAddressSerializer(many=True),
+            304: "Not Modified - The client's ETag or Last-Modified is current",
         },
     )
     def list(self, request: Request, *args: object, **kwargs: dict) -> Response:
-        return super().list(request, *args, **kwargs)
+        return self.get_early_response() or super().list(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Create a new user address",
         operation_description="Create a new user address with the provided data",
         request_body=UserAddressSerializer,
@@ -146,18 +532,20 @@ class UserAddressViewSet(viewsets.ModelViewSet):
     def create(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().create(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Retrieve a user address",
         operation_description="Retrieve a specific user address by ID",
+        manual_parameters=fieldset_parameters,
         responses={
             200: UserAddressSerializer,
+            304: "Not Modified - The client's ETag or Last-Modified is current",
             404: "User address not found",
         },
     )
     def retrieve(self, request: Request, *args: object, **kwargs: dict) -> Response:
-        return super().retrieve(request, *args, **kwargs)
+        return self.get_early_response() or super().retrieve(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Update a user address",
         operation_description="Update all fields of a user address",
         request_body=UserAddressSerializer,
@@ -170,7 +558,7 @@ class UserAddressViewSet(viewsets.ModelViewSet):
     def update(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().update(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Partially update a user address",
         operation_description="Update specific fields of a user address",
         request_body=UserAddressSerializer,
@@ -183,7 +571,7 @@ class UserAddressViewSet(viewsets.ModelViewSet):
     def partial_update(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().partial_update(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @schema_overrides(
         operation_summary="Delete a user address",
         operation_description="Delete a user address",
         responses={
@@ -193,3 +581,96 @@ class UserAddressViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request: Request, *args: object, **kwargs: dict) -> Response:
         return super().destroy(request, *args, **kwargs)
+
+    @schema_overrides(
+        operation_summary="Current user addresses",
+        operation_description=(
+            "For each address type, return the user's address with the latest `valid_from` not after `at`."
+        ),
+        manual_parameters=[at_parameter, *fieldset_parameters],
+        responses={
+            200: UserAddressSerializer(many=True),
+            400: "Bad Request - Invalid timestamp",
+        },
+    )
+    def current(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        query = CurrentAddressQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = UserAddress.objects.filter(user_id=self.kwargs.get("id"))
+        serializer = UserAddressValuesSerializer.for_fields(self.get_requested_fields())
+        rows = serializer.get_queryset(queryset.current(query.validated_data.get("at")))
+        return Response(serializer.serialize(rows))
+
+
+class AsyncUserViewSet(AsyncViewMixin, UserViewSet):
+    """
+    `UserViewSet` for the ASGI entry point: reads are served on the async ORM.
+
+    `list`, `retrieve`, `current_addresses` and `export` produce the same
+    responses as `UserViewSet`; exports stream from an async iterator, which
+    ASGI servers send as it is produced. Writes and bulk upserts run
+    synchronously in the worker thread (see `AsyncViewMixin`).
+    """
+
+    async def aserialize_rows(self, serializer: UserValuesSerializer, rows: list[dict]) -> list[dict]:
+        return await serializer.aserialize(rows, {"addresses": self.get_address_queryset()})
+
+    async def alist(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        early_response = await self.aget_early_response()
+        if early_response is not None:
+            return early_response
+        serializer = self.get_values_serializer()
+        queryset = self.get_values_queryset(serializer)
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(await self.aserialize_rows(serializer, page))
+        return Response(await self.aserialize_rows(serializer, [row async for row in queryset]))
+
+    async def aretrieve(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        early_response = await self.aget_early_response()
+        if early_response is not None:
+            return early_response
+        serializer = self.get_values_serializer()
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        row = await aget_object_or_404(self.get_values_queryset(serializer), **lookup)
+        return Response((await self.aserialize_rows(serializer, [row]))[0])
+
+    async def acurrent_addresses(self, request: Request) -> Response:
+        query = CurrentAddressBatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = UserAddress.objects.filter(user_id__in=query.validated_data["user_ids"])
+        serializer = UserAddressValuesSerializer.for_fields()
+        rows = serializer.get_queryset(queryset.current(query.validated_data.get("at")))
+        return Response(await serializer.aserialize([row async for row in rows]))
+
+    async def aexport(self, request: Request) -> StreamingHttpResponse:  # noqa: ARG002
+        return self.get_export_response(aexport_users)
+
+
+class AsyncUserAddressViewSet(AsyncViewMixin, UserAddressViewSet):
+    """`UserAddressViewSet` for the ASGI entry point: `list`, `retrieve` and `current` on the async ORM."""
+
+    async def alist(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        early_response = await self.aget_early_response()
+        if early_response is not None:
+            return early_response
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([address async for address in queryset], many=True).data)
+
+    async def aretrieve(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        early_response = await self.aget_early_response()
+        if early_response is not None:
+            return early_response
+        address = await aget_object_or_404(self.get_queryset(), id=self.kwargs.get("address_id"))
+        return Response(self.get_serializer(address).data)
+
+    async def acurrent(self, request: Request, *args: object, **kwargs: dict) -> Response:  # noqa: ARG002
+        query = CurrentAddressQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        queryset = UserAddress.objects.filter(user_id=self.kwargs.get("id"))
+        serializer = UserAddressValuesSerializer.for_fields(self.get_requested_fields())
+        rows = serializer.get_queryset(queryset.current(query.validated_data.get("at")))
+        return Response(await serializer.aserialize([row async for row in rows]))